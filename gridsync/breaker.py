@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from PyQt5.QtCore import pyqtSignal, QObject
+from twisted.internet import reactor
+
+
+# Tracks whether a gateway's web API is reachable so that the Monitor can stop
+# sending requests to a node that is down, probing it with a single request
+# every `reset_timeout` seconds (backing off up to `max_reset_timeout`) instead
+class CircuitBreaker(QObject):
+
+    CLOSED = 0
+    OPEN = 1
+    HALF_OPEN = 2
+
+    state_changed = pyqtSignal(int)
+
+    def __init__(self, name='', failure_threshold=3, reset_timeout=5,
+                 max_reset_timeout=60, clock=None):
+        super(CircuitBreaker, self).__init__()
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.initial_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.clock = clock or reactor
+        self.state = CircuitBreaker.CLOSED
+        self.failures = 0
+        self.opened_at = 0
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            self.state_changed.emit(state)
+
+    def allow_request(self):
+        # When open, allow a single (probe) request once the reset timeout
+        # has elapsed, moving to half-open until that request completes
+        if self.state == CircuitBreaker.CLOSED:
+            return True
+        if self.state == CircuitBreaker.OPEN and \
+                self.clock.seconds() - self.opened_at >= self.reset_timeout:
+            logging.debug("Probing %s web API...", self.name)
+            self._set_state(CircuitBreaker.HALF_OPEN)
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.reset_timeout = self.initial_reset_timeout
+        if self.state != CircuitBreaker.CLOSED:
+            logging.info("Circuit breaker for %s closed", self.name)
+        self._set_state(CircuitBreaker.CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == CircuitBreaker.HALF_OPEN:
+            # The probe failed; back off before probing again
+            self.reset_timeout = min(
+                self.reset_timeout * 2, self.max_reset_timeout)
+        elif self.state == CircuitBreaker.OPEN or \
+                self.failures < self.failure_threshold:
+            return
+        logging.warning(
+            "Circuit breaker for %s opened after %i failure(s); retrying in "
+            "%i seconds", self.name, self.failures, self.reset_timeout)
+        self.opened_at = self.clock.seconds()
+        self._set_state(CircuitBreaker.OPEN)
+
+    def reset(self):
+        self.failures = 0
+        self.reset_timeout = self.initial_reset_timeout
+        self._set_state(CircuitBreaker.CLOSED)
@@ -4,13 +4,12 @@
 import argparse
 import logging
 import sys
+import time
 
 from gridsync import APP_NAME
 from gridsync import __doc__ as description
 from gridsync._version import __version__
-from gridsync.core import Core
 from gridsync.errors import FilesystemLockError
-from gridsync import msg
 
 
 class TahoeVersion(argparse.Action):
@@ -21,12 +20,23 @@ class TahoeVersion(argparse.Action):
 
 
 def main():
+    start_time = time.time()
     parser = argparse.ArgumentParser(
         description=description)
     parser.add_argument(
         '--debug',
         action='store_true',
         help='Print debug messages to STDOUT.')
+    parser.add_argument(
+        '--headless',
+        action='store_true',
+        help='Run without a graphical user interface, printing status '
+        'messages to STDOUT.')
+    parser.add_argument(
+        '--record-trace',
+        metavar='PATH',
+        help='Record the responses received by the status monitor(s) to '
+        'PATH (gzipped JSON lines), for later replay and profiling.')
     parser.add_argument(
         '--tahoe-version',
         nargs=0,
@@ -45,6 +55,10 @@ def main():
             level=logging.DEBUG, stream=sys.stdout)
         from twisted.python.log import startLogging
         startLogging(sys.stdout)
+    elif args.headless:
+        logging.basicConfig(
+            format='%(asctime)s %(levelname)s %(message)s',
+            level=logging.INFO, stream=sys.stdout)
     #else:
     #    appname = settings['application']['name']
     #    logfile = os.path.join(config_dir, '{}.log'.format(appname))
@@ -52,10 +66,20 @@ def main():
     #        format='%(asctime)s %(levelname)s %(funcName)s %(message)s',
     #        level=logging.INFO, filename=logfile)
 
+    if args.headless:
+        # Avoid importing gridsync.core (and, with it, QtWidgets/QApplication)
+        from gridsync.headless import HeadlessCore as Core
+    else:
+        from gridsync.core import Core
+
     try:
-        core = Core(args)
+        core = Core(args, start_time)
         core.start()
     except FilesystemLockError:
+        if args.headless:
+            logging.critical("%s is already running.", APP_NAME)
+            return 1
+        from gridsync import msg
         msg.critical(
             "{} already running".format(APP_NAME),
             "{} is already running.".format(APP_NAME))
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import sys
+
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks, maybeDeferred
+from twisted.internet.error import CannotListenError
+from twisted.internet.protocol import Factory
+from twisted.protocols.basic import LineOnlyReceiver
+
+from gridsync import config_dir, APP_NAME
+from gridsync.errors import ControlError
+
+
+class StateCache():
+    def __init__(self):
+        self.state = {}
+        self.subscribers = {}  # protocol -> gateway name (or None for all)
+
+    def add_gateway(self, gateway):
+        name = gateway.name
+        grid_checker = gateway.monitor.grid_checker
+        self.state[name] = {
+            'grid': {
+                'connected': grid_checker.is_connected,
+                'nodes_connected': grid_checker.num_connected,
+                'nodes_known': grid_checker.num_known,
+                'available_space': grid_checker.available_space,
+                'sync_state': gateway.monitor.total_sync_state,
+                'circuit_state': gateway.breaker.state,
+                'supervisor_state': gateway.supervisor.state
+            },
+            'folders': {}
+        }
+        for folder, checker in gateway.monitor.magic_folder_checkers.items():
+            self.update(
+                name, folder, status=checker.state, remote=checker.remote,
+                members=[member for member, _ in checker.members])
+
+        monitor = gateway.monitor
+        monitor.connected.connect(
+            lambda: self.update(name, None, connected=True))
+        grid_checker.disconnected.connect(
+            lambda: self.update(name, None, connected=False))
+        monitor.nodes_updated.connect(
+            lambda connected, known: self.update(
+                name, None, nodes_connected=connected, nodes_known=known))
+        monitor.space_updated.connect(
+            lambda space: self.update(name, None, available_space=space))
+        monitor.total_sync_state_updated.connect(
+            lambda state: self.update(name, None, sync_state=state))
+        monitor.circuit_state_changed.connect(
+            lambda state: self.update(name, None, circuit_state=state))
+        monitor.supervisor_state_changed.connect(
+            lambda state: self.update(name, None, supervisor_state=state))
+        monitor.remote_folder_added.connect(
+            lambda folder, _: self.update(name, folder, remote=True))
+        monitor.status_updated.connect(
+            lambda folder, status: self.update(name, folder, status=status))
+        monitor.mtime_updated.connect(
+            lambda folder, mtime: self.update(name, folder, mtime=mtime))
+        monitor.size_updated.connect(
+            lambda folder, size: self.update(name, folder, size=size))
+        # Members are (name, readcap) pairs; don't leak the readcaps
+        monitor.members_updated.connect(
+            lambda folder, members: self.update(
+                name, folder, members=[member for member, _ in members]))
+        monitor.transfer_progress_updated.connect(
+            lambda folder, transferred, total: self.update(
+                name, folder, bytes_transferred=transferred,
+                bytes_total=total))
+
+    def update(self, gateway_name, folder_name, **changes):
+        gateway_state = self.state[gateway_name]
+        if folder_name is None:
+            state = gateway_state['grid']
+        else:
+            state = gateway_state['folders'].setdefault(folder_name, {})
+        changed = {}
+        for key, value in changes.items():
+            if key not in state or state[key] != value:
+                state[key] = value
+                changed[key] = value
+        if not changed:
+            return
+        delta = {
+            'event': 'update',
+            'gateway': gateway_name,
+            'folder': folder_name,
+            'changes': changed
+        }
+        for subscriber, name in list(self.subscribers.items()):
+            if name is None or name == gateway_name:
+                subscriber.send(delta)
+
+    def snapshot(self, gateway_name=None):
+        if gateway_name is None:
+            return self.state
+        try:
+            return {gateway_name: self.state[gateway_name]}
+        except KeyError:
+            raise ControlError('Unknown gateway "{}"'.format(gateway_name))
+
+
+class ControlProtocol(LineOnlyReceiver):
+
+    delimiter = b'\n'
+
+    def connectionLost(self, reason):  # pylint: disable=unused-argument
+        self.factory.cache.subscribers.pop(self, None)
+
+    def send(self, message):
+        self.sendLine(json.dumps(message).encode('utf-8'))
+
+    def lineReceived(self, line):
+        try:
+            request = json.loads(line.decode('utf-8'))
+            command = request['command']
+        except (KeyError, TypeError, ValueError):
+            self.send({'id': None, 'error': 'Malformed request'})
+            return
+        request_id = request.get('id')
+        d = maybeDeferred(self.factory.handle, self, command, request)
+        d.addCallbacks(
+            lambda result: self.send({'id': request_id, 'result': result}),
+            lambda failure: self.send(
+                {'id': request_id, 'error': failure.getErrorMessage()}))
+
+
+class ControlServer(Factory):
+
+    protocol = ControlProtocol
+
+    def __init__(self):
+        self.cache = StateCache()
+        self.gateways = {}
+        self.listener = None
+
+    def add_gateway(self, gateway):
+        self.gateways[gateway.name] = gateway
+        self.cache.add_gateway(gateway)
+
+    def get_gateway(self, request):
+        name = request.get('gateway')
+        if name is None and len(self.gateways) == 1:
+            return list(self.gateways.values())[0]
+        try:
+            return self.gateways[name]
+        except KeyError:
+            raise ControlError('Unknown gateway "{}"'.format(name))
+
+    @inlineCallbacks
+    def add_folder(self, request):
+        gateway = self.get_gateway(request)
+        path = request.get('path')
+        if not path or not os.path.isdir(path):
+            raise ControlError('"{}" is not a directory'.format(path))
+        name = os.path.basename(os.path.normpath(path))
+        if gateway.magic_folder_exists(name):
+            raise ControlError('Folder "{}" already exists'.format(name))
+        yield gateway.restarter.track(gateway.create_magic_folder(path))
+        yield gateway.restarter.request()
+        return name
+
+    @inlineCallbacks
+    def rescan_rootcap(self, request):
+        gateway = self.get_gateway(request)
+        yield gateway.monitor.scan_rootcap()
+        return self.cache.snapshot(gateway.name)
+
+    def get_stats(self, request):
+        if request.get('gateway') is None:
+            gateways = self.gateways.values()
+        else:
+            gateways = [self.get_gateway(request)]
+        return {gw.name: gw.get_debug_stats() for gw in gateways}
+
+    def handle(self, protocol, command, request):
+        logging.debug("Received control command: %s", command)
+        if command == 'get_state':
+            return self.cache.snapshot(request.get('gateway'))
+        if command == 'subscribe':
+            snapshot = self.cache.snapshot(request.get('gateway'))
+            self.cache.subscribers[protocol] = request.get('gateway')
+            return snapshot
+        if command == 'unsubscribe':
+            self.cache.subscribers.pop(protocol, None)
+            return None
+        if command == 'add_folder':
+            return self.add_folder(request)
+        if command == 'rescan_rootcap':
+            return self.rescan_rootcap(request)
+        if command == 'get_stats':
+            return self.get_stats(request)
+        raise ControlError('Unknown command "{}"'.format(command))
+
+    def listen(self, path=None):
+        if sys.platform == 'win32':
+            logging.warning("Control socket not supported on Windows")
+            return
+        if not path:
+            path = os.path.join(config_dir, '{}.sock'.format(APP_NAME.lower()))
+        # wantPID guards against (and cleans up) stale sockets left behind by
+        # a previous instance that didn't exit cleanly
+        try:
+            self.listener = reactor.listenUNIX(
+                path, self, mode=0o600, wantPID=True)
+        except CannotListenError as e:
+            logging.warning("Error starting control socket: %s", str(e))
+            return
+        logging.debug("Control socket listening on %s", path)
+
+    def stop(self):
+        if self.listener:
+            self.listener.stopListening()
+            self.listener = None
@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 
 import logging
-import os
 import sys
 
 from PyQt5.QtGui import QIcon
@@ -16,24 +15,21 @@ qt5reactor.install()
 from twisted.internet import reactor
 from twisted.internet.defer import inlineCallbacks
 
-from gridsync import config_dir, resource, settings, APP_NAME
+from gridsync import config_dir, resource, settings
 from gridsync import msg
 from gridsync.gui import Gui
-from gridsync.lock import FilesystemLock
+from gridsync.headless import BaseCore, log_startup_stats
 from gridsync.preferences import get_preference, set_preference
-from gridsync.tahoe import get_nodedirs, Tahoe, select_executable
-from gridsync.tor import get_tor
+from gridsync.tahoe import get_nodedirs, select_executable
 
 
 app.setWindowIcon(QIcon(resource(settings['application']['tray_icon'])))
 
 
-class Core():
-    def __init__(self, args):
-        self.args = args
+class Core(BaseCore):
+    def __init__(self, args, start_time=None):
+        super(Core, self).__init__(args, start_time)
         self.gui = None
-        self.gateways = []
-        self.executable = None
         self.operations = []
 
     @inlineCallbacks
@@ -48,32 +44,27 @@ class Core():
                 "again.")
             reactor.stop()
 
+    def warn_tor_unavailable(self, gateway):
+        msg.error(
+            self.gui.main_window,
+            "Error Connecting To Tor Daemon",
+            'The "{}" connection is configured to use Tor, however, no '
+            'running tor daemon was found.\n\nThis connection will be '
+            'disabled until you launch Tor again.'.format(gateway.name)
+        )
+
     @inlineCallbacks
     def start_gateways(self):
+        self.control_server.listen()
         nodedirs = get_nodedirs(config_dir)
         if nodedirs:
             minimize_preference = get_preference('startup', 'minimize')
             if not minimize_preference or minimize_preference == 'false':
                 self.gui.show_main_window()
             yield self.select_executable()
-            tor_available = yield get_tor(reactor)
-            logging.debug("Starting Tahoe-LAFS gateway(s)...")
-            for nodedir in nodedirs:
-                gateway = Tahoe(nodedir, executable=self.executable)
-                tcp = gateway.config_get('connections', 'tcp')
-                if tcp == 'tor' and not tor_available:
-                    msg.error(
-                        self.gui.main_window,
-                        "Error Connecting To Tor Daemon",
-                        'The "{}" connection is configured to use Tor, '
-                        'however, no running tor daemon was found.\n\n'
-                        'This connection will be disabled until you launch '
-                        'Tor again.'.format(gateway.name)
-                    )
-                self.gateways.append(gateway)
-                d = gateway.start()
-                d.addCallback(gateway.ensure_folder_links)
+            yield self.start_nodes(nodedirs)
             self.gui.populate(self.gateways)
+            log_startup_stats(self.start_time, 'GUI')
         else:
             self.gui.show_welcome_dialog()
             yield self.select_executable()
@@ -109,28 +100,10 @@ class Core():
         msgbox.exec_()
         logging.debug("Custom message closed; proceeding with start...")
 
-    def start(self):
-        try:
-            os.makedirs(config_dir)
-        except OSError:
-            pass
-
-        # Acquire a filesystem lock to prevent multiple instances from running
-        lock = FilesystemLock(
-            os.path.join(config_dir, "{}.lock".format(APP_NAME)))
-        lock.acquire()
-
-        logging.info("Core starting with args: %s", self.args)
-        logging.debug("$PATH is: %s", os.getenv('PATH'))
+    def prepare(self):
         logging.debug("Loaded config.txt settings: %s", settings)
 
         self.show_message()
 
         self.gui = Gui(self)
         self.gui.show_systray()
-
-        reactor.callLater(0, self.start_gateways)
-        reactor.run()
-        for nodedir in get_nodedirs(config_dir):
-            Tahoe(nodedir, executable=self.executable).kill()
-        lock.release()
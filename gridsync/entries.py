@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+import sys
+
+
+# A file (version) found in a member's directory by a remote scan. Folders
+# can hold many thousands of these (kept from one scan to the next), so they
+# use __slots__ instead of a per-instance __dict__; member names and caps are
+# interned since the same strings recur across entries and successive scans
+class FileEntry():
+
+    __slots__ = ('path', 'size', 'mtime', 'deleted', 'cap', '_member',
+                 'action')
+
+    def __init__(self, path, size, mtime, deleted=False, cap=None,
+                 member=None, action=None):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.deleted = deleted
+        self.cap = sys.intern(cap) if cap else cap
+        self.member = member
+        self.action = action
+
+    @property
+    def member(self):
+        return self._member
+
+    @member.setter
+    def member(self, member):
+        self._member = sys.intern(member) if member else member
+
+    def __eq__(self, other):
+        if not isinstance(other, FileEntry):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        return 'FileEntry({})'.format(', '.join(
+            '{}={!r}'.format(k, v) for k, v in self.as_dict().items()))
+
+    def as_dict(self):
+        return {
+            'path': self.path,
+            'size': self.size,
+            'mtime': self.mtime,
+            'deleted': self.deleted,
+            'cap': self.cap,
+            'member': self.member,
+            'action': self.action
+        }
@@ -27,3 +27,7 @@ class TahoeWebError(TahoeError):
 
 class TorError(GridsyncError):
     pass
+
+
+class ControlError(GridsyncError):
+    pass
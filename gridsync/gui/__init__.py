@@ -55,4 +55,6 @@ class Gui():
             self.show_main_window()
 
     def populate(self, gateways):
+        for gateway in gateways:
+            self.core.add_gateway(gateway)
         self.main_window.populate(gateways)
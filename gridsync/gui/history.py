@@ -1,219 +1,341 @@
 # -*- coding: utf-8 -*-
 
-from datetime import datetime
+import bisect
+import logging
 import os
 import sys
 import time
 
-from humanize import naturalsize, naturaltime
-from PyQt5.QtCore import QFileInfo, QTimer, Qt
+from humanize import naturalsize
+from PyQt5.QtCore import (
+    QAbstractListModel, QModelIndex, QRect, QSize, Qt)
 from PyQt5.QtGui import QColor, QCursor, QFont, QIcon, QPixmap
 from PyQt5.QtWidgets import (
-    QAction, QAbstractItemView, QFileIconProvider, QGridLayout, QLabel,
-    QListWidgetItem, QListWidget, QMenu, QPushButton, QSizePolicy, QSpacerItem,
-    QWidget)
+    QAction, QAbstractItemView, QGridLayout, QListView, QMenu, QStyle,
+    QStyledItemDelegate, QWidget)
 
 from gridsync import resource
 from gridsync.desktop import open_enclosing_folder, open_path
 from gridsync.gui.status import StatusPanel
+from gridsync.gui.thumbnails import ThumbnailLoader
+from gridsync.gui.ticker import get_ticker, natural_time
+from gridsync.gui.widgets import get_file_type_icon
+from gridsync.util import LRUCache
 
 
-class HistoryItemWidget(QWidget):
-    def __init__(self, gateway, folder_name, data, parent):
-        super(HistoryItemWidget, self).__init__()
-        self.gateway = gateway
-        self.data = data
-        self.parent = parent
+# The "<Action> <time> ago" text shown beneath each file name
+DETAILS_ROLE = Qt.UserRole + 1
+
+
+class HistoryItem():
+
+    __slots__ = ('key', 'path', 'basename', 'action', 'mtime', 'size',
+                 'details', 'deadline')
 
-        self.path = data['path']
-        self.size = data['size']
-        self.action = data['action']
-        self.mtime = data['mtime']
-        self._thumbnail_loaded = False
+    def __init__(self, key, path, entry):
+        self.key = key
+        self.path = path
+        self.basename = os.path.basename(os.path.normpath(path))
+        self.action = entry.action
+        self.mtime = entry.mtime
+        self.size = entry.size
+        self.details = ''
+        self.deadline = 0
 
-        self.setAutoFillBackground(True)
 
+class HistoryListModel(QAbstractListModel):
+    def __init__(self, gateway, deduplicate=True, max_items=None,
+                 page_size=100):
+        super(HistoryListModel, self).__init__()
+        self.gateway = gateway
+        self.deduplicate = deduplicate
+        self.max_items = max_items
+        self.page_size = page_size
+
+        # All known items, newest first, with their negated mtimes kept in a
+        # parallel list for bisection. Only the first `loaded` items are
+        # exposed as rows; the rest are paged in via fetchMore().
+        self.items = []
+        self.sort_keys = []
+        self.loaded = 0
+        # (folder, path, member) -> item, for O(1) de-duplication
+        self.item_index = {}
+
+        self.thumbnails = LRUCache(256)
+        self.thumbnail_loader = ThumbnailLoader()
+        self._pending_thumbnails = set()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.loaded
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self.loaded < len(self.items)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.page_size, len(self.items) - self.loaded)
+        if count <= 0:
+            return
+        first = self.loaded
+        for item in self.items[first:first + count]:
+            self._refresh_details(item)
+        self.beginInsertRows(QModelIndex(), first, first + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.items[index.row()]
+        if role == Qt.DisplayRole:
+            return item.basename
+        if role == DETAILS_ROLE:
+            return item.details
+        if role == Qt.DecorationRole:
+            thumbnail = self.thumbnails.get(item.path)
+            if thumbnail is None:
+                self.load_thumbnail(item)
+            elif thumbnail is not False:  # False if not an image
+                return thumbnail
+            return get_file_type_icon(item.path)
+        if role == Qt.ToolTipRole:
+            return "{}\n\nSize: {}\nModified: {}".format(
+                item.path, naturalsize(item.size),
+                time.ctime(item.mtime))
+        if role == Qt.UserRole:
+            return item
+        return None
+
+    def _row(self, item):
+        row = bisect.bisect_left(self.sort_keys, -item.mtime)
+        while self.items[row] is not item:
+            row += 1
+        return row
+
+    def _insert(self, item):
+        row = bisect.bisect_left(self.sort_keys, -item.mtime)
+        exposed = row < self.loaded or (
+            row == self.loaded and self.loaded < self.page_size)
+        if exposed:
+            self._refresh_details(item)
+            self.beginInsertRows(QModelIndex(), row, row)
+        self.items.insert(row, item)
+        self.sort_keys.insert(row, -item.mtime)
+        self.item_index[item.key] = item
+        if exposed:
+            self.loaded += 1
+            self.endInsertRows()
+
+    def _remove(self, item):
+        row = self._row(item)
+        exposed = row < self.loaded
+        if exposed:
+            self.beginRemoveRows(QModelIndex(), row, row)
+        del self.items[row]
+        del self.sort_keys[row]
+        del self.item_index[item.key]
+        if exposed:
+            self.loaded -= 1
+            self.endRemoveRows()
+
+    def add_item(self, folder_name, entry):
+        key = (folder_name, entry.path, entry.member)
+        if self.deduplicate:
+            duplicate = self.item_index.get(key)
+            if duplicate is not None:
+                self._remove(duplicate)
+        path = entry.path
         directory = self.gateway.get_magic_folder_directory(folder_name)
         if directory:
-            self.path = os.path.join(directory, self.path)
-        self.basename = os.path.basename(os.path.normpath(self.path))
-
-        self.setToolTip(
-            "{}\n\nSize: {}\nModified: {}".format(
-                self.path, naturalsize(self.size), time.ctime(self.mtime)
-            )
-        )
-
-        self.icon = QLabel()
-        self.icon.setPixmap(
-            QFileIconProvider().icon(QFileInfo(self.path)).pixmap(48, 48)
-        )
-
-        self.basename_label = QLabel(self.basename)
-        font = QFont()
-        if sys.platform == 'darwin':
-            font.setPointSize(15)
-        else:
-            font.setPointSize(11)
-        self.basename_label.setFont(font)
+            path = os.path.join(directory, path)
+        self._insert(HistoryItem(key, path, entry))
+        if self.max_items:
+            while len(self.items) > self.max_items:
+                self._remove(self.items[-1])
+
+    @staticmethod
+    def _refresh_details(item):
+        # Returns True if the item's details have changed
+        now = time.time()
+        if now < item.deadline:
+            return False
+        text, item.deadline = natural_time(item.mtime, now)
+        get_ticker().schedule(item.deadline)
+        text = "{} {}".format(item.action.capitalize(), text)
+        if text == item.details:
+            return False
+        item.details = text
+        return True
+
+    def update_details(self, row):
+        if self._refresh_details(self.items[row]):
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [DETAILS_ROLE])
+
+    def load_thumbnail(self, item):
+        if item.path in self._pending_thumbnails:
+            return
+        self._pending_thumbnails.add(item.path)
+        d = self.thumbnail_loader.load(item.path)
+        d.addCallback(self.on_thumbnail_loaded, item)
+        d.addErrback(
+            lambda f: logging.error("Error loading thumbnail: %s", str(f)))
+
+    def on_thumbnail_loaded(self, pixmap, item):
+        self._pending_thumbnails.discard(item.path)
+        if pixmap is None:
+            self.thumbnails.put(item.path, False)
+            return
+        self.thumbnails.put(item.path, pixmap)
+        if self.item_index.get(item.key) is not item:
+            return  # Removed or replaced in the meantime
+        row = self._row(item)
+        if row < self.loaded:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+
+class HistoryItemDelegate(QStyledItemDelegate):
+    def __init__(self, parent=None):
+        super(HistoryItemDelegate, self).__init__(parent)
+        self.highlighted_color = QColor("#E6F1F7")  # TODO: Get from theme?
+        self.details_color = QColor('grey')
+        self.action_icon = QIcon(resource('dots-horizontal-triple.png'))
 
-        self.details_label = QLabel()
-        font = QFont()
+        self.basename_font = QFont()
+        self.details_font = QFont()
         if sys.platform == 'darwin':
-            font.setPointSize(13)
+            self.basename_font.setPointSize(15)
+            self.details_font.setPointSize(13)
         else:
-            font.setPointSize(10)
-        self.details_label.setFont(font)
-        self.details_label.setStyleSheet('color: grey')
-
-        self.button = QPushButton()
-        self.button.setIcon(QIcon(resource('dots-horizontal-triple.png')))
-        self.button.setStyleSheet('border: none;')
-        self.button.clicked.connect(self.parent.on_right_click)
-        self.button.hide()
-
-        self.layout = QGridLayout(self)
-        self.layout.addWidget(self.icon, 1, 1, 2, 2)
-        self.layout.addWidget(self.basename_label, 1, 3)
-        self.layout.addWidget(self.details_label, 2, 3)
-        self.layout.addItem(QSpacerItem(0, 0, QSizePolicy.Expanding, 0), 4, 4)
-        self.layout.addWidget(self.button, 1, 5, 2, 2)
-
-        self.update_text()
-        QTimer.singleShot(50, self.load_thumbnail)
-
-    def update_text(self):
-        self.details_label.setText(
-            "{} {}".format(
-                self.action.capitalize(),
-                naturaltime(datetime.fromtimestamp(self.mtime)),
-            )
-        )
-
-    def _do_load_thumbnail(self):
-        pixmap = QPixmap(self.path)
-        if not pixmap.isNull():
-            self.icon.setPixmap(pixmap.scaled(48, 48))
-
-    def load_thumbnail(self):
-        if self.isVisible() and not self._thumbnail_loaded:
-            self._thumbnail_loaded = True
-            QTimer.singleShot(50, self._do_load_thumbnail)
-
-    def unhighlight(self):
-        self.button.hide()
-        palette = self.palette()
-        palette.setColor(self.backgroundRole(), self.parent.base_color)
-        self.setPalette(palette)
-
-    def enterEvent(self, _):
-        self.button.show()
-        palette = self.palette()
-        palette.setColor(self.backgroundRole(), self.parent.highlighted_color)
-        self.setPalette(palette)
-        if self.parent.highlighted and self.parent.highlighted is not self:
-            try:
-                self.parent.highlighted.unhighlight()
-            except RuntimeError:  # Object has been deleted
-                pass
-        self.parent.highlighted = self
-
-
-class HistoryListWidget(QListWidget):
-    def __init__(self, gateway, deduplicate=True, max_items=30):
-        super(HistoryListWidget, self).__init__()
+            self.basename_font.setPointSize(11)
+            self.details_font.setPointSize(10)
+
+    def sizeHint(self, option, index):
+        return QSize(0, 70)
+
+    @staticmethod
+    def button_rect(rect):
+        return QRect(rect.right() - 36, rect.center().y() - 8, 16, 16)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        rect = option.rect
+        hovered = option.state & QStyle.State_MouseOver
+        if hovered:
+            painter.fillRect(rect, self.highlighted_color)
+
+        icon_rect = QRect(rect.left() + 11, rect.top() + 11, 48, 48)
+        decoration = index.data(Qt.DecorationRole)
+        if isinstance(decoration, QPixmap):
+            painter.drawPixmap(icon_rect, decoration)
+        elif decoration:
+            decoration.paint(painter, icon_rect)
+
+        left = icon_rect.right() + 11
+        width = self.button_rect(rect).left() - left - 11
+        middle = rect.center().y()
+        painter.setFont(self.basename_font)
+        painter.setPen(option.palette.text().color())
+        painter.drawText(
+            QRect(left, rect.top(), width, middle - rect.top()),
+            Qt.AlignLeft | Qt.AlignBottom,
+            painter.fontMetrics().elidedText(
+                index.data(Qt.DisplayRole), Qt.ElideMiddle, width))
+        painter.setFont(self.details_font)
+        painter.setPen(self.details_color)
+        painter.drawText(
+            QRect(left, middle, width, rect.bottom() - middle),
+            Qt.AlignLeft | Qt.AlignTop,
+            index.data(DETAILS_ROLE))
+
+        if hovered:
+            self.action_icon.paint(painter, self.button_rect(rect))
+        painter.restore()
+
+
+class HistoryListView(QListView):
+    def __init__(self, gateway, deduplicate=True, max_items=None):
+        super(HistoryListView, self).__init__()
         self.gateway = gateway
-        self.deduplicate = deduplicate
-        self.max_items = max_items
-
-        self.base_color = self.palette().base().color()
-        self.highlighted_color = QColor("#E6F1F7")  # TODO: Get from theme?
-        self.highlighted = None
 
-        self.action_icon = QIcon(resource('dots-horizontal-triple.png'))
+        self.setModel(HistoryListModel(gateway, deduplicate, max_items))
+        self.setItemDelegate(HistoryItemDelegate(self))
 
         self.setContextMenuPolicy(Qt.CustomContextMenu)
         self.setFocusPolicy(Qt.NoFocus)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        #self.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.setSelectionMode(QAbstractItemView.NoSelection)
-        #self.setStyleSheet("QListWidget::item:hover { background: #E6F1F7 }")
         self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setUniformItemSizes(True)
+        self.setMouseTracking(True)
 
-        self.sb = self.verticalScrollBar()
-
-        self.sb.valueChanged.connect(self.update_visible_widgets)
-        self.itemDoubleClicked.connect(self.on_double_click)
+        self.clicked.connect(self.on_click)
+        self.doubleClicked.connect(self.on_double_click)
         self.customContextMenuRequested.connect(self.on_right_click)
 
-        self.gateway.monitor.file_updated.connect(self.add_item)
-        self.gateway.monitor.check_finished.connect(
-            self.update_visible_widgets
-        )
+        self.gateway.monitor.file_updated.connect(self.model().add_item)
+        get_ticker().tick.connect(self.update_visible_rows)
+        self.verticalScrollBar().valueChanged.connect(
+            self.update_visible_rows)
+
+    def on_click(self, index):
+        position = self.viewport().mapFromGlobal(QCursor().pos())
+        rect = self.itemDelegate().button_rect(self.visualRect(index))
+        if rect.adjusted(-8, -8, 8, 8).contains(position):
+            self.on_right_click(position)
 
-    def on_double_click(self, item):
-        open_enclosing_folder(self.itemWidget(item).path)
+    def on_double_click(self, index):
+        open_enclosing_folder(index.data(Qt.UserRole).path)
 
     def on_right_click(self, position):
         if not position:
             position = self.viewport().mapFromGlobal(QCursor().pos())
-        item = self.itemAt(position)
-        if not item:
+        index = self.indexAt(position)
+        if not index.isValid():
             return
-        widget = self.itemWidget(item)
+        path = index.data(Qt.UserRole).path
         menu = QMenu(self)
         open_file_action = QAction("Open file")
-        open_file_action.triggered.connect(lambda: open_path(widget.path))
+        open_file_action.triggered.connect(lambda: open_path(path))
         menu.addAction(open_file_action)
         open_folder_action = QAction("Open enclosing folder")
         open_folder_action.triggered.connect(
-            lambda: self.on_double_click(item))
+            lambda: self.on_double_click(index))
         menu.addAction(open_folder_action)
         menu.exec_(self.viewport().mapToGlobal(position))
 
-    def add_item(self, folder_name, data):
-        duplicate = None
-        if self.deduplicate:
-            for i in range(self.count()):
-                widget = self.itemWidget(self.item(i))
-                if widget and widget.data['path'] == data['path'] and \
-                        widget.data['member'] == data['member']:
-                    duplicate = i
-                    break
-        if duplicate is not None:
-            item = self.takeItem(duplicate)
-        else:
-            self.takeItem(self.max_items)
-            item = QListWidgetItem()
-        self.insertItem(0 - int(data['mtime']), item)  # Newest on top
-        custom_widget = HistoryItemWidget(
-            self.gateway, folder_name, data, self)
-        item.setSizeHint(custom_widget.sizeHint())
-        self.setItemWidget(item, custom_widget)
-
-    def update_visible_widgets(self):
+    def showEvent(self, event):
+        # Rows aren't refreshed while hidden (see update_visible_rows())
+        for row in range(self.model().rowCount()):
+            self.model().update_details(row)
+        super(HistoryListView, self).showEvent(event)
+
+    def update_visible_rows(self, _=None):
         if not self.isVisible():
-            return
+            return  # Refreshed when next shown instead
         rect = self.viewport().contentsRect()
         top = self.indexAt(rect.topLeft())
-        if top.isValid():
-            bottom = self.indexAt(rect.bottomLeft())
-            if not bottom.isValid():
-                bottom = self.model().index(self.count() - 1)
-            for index in range(top.row(), bottom.row() + 1):
-                widget = self.itemWidget(self.item(index))
-                if widget:
-                    widget.update_text()
-                    widget.load_thumbnail()
-
-    def showEvent(self, _):
-        self.update_visible_widgets()
+        if not top.isValid():
+            return
+        bottom = self.indexAt(rect.bottomLeft())
+        if bottom.isValid():
+            last = bottom.row()
+        else:
+            last = self.model().rowCount() - 1
+        for row in range(top.row(), last + 1):
+            self.model().update_details(row)
 
 
 class HistoryView(QWidget):
-    def __init__(self, gateway, deduplicate=True, max_items=30):
+    def __init__(self, gateway, deduplicate=True, max_items=None):
         super(HistoryView, self).__init__()
         layout = QGridLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
-        layout.addWidget(HistoryListWidget(gateway, deduplicate, max_items))
+        layout.addWidget(HistoryListView(gateway, deduplicate, max_items))
         layout.addWidget(StatusPanel(gateway))
@@ -3,11 +3,11 @@
 import os
 import sys
 
-from PyQt5.QtCore import QItemSelectionModel, QFileInfo, QSize, Qt
+from PyQt5.QtCore import QItemSelectionModel, QSize, Qt
 from PyQt5.QtGui import QFont, QIcon, QKeySequence
 from PyQt5.QtWidgets import (
-    QAction, QComboBox, QFileIconProvider, QGridLayout, QMainWindow, QMenu,
-    QMessageBox, QShortcut, QSizePolicy, QStackedWidget, QToolButton, QWidget)
+    QAction, QComboBox, QGridLayout, QMainWindow, QMenu, QMessageBox,
+    QShortcut, QSizePolicy, QStackedWidget, QToolButton, QWidget)
 from twisted.internet import reactor
 
 from gridsync import resource, APP_NAME, config_dir
@@ -15,7 +15,7 @@ from gridsync.msg import error, info
 from gridsync.recovery import RecoveryKeyExporter
 from gridsync.gui.history import HistoryView
 from gridsync.gui.welcome import WelcomeDialog
-from gridsync.gui.widgets import CompositePixmap
+from gridsync.gui.widgets import get_composite_icon, get_file_icon
 from gridsync.gui.share import InviteReceiverDialog, InviteSenderDialog
 from gridsync.gui.status import StatusPanel
 from gridsync.gui.view import View
@@ -110,10 +110,8 @@ class MainWindow(QMainWindow):
         else:
             font.setPointSize(8)
 
-        folder_icon_default = QFileIconProvider().icon(QFileInfo(config_dir))
-        folder_icon_composite = CompositePixmap(
-            folder_icon_default.pixmap(256, 256), resource('green-plus.png'))
-        folder_icon = QIcon(folder_icon_composite)
+        folder_icon = get_composite_icon(
+            get_file_icon(config_dir), resource('green-plus.png'))
 
         folder_action = QAction(folder_icon, "Add folder", self)
         folder_action.setToolTip("Add a folder...")
@@ -318,7 +316,7 @@ class MainWindow(QMainWindow):
     def on_invite_received(self, gateway):
         self.populate([gateway])
         for view in self.central_widget.views:
-            view.model().monitor.scan_rootcap('star.png')
+            view.gateway.monitor.scan_rootcap('star.png')
 
     def on_invite_closed(self, obj):
         try:
@@ -350,10 +348,10 @@ class MainWindow(QMainWindow):
     def confirm_quit(self):
         folder_loading = False
         folder_syncing = False
-        for model in [view.model() for view in self.central_widget.views]:
+        for model in [view.source_model for view in self.central_widget.views]:
             for row in range(model.rowCount()):
-                status = model.item(row, 1).data(Qt.UserRole)
-                mtime = model.item(row, 2).data(Qt.UserRole)
+                status = model.index(row, 1).data(Qt.UserRole)
+                mtime = model.index(row, 2).data(Qt.UserRole)
                 if not status and not mtime:  # "Loading..." and not yet synced
                     folder_loading = True
                     break
@@ -1,49 +1,57 @@
 # -*- coding: utf-8 -*-
 
-from datetime import datetime
 import logging
 import os
-import sys
 import time
 
-from humanize import naturalsize, naturaltime
-from PyQt5.QtCore import pyqtSlot, QFileInfo, QSize, Qt
-from PyQt5.QtGui import QColor, QIcon, QStandardItem, QStandardItemModel
-from PyQt5.QtWidgets import QAction, QFileIconProvider, QToolBar
+from humanize import naturalsize
+from PyQt5.QtCore import pyqtSlot, QAbstractTableModel, QModelIndex, QSize, Qt
+from PyQt5.QtGui import QColor, QFont, QIcon
 
 from gridsync import resource, config_dir
-from gridsync.gui.widgets import CompositePixmap
+from gridsync.gui.ticker import get_ticker, natural_time
+from gridsync.gui.widgets import get_composite_icon, get_file_icon
 from gridsync.preferences import get_preference
 from gridsync.util import humanized_list
 
 
-class Model(QStandardItemModel):
+# The time at which a "Last modified" cell's text will next change
+NATURAL_TIME_DEADLINE_ROLE = Qt.UserRole + 1
+
+
+class Model(QAbstractTableModel):
     def __init__(self, view):
-        super(Model, self).__init__(0, 5)
+        super(Model, self).__init__()
         self.view = view
         self.gui = self.view.gui
         self.gateway = self.view.gateway
         self.monitor = self.gateway.monitor
         self.status_dict = {}
+        # Folders whose status cells are currently animated by the Delegate
+        self.loading_folders = set()
+        self.syncing_folders = set()
         self.members_dict = {}
         self.grid_status = ''
         self.available_space = 0
-        self.setHeaderData(0, Qt.Horizontal, "Name")
-        self.setHeaderData(1, Qt.Horizontal, "Status")
-        self.setHeaderData(2, Qt.Horizontal, "Last modified")
-        self.setHeaderData(3, Qt.Horizontal, "Size")
-        self.setHeaderData(4, Qt.Horizontal, "")
+        self.headers = ["Name", "Status", "Last modified", "Size", ""]
+        # Each row is a list of per-column {role: value} dicts; folder names
+        # are mapped to their row numbers so that slots can find them in O(1)
+        self.rows = []
+        self.row_index = {}
 
         self.icon_blank = QIcon()
         self.icon_up_to_date = QIcon(resource('checkmark.png'))
         self.icon_user = QIcon(resource('user.png'))
-        self.icon_folder = QFileIconProvider().icon(QFileInfo(config_dir))
-        composite_pixmap = CompositePixmap(
-            self.icon_folder.pixmap(256, 256), overlay=None, grayout=True)
-        self.icon_folder_gray = QIcon(composite_pixmap)
+        self.icon_folder = get_file_icon(config_dir)
+        self.icon_folder_gray = get_composite_icon(
+            self.icon_folder, grayout=True)
         self.icon_cloud = QIcon(resource('cloud-icon.png'))
         self.icon_action = QIcon(resource('dots-horizontal-triple.png'))
 
+        self.font_faded = QFont()
+        self.font_faded.setItalic(True)
+        self.color_faded = QColor('gray')
+
         self.monitor.connected.connect(self.on_connected)
         self.monitor.disconnected.connect(self.on_disconnected)
         self.monitor.nodes_updated.connect(self.on_nodes_updated)
@@ -55,11 +63,52 @@ class Model(QStandardItemModel):
         self.monitor.sync_started.connect(self.on_sync_started)
         self.monitor.sync_finished.connect(self.on_sync_finished)
         self.monitor.files_updated.connect(self.on_updated_files)
-        self.monitor.check_finished.connect(self.update_natural_times)
         self.monitor.remote_folder_added.connect(self.add_remote_folder)
         self.monitor.transfer_progress_updated.connect(
             self.set_transfer_progress)
 
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.SizeHintRole:
+            return QSize(0, 30)
+        if not index.isValid():
+            return None
+        return self.rows[index.row()][index.column()].get(role)
+
+    def get_row(self, folder_name):
+        return self.row_index.get(folder_name)
+
+    def set_data(self, row, column, values):
+        cell = self.rows[row][column]
+        changed = []
+        for role, value in values.items():
+            current = cell.get(role)
+            if current is value or (
+                    current == value and type(current) is type(value)):
+                continue
+            if value is None:
+                del cell[role]
+            else:
+                cell[role] = value
+            changed.append(role)
+        if changed:
+            index = self.index(row, column)
+            self.dataChanged.emit(index, index, changed)
+
     def on_space_updated(self, size):
         self.available_space = size
 
@@ -105,86 +154,88 @@ class Model(QStandardItemModel):
                 )
             )
 
-    def data(self, index, role):
-        value = super(Model, self).data(index, role)
-        if role == Qt.SizeHintRole:
-            return QSize(0, 30)
-        return value
-
     def add_folder(self, path, status_data=0):
         basename = os.path.basename(os.path.normpath(path))
-        if self.findItems(basename):
+        if basename in self.row_index:
             logging.warning(
                 "Tried to add a folder (%s) that already exists", basename)
             return
-        composite_pixmap = CompositePixmap(self.icon_folder.pixmap(256, 256))
-        name = QStandardItem(QIcon(composite_pixmap), basename)
-        name.setToolTip(path)
-        status = QStandardItem()
-        mtime = QStandardItem()
-        size = QStandardItem()
-        action = QStandardItem()
-        self.appendRow([name, status, mtime, size, action])
-        action_bar = QToolBar()
-        action_bar.setIconSize(QSize(16, 16))
-        if sys.platform == 'darwin':
-            # See: https://bugreports.qt.io/browse/QTBUG-12717
-            action_bar.setStyleSheet(
-                'background-color: white; border: 0px white')
-        action_bar_action = QAction(self.icon_action, "Action...", self)
-        action_bar_action.setStatusTip("Action...")
-        action_bar_action.triggered.connect(self.view.on_right_click)
-        action_bar.addAction(action_bar_action)
-        self.view.setIndexWidget(action.index(), action_bar)
+        row = len(self.rows)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.rows.append([
+            {
+                Qt.DisplayRole: basename,
+                Qt.DecorationRole: get_composite_icon(self.icon_folder),
+                Qt.ToolTipRole: path,
+                Qt.UserRole: basename
+            },
+            {},
+            {},
+            {},
+            {Qt.DecorationRole: self.icon_action, Qt.ToolTipRole: "Action..."}
+        ])
+        self.row_index[basename] = row
+        self.endInsertRows()
         self.view.hide_drop_label()
         self.set_status(basename, status_data)
 
     def remove_folder(self, folder_name):
-        items = self.findItems(folder_name)
-        if items:
-            self.removeRow(items[0].row())
+        row = self.row_index.get(folder_name)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.rows[row]
+        del self.row_index[folder_name]
+        for i in range(row, len(self.rows)):
+            self.row_index[self.rows[i][0][Qt.DisplayRole]] = i
+        self.endRemoveRows()
+        self.status_dict.pop(folder_name, None)
+        self.loading_folders.discard(folder_name)
+        self.syncing_folders.discard(folder_name)
 
     def populate(self):
         for magic_folder in list(self.gateway.load_magic_folders().values()):
             self.add_folder(magic_folder['directory'])
 
     def update_folder_icon(self, folder_name, folder_path, overlay_file=None):
-        items = self.findItems(folder_name)
-        if items:
-            if folder_path:
-                folder_icon = QFileIconProvider().icon(QFileInfo(folder_path))
-            else:
-                folder_icon = self.icon_folder_gray
-            folder_pixmap = folder_icon.pixmap(256, 256)
-            if overlay_file:
-                pixmap = CompositePixmap(folder_pixmap, resource(overlay_file))
-            else:
-                pixmap = CompositePixmap(folder_pixmap)
-            items[0].setIcon(QIcon(pixmap))
+        row = self.row_index.get(folder_name)
+        if row is None:
+            return
+        if folder_path:
+            folder_icon = get_file_icon(folder_path)
+        else:
+            folder_icon = self.icon_folder_gray
+        if overlay_file:
+            icon = get_composite_icon(folder_icon, resource(overlay_file))
+        else:
+            icon = get_composite_icon(folder_icon)
+        self.set_data(row, 0, {Qt.DecorationRole: icon})
 
     def set_status_private(self, folder_name):
-        self.update_folder_icon(
-            folder_name, self.gateway.get_magic_folder_directory(folder_name))
-        items = self.findItems(folder_name)
-        if items:
-            items[0].setToolTip(
+        row = self.row_index.get(folder_name)
+        if row is None:
+            return
+        directory = self.gateway.get_magic_folder_directory(folder_name)
+        self.update_folder_icon(folder_name, directory)
+        self.set_data(row, 0, {
+            Qt.ToolTipRole:
                 "{}\n\nThis folder is private; only you can view and\nmodify "
                 "its contents.".format(
-                    self.gateway.get_magic_folder_directory(folder_name)
-                    or folder_name + " (Stored remotely)"))
+                    directory or folder_name + " (Stored remotely)")
+        })
 
     def set_status_shared(self, folder_name):
-        self.update_folder_icon(
-            folder_name,
-            self.gateway.get_magic_folder_directory(folder_name),
-            'user.png')
-        items = self.findItems(folder_name)
-        if items:
-            items[0].setToolTip(
+        row = self.row_index.get(folder_name)
+        if row is None:
+            return
+        directory = self.gateway.get_magic_folder_directory(folder_name)
+        self.update_folder_icon(folder_name, directory, 'user.png')
+        self.set_data(row, 0, {
+            Qt.ToolTipRole:
                 "{}\n\nThis folder is shared; at least one other person\nor "
                 "device can view and modify its contents.".format(
-                    self.gateway.get_magic_folder_directory(folder_name)
-                    or folder_name + " (Stored remotely)"))
+                    directory or folder_name + " (Stored remotely)")
+        })
 
     def update_overlay(self, folder_name):
         members = self.members_dict.get(folder_name)
@@ -200,47 +251,66 @@ class Model(QStandardItemModel):
 
     @pyqtSlot(str, int)
     def set_status(self, name, status):
-        items = self.findItems(name)
-        if not items:
+        row = self.row_index.get(name)
+        if row is None:
             return
-        item = self.item(items[0].row(), 1)
         if not status:
-            item.setIcon(self.icon_blank)
-            item.setText("Loading...")
+            values = {
+                Qt.DecorationRole: self.icon_blank,
+                Qt.DisplayRole: "Loading..."
+            }
         elif status == 1:
-            item.setIcon(self.icon_blank)
-            item.setText("Syncing")
-            item.setToolTip(
-                "This folder is syncing. New files are being uploaded or "
-                "downloaded.")
+            values = {
+                Qt.DecorationRole: self.icon_blank,
+                Qt.DisplayRole: "Syncing",
+                Qt.ToolTipRole:
+                    "This folder is syncing. New files are being uploaded or "
+                    "downloaded."
+            }
         elif status == 2:
-            item.setIcon(self.icon_up_to_date)
-            item.setText("Up to date")
-            item.setToolTip(
-                'This folder is up to date. The contents of this folder on\n'
-                'your computer matches the contents of the folder on the\n'
-                '"{}" grid.'.format(self.gateway.name))
+            values = {
+                Qt.DecorationRole: self.icon_up_to_date,
+                Qt.DisplayRole: "Up to date",
+                Qt.ToolTipRole:
+                    'This folder is up to date. The contents of this folder '
+                    'on\nyour computer matches the contents of the folder on '
+                    'the\n"{}" grid.'.format(self.gateway.name)
+            }
             self.update_overlay(name)
             self.unfade_row(name)
         elif status == 3:
-            item.setIcon(self.icon_cloud)
-            item.setText("Stored remotely")
-            item.setToolTip(
-                'This folder is stored remotely on the "{}" grid.\n'
-                'Right-click and select "Download" to sync it with your '
-                'local computer.'.format(self.gateway.name))
+            values = {
+                Qt.DecorationRole: self.icon_cloud,
+                Qt.DisplayRole: "Stored remotely",
+                Qt.ToolTipRole:
+                    'This folder is stored remotely on the "{}" grid.\n'
+                    'Right-click and select "Download" to sync it with your '
+                    'local computer.'.format(self.gateway.name)
+            }
         elif status == 99:
-            item.setIcon(self.icon_blank)
-            item.setText("Scanning")
-            item.setToolTip(
-                "This folder is being scanned for changes.")
-        item.setData(status, Qt.UserRole)
+            values = {
+                Qt.DecorationRole: self.icon_blank,
+                Qt.DisplayRole: "Scanning",
+                Qt.ToolTipRole: "This folder is being scanned for changes."
+            }
+        else:
+            values = {}
+        values[Qt.UserRole] = status
+        self.set_data(row, 1, values)
         self.status_dict[name] = status
+        if not status:
+            self.loading_folders.add(name)
+        else:
+            self.loading_folders.discard(name)
+        if status in (1, 99):
+            self.syncing_folders.add(name)
+        else:
+            self.syncing_folders.discard(name)
 
     @pyqtSlot(str, object, object)
     def set_transfer_progress(self, folder_name, transferred, total):
-        items = self.findItems(folder_name)
-        if not items:
+        row = self.row_index.get(folder_name)
+        if row is None:
             return
         percent_done = int(transferred / total * 100)
         if not percent_done:
@@ -262,35 +332,27 @@ class Model(QStandardItemModel):
             # that it's better to have a couple of seconds of no progress
             # updates than a progress update which is wrong or misleading).
             return
-        item = self.item(items[0].row(), 1)
-        item.setText("Syncing ({}%)".format(percent_done))
+        self.set_data(
+            row, 1, {Qt.DisplayRole: "Syncing ({}%)".format(percent_done)})
 
     def fade_row(self, folder_name, overlay_file=None):
-        folder_item = self.findItems(folder_name)[0]
+        row = self.row_index[folder_name]
         if overlay_file:
-            folder_pixmap = self.icon_folder_gray.pixmap(256, 256)
-            pixmap = CompositePixmap(folder_pixmap, resource(overlay_file))
-            folder_item.setIcon(QIcon(pixmap))
+            icon = get_composite_icon(
+                self.icon_folder_gray, resource(overlay_file))
+            self.set_data(row, 0, {Qt.DecorationRole: icon})
         else:
-            folder_item.setIcon(self.icon_folder_gray)
-        row = folder_item.row()
+            self.set_data(row, 0, {Qt.DecorationRole: self.icon_folder_gray})
         for i in range(4):
-            item = self.item(row, i)
-            font = item.font()
-            font.setItalic(True)
-            item.setFont(font)
-            item.setForeground(QColor('gray'))
+            self.set_data(row, i, {
+                Qt.FontRole: self.font_faded,
+                Qt.ForegroundRole: self.color_faded
+            })
 
     def unfade_row(self, folder_name):
-        default_foreground = QStandardItem().foreground()
-        folder_item = self.findItems(folder_name)[0]
-        row = folder_item.row()
+        row = self.row_index[folder_name]
         for i in range(4):
-            item = self.item(row, i)
-            font = item.font()
-            font.setItalic(False)
-            item.setFont(font)
-            item.setForeground(default_foreground)
+            self.set_data(row, i, {Qt.FontRole: None, Qt.ForegroundRole: None})
 
     @pyqtSlot(str)
     def on_sync_started(self, folder_name):
@@ -308,30 +370,41 @@ class Model(QStandardItemModel):
     def set_mtime(self, name, mtime):
         if not mtime:
             return
-        items = self.findItems(name)
-        if items:
-            item = self.item(items[0].row(), 2)
-            item.setData(mtime, Qt.UserRole)
-            item.setText(
-                naturaltime(datetime.now() - datetime.fromtimestamp(mtime)))
-            item.setToolTip("Last modified: {}".format(time.ctime(mtime)))
+        row = self.row_index.get(name)
+        if row is not None:
+            text, deadline = natural_time(mtime)
+            self.set_data(row, 2, {
+                Qt.UserRole: mtime,
+                Qt.DisplayRole: text,
+                Qt.ToolTipRole: "Last modified: {}".format(time.ctime(mtime))
+            })
+            self.rows[row][2][NATURAL_TIME_DEADLINE_ROLE] = deadline
+            get_ticker().schedule(deadline)
 
     @pyqtSlot(str, object)
     def set_size(self, name, size):
-        items = self.findItems(name)
-        if items:
-            item = self.item(items[0].row(), 3)
-            item.setText(naturalsize(size))
-            item.setData(size, Qt.UserRole)
+        row = self.row_index.get(name)
+        if row is not None:
+            self.set_data(row, 3, {
+                Qt.DisplayRole: naturalsize(size),
+                Qt.UserRole: size
+            })
 
-    @pyqtSlot()
-    def update_natural_times(self):
-        for i in range(self.rowCount()):
-            item = self.item(i, 2)
-            data = item.data(Qt.UserRole)
-            if data:
-                item.setText(
-                    naturaltime(datetime.now() - datetime.fromtimestamp(data)))
+    def update_natural_time(self, row):
+        cell = self.rows[row][2]
+        mtime = cell.get(Qt.UserRole)
+        if not mtime:
+            return
+        now = time.time()
+        if now < cell[NATURAL_TIME_DEADLINE_ROLE]:
+            return
+        text, deadline = natural_time(mtime, now)
+        cell[NATURAL_TIME_DEADLINE_ROLE] = deadline
+        get_ticker().schedule(deadline)
+        if text != cell.get(Qt.DisplayRole):
+            cell[Qt.DisplayRole] = text
+            index = self.index(row, 2)
+            self.dataChanged.emit(index, index, [Qt.DisplayRole])
 
     @pyqtSlot(str, str)
     def add_remote_folder(self, folder_name, overlay_file=None):
@@ -8,6 +8,8 @@ from PyQt5.QtWidgets import (
     QWidget)
 
 from gridsync import resource
+from gridsync.breaker import CircuitBreaker
+from gridsync.supervisor import Supervisor
 
 
 class StatusPanel(QWidget):
@@ -18,6 +20,7 @@ class StatusPanel(QWidget):
         self.num_connected = 0
         self.num_known = 0
         self.available_space = 0
+        self.sync_state = 0
 
         self.checkmark_icon = QLabel()
         self.checkmark_icon.setPixmap(
@@ -79,8 +82,15 @@ class StatusPanel(QWidget):
         )
         self.gateway.monitor.space_updated.connect(self.on_space_updated)
         self.gateway.monitor.nodes_updated.connect(self.on_nodes_updated)
+        self.gateway.monitor.circuit_state_changed.connect(
+            self.on_circuit_state_changed
+        )
+        self.gateway.monitor.supervisor_state_changed.connect(
+            self.on_supervisor_state_changed
+        )
 
     def on_sync_state_updated(self, state):
+        self.sync_state = state
         if state == 0:
             self.status_label.setText("Connecting...")
             self.sync_movie.setPaused(True)
@@ -97,6 +107,26 @@ class StatusPanel(QWidget):
             self.syncing_icon.hide()
             self.checkmark_icon.show()
 
+    def show_problem(self, text):
+        self.status_label.setText(text)
+        self.sync_movie.setPaused(True)
+        self.syncing_icon.hide()
+        self.checkmark_icon.hide()
+
+    def on_circuit_state_changed(self, state):
+        if state == CircuitBreaker.OPEN:
+            self.show_problem("Unable to reach Tahoe-LAFS; retrying...")
+        elif state == CircuitBreaker.CLOSED:
+            self.on_sync_state_updated(self.sync_state)
+
+    def on_supervisor_state_changed(self, state):
+        if state == Supervisor.DEGRADED:
+            self.show_problem("Restarting Tahoe-LAFS...")
+        elif state == Supervisor.FAILED:
+            self.show_problem("Tahoe-LAFS keeps stopping unexpectedly")
+        elif state == Supervisor.RUNNING:
+            self.on_sync_state_updated(self.sync_state)
+
     def _update_grid_info_tooltip(self):
         if self.available_space:
             self.globe_action.setToolTip(
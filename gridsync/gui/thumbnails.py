@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import logging
+import os
+import threading
+
+from PyQt5.QtCore import QSize
+from PyQt5.QtGui import QImage, QImageReader, QPixmap
+from twisted.internet.defer import DeferredSemaphore
+from twisted.internet.threads import deferToThread
+
+from gridsync import config_dir
+
+
+def to_pixmap(image):
+    if image is None:
+        return None
+    return QPixmap.fromImage(image)
+
+
+class ThumbnailCache(object):
+    def __init__(self, directory=None, max_size=32 * 1024 * 1024):
+        self.directory = directory or os.path.join(config_dir, 'thumbnails')
+        self.max_size = max_size
+        self.size = None  # Total size on disk; unknown until first scanned
+        self.lock = threading.Lock()
+
+    def path_for(self, path, mtime, size, width, height):
+        key = '{}:{}:{}:{}x{}'.format(path, mtime, size, width, height)
+        return os.path.join(
+            self.directory,
+            hashlib.sha256(key.encode('utf-8')).hexdigest() + '.png')
+
+    def get(self, cache_path):
+        if not os.path.exists(cache_path):
+            return None
+        image = QImage(cache_path)
+        if image.isNull():
+            return None
+        try:
+            os.utime(cache_path, None)  # Mark as recently used for eviction
+        except OSError:
+            pass
+        return image
+
+    def put(self, cache_path, image):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = cache_path + '.tmp{}'.format(threading.get_ident())
+        if not image.save(tmp_path, 'PNG'):
+            return
+        with self.lock:
+            try:
+                old_size = os.path.getsize(cache_path)  # Being replaced
+            except OSError:
+                old_size = 0
+            os.replace(tmp_path, cache_path)
+            if self.size is None:
+                self.size = self._scan()[1]
+            else:
+                self.size += os.path.getsize(cache_path) - old_size
+            if self.size > self.max_size:
+                self.evict()
+
+    def _scan(self):
+        entries = []
+        total = 0
+        try:
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith('.png'):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        except OSError:
+            pass
+        return entries, total
+
+    def evict(self):
+        # Remove least-recently-used entries until the cache is comfortably
+        # below its limit so that eviction doesn't run on every insertion
+        entries, self.size = self._scan()
+        target = int(self.max_size * 0.75)
+        for _, size, path in sorted(entries):
+            if self.size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size -= size
+        logging.debug("Thumbnail cache evicted to %i bytes", self.size)
+
+
+class ThumbnailLoader(object):
+    def __init__(self, cache=None, size=48, max_concurrency=2):
+        self.cache = cache or ThumbnailCache()
+        self.size = size
+        self.semaphore = DeferredSemaphore(max_concurrency)
+
+    def read(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        cache_path = self.cache.path_for(
+            path, stat.st_mtime, stat.st_size, self.size, self.size)
+        image = self.cache.get(cache_path)
+        if image is not None:
+            return image
+        reader = QImageReader(path)
+        if not reader.canRead():
+            return None
+        # Decoders like JPEG can skip most of the work at reduced sizes
+        reader.setScaledSize(QSize(self.size, self.size))
+        image = reader.read()
+        if image.isNull():
+            return None
+        try:
+            self.cache.put(cache_path, image)
+        except OSError as e:
+            logging.warning("Error caching thumbnail: %s", str(e))
+        return image
+
+    def load(self, path):
+        # QImage, unlike QPixmap, is safe to use outside of the GUI thread so
+        # decoding happens in the reactor's threadpool; the conversion back to
+        # a QPixmap happens in the callback (i.e., in the main thread).
+        d = self.semaphore.run(deferToThread, self.read, path)
+        d.addCallback(to_pixmap)
+        return d
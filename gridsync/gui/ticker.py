@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+import heapq
+import math
+import time
+
+from humanize import naturaltime
+from PyQt5.QtCore import pyqtSignal, QObject, QTimer
+
+
+def seconds_until_change(delta):
+    # humanize.naturaltime() only changes its output when the elapsed time
+    # crosses a second, minute, hour or day boundary (depending on how much
+    # time has elapsed), so there is no need to re-render before then. Older
+    # versions of humanize truncate to the unit while newer versions round,
+    # so wake up on every half-unit to be correct for both.
+    if delta < 60:
+        return 1
+    if delta < 3600:
+        step = 30
+    elif delta < 86400:
+        step = 1800
+    else:
+        step = 43200
+    return step - delta % step
+
+
+def natural_time(timestamp, now=None):
+    if now is None:
+        now = time.time()
+    delta = now - timestamp
+    text = naturaltime(
+        datetime.fromtimestamp(now) - datetime.fromtimestamp(timestamp))
+    return text, now + seconds_until_change(delta)
+
+
+class Ticker(QObject):
+
+    tick = pyqtSignal()
+
+    def __init__(self):
+        super(Ticker, self).__init__()
+        # Every pending deadline is kept (in a heap) so that, once the
+        # earliest of them has passed, the timer can be re-armed for the next
+        # one -- rows that weren't due yet when a tick was emitted don't
+        # schedule themselves again
+        self.deadlines = []
+        self.pending = set()
+        self.deadline = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.on_timeout)
+
+    def _start_timer(self, deadline):
+        self.deadline = deadline
+        self.timer.start(
+            max(0, int(math.ceil((deadline - time.time()) * 1000))))
+
+    def schedule(self, deadline):
+        if deadline in self.pending:
+            return
+        self.pending.add(deadline)
+        heapq.heappush(self.deadlines, deadline)
+        if self.deadline is None or deadline < self.deadline:
+            self._start_timer(deadline)
+
+    def on_timeout(self):
+        now = time.time()
+        while self.deadlines and self.deadlines[0] <= now:
+            self.pending.discard(heapq.heappop(self.deadlines))
+        if self.deadlines:
+            self._start_timer(self.deadlines[0])
+        else:
+            self.deadline = None
+        self.tick.emit()
+
+
+_ticker = None
+
+
+def get_ticker():
+    global _ticker  # pylint: disable=global-statement
+    if _ticker is None:
+        _ticker = Ticker()
+    return _ticker
@@ -4,18 +4,21 @@ import logging
 import os
 import sys
 
-from PyQt5.QtCore import QEvent, QItemSelectionModel, QPoint, QSize, Qt
+from PyQt5.QtCore import (
+    QEvent, QItemSelectionModel, QPoint, QSize, QSortFilterProxyModel, Qt)
 from PyQt5.QtGui import QCursor, QFont, QIcon, QMovie, QPixmap
 from PyQt5.QtWidgets import (
     QAbstractItemView, QAction, QCheckBox, QFileDialog, QGridLayout,
     QHeaderView, QLabel, QMenu, QMessageBox, QPushButton, QSizePolicy,
     QSpacerItem, QStyledItemDelegate, QTreeView)
 from twisted.internet.defer import DeferredList, inlineCallbacks
+from twisted.python.failure import Failure
 
 from gridsync import resource, APP_NAME
 from gridsync.desktop import open_path
 from gridsync.gui.model import Model
 from gridsync.gui.share import InviteSenderDialog
+from gridsync.gui.ticker import get_ticker
 from gridsync.msg import error
 from gridsync.util import humanized_list
 
@@ -26,18 +29,46 @@ class Delegate(QStyledItemDelegate):
         self.parent = parent
         self.waiting_movie = QMovie(resource('waiting.gif'))
         self.waiting_movie.setCacheMode(True)
-        self.waiting_movie.frameChanged.connect(self.on_frame_changed)
+        self.waiting_frames = self.scale_frames(self.waiting_movie)
+        self.waiting_movie.frameChanged.connect(
+            lambda _: self.on_frame_changed(
+                self.waiting_movie, self.parent.source_model.loading_folders))
         self.sync_movie = QMovie(resource('sync.gif'))
         self.sync_movie.setCacheMode(True)
-        self.sync_movie.frameChanged.connect(self.on_frame_changed)
-
-    def on_frame_changed(self):
-        values = self.parent.model().status_dict.values()
-        if 0 in values or 1 in values or 99 in values:
-            self.parent.viewport().update()
-        else:
-            self.waiting_movie.setPaused(True)
-            self.sync_movie.setPaused(True)
+        self.sync_frames = self.scale_frames(self.sync_movie)
+        self.sync_movie.frameChanged.connect(
+            lambda _: self.on_frame_changed(
+                self.sync_movie, self.parent.source_model.syncing_folders))
+
+    @staticmethod
+    def scale_frames(movie, size=20):
+        frames = []
+        for i in range(movie.frameCount()):
+            movie.jumpToFrame(i)
+            frames.append(movie.currentPixmap().scaled(size, size))
+        movie.jumpToFrame(0)
+        return frames
+
+    def on_frame_changed(self, movie, folders):
+        if not folders:
+            movie.setPaused(True)
+            return
+        model = self.parent.source_model
+        viewport = self.parent.viewport()
+        viewport_rect = viewport.rect()
+        for folder in folders:
+            index = self.parent.proxy_model.mapFromSource(
+                model.index(model.get_row(folder), 1))
+            rect = self.parent.visualRect(index)
+            if rect.intersects(viewport_rect):
+                viewport.update(rect)
+
+    @staticmethod
+    def current_frame(movie, frames):
+        movie.setPaused(False)
+        if not frames:  # Frame count unknown; fall back to scaling each time
+            return movie.currentPixmap().scaled(20, 20)
+        return frames[max(0, movie.currentFrameNumber()) % len(frames)]
 
     def paint(self, painter, option, index):
         column = index.column()
@@ -45,11 +76,10 @@ class Delegate(QStyledItemDelegate):
             pixmap = None
             status = index.data(Qt.UserRole)
             if not status:  # "Loading..."
-                self.waiting_movie.setPaused(False)
-                pixmap = self.waiting_movie.currentPixmap().scaled(20, 20)
+                pixmap = self.current_frame(
+                    self.waiting_movie, self.waiting_frames)
             elif status in (1, 99):  # "Syncing", "Scanning"
-                self.sync_movie.setPaused(False)
-                pixmap = self.sync_movie.currentPixmap().scaled(20, 20)
+                pixmap = self.current_frame(self.sync_movie, self.sync_frames)
             if pixmap:
                 point = option.rect.topLeft()
                 painter.drawPixmap(QPoint(point.x(), point.y() + 5), pixmap)
@@ -65,7 +95,13 @@ class View(QTreeView):
         self.invite_sender_dialogs = []
         self._rescan_required = False
         self._restart_required = False
-        self.setModel(Model(self))
+        self.source_model = Model(self)
+        self.proxy_model = QSortFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.source_model)
+        self.proxy_model.setSortRole(Qt.UserRole)
+        self.proxy_model.setFilterKeyColumn(0)
+        self.proxy_model.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.setModel(self.proxy_model)
         self.setItemDelegate(Delegate(self))
 
         self.setAcceptDrops(True)
@@ -143,13 +179,17 @@ class View(QTreeView):
         layout.addItem(QSpacerItem(0, 0, QSizePolicy.Expanding, 0), 8, 3)
         layout.addItem(QSpacerItem(0, 0, 0, QSizePolicy.Expanding), 9, 1)
 
+        self.clicked.connect(self.on_click)
         self.doubleClicked.connect(self.on_double_click)
         self.customContextMenuRequested.connect(self.on_right_click)
+        get_ticker().tick.connect(self.update_natural_times)
+        self.verticalScrollBar().valueChanged.connect(
+            self.update_natural_times)
 
-        self.model().populate()
+        self.source_model.populate()
 
     def show_drop_label(self, _=None):
-        if not self.model().rowCount():
+        if not self.source_model.rowCount():
             self.setHeaderHidden(True)
             self.drop_outline.show()
             self.drop_icon.show()
@@ -165,9 +205,34 @@ class View(QTreeView):
         self.drop_subtext.hide()
         self.select_folder_button.hide()
 
+    def showEvent(self, event):
+        # Rows aren't refreshed while hidden (see update_natural_times())
+        for row in range(self.source_model.rowCount()):
+            self.source_model.update_natural_time(row)
+        super(View, self).showEvent(event)
+
+    def update_natural_times(self, _=None):
+        if not self.isVisible():
+            return  # Refreshed when next shown instead
+        rect = self.viewport().rect()
+        top = self.indexAt(rect.topLeft())
+        if not top.isValid():
+            return
+        bottom = self.indexAt(rect.bottomLeft())
+        if bottom.isValid():
+            last = bottom.row()
+        else:
+            last = self.proxy_model.rowCount() - 1
+        for row in range(top.row(), last + 1):
+            index = self.proxy_model.mapToSource(self.proxy_model.index(row, 0))
+            self.source_model.update_natural_time(index.row())
+
+    def on_click(self, index):
+        if index.column() == 4:  # "Action..."
+            self.on_right_click(self.visualRect(index).center())
+
     def on_double_click(self, index):
-        item = self.model().itemFromIndex(index)
-        name = self.model().item(item.row(), 0).text()
+        name = index.sibling(index.row(), 0).data()
         if name in self.gateway.magic_folders:
             open_path(self.gateway.magic_folders[name]['directory'])
         elif self.gateway.remote_magic_folder_exists(name):
@@ -192,8 +257,8 @@ class View(QTreeView):
     def maybe_restart_gateway(self, _):
         if self._restart_required:
             self._restart_required = False
-            logging.debug("A restart was scheduled; restarting...")
-            yield self.gateway.restart()
+            logging.debug("A restart was scheduled; requesting restart...")
+            yield self.gateway.restarter.request()
         else:
             logging.debug("No restarts were scheduled; not restarting")
 
@@ -221,7 +286,7 @@ class View(QTreeView):
         tasks = []
         for folder in folders:
             tasks.append(self.download_folder(folder, dest))
-        d = DeferredList(tasks)
+        d = self.gateway.restarter.track(DeferredList(tasks))
         d.addCallback(self.maybe_restart_gateway)
 
     def show_failure(self, failure):
@@ -245,7 +310,7 @@ class View(QTreeView):
                 )
             )
             return
-        self.model().remove_folder(folder_name)
+        self.source_model.remove_folder(folder_name)
         self._rescan_required = True
         logging.debug(
             'Successfully unlinked folder "%s"; scheduled rescan', folder_name)
@@ -290,7 +355,7 @@ class View(QTreeView):
                 )
             )
             return
-        self.model().remove_folder(folder_name)
+        self.source_model.remove_folder(folder_name)
         self._restart_required = True
         logging.debug(
             'Successfully removed folder "%s"; scheduled restart', folder_name)
@@ -331,7 +396,7 @@ class View(QTreeView):
             else:
                 for folder in folders:
                     tasks.append(self.remove_folder(folder, unlink=False))
-            d = DeferredList(tasks)
+            d = self.gateway.restarter.track(DeferredList(tasks))
             d.addCallback(self.maybe_rescan_rootcap)
             d.addCallback(self.maybe_restart_gateway)
 
@@ -345,8 +410,7 @@ class View(QTreeView):
         selected = self.selectedIndexes()
         if selected:
             for index in selected:
-                item = self.model().itemFromIndex(index)
-                folder = self.model().item(item.row(), 0).text()
+                folder = index.sibling(index.row(), 0).data()
                 if self.gateway.magic_folders.get(folder):
                     self.selectionModel().select(
                         index, QItemSelectionModel.Deselect)
@@ -355,8 +419,7 @@ class View(QTreeView):
         selected = self.selectedIndexes()
         if selected:
             for index in selected:
-                item = self.model().itemFromIndex(index)
-                folder = self.model().item(item.row(), 0).text()
+                folder = index.sibling(index.row(), 0).data()
                 if not self.gateway.magic_folders.get(folder):
                     self.selectionModel().select(
                         index, QItemSelectionModel.Deselect)
@@ -366,18 +429,17 @@ class View(QTreeView):
         selected = self.selectedIndexes()
         if selected:
             for index in selected:
-                item = self.model().itemFromIndex(index)
-                if item.column() == 0:
-                    folders.append(item.text())
+                if index.column() == 0:
+                    folders.append(index.data())
         return folders
 
     def on_right_click(self, position):
         if not position:
             position = self.viewport().mapFromGlobal(QCursor().pos())
-        cur_item = self.model().itemFromIndex(self.indexAt(position))
-        if not cur_item:
+        cur_index = self.indexAt(position)
+        if not cur_index.isValid():
             return
-        cur_folder = self.model().item(cur_item.row(), 0).text()
+        cur_folder = cur_index.sibling(cur_index.row(), 0).data()
 
         if self.gateway.magic_folders.get(cur_folder):  # is local folder
             selection_is_remote = False
@@ -398,7 +460,7 @@ class View(QTreeView):
                 lambda: self.select_download_location(selected))
             menu.addAction(download_action)
             menu.addSeparator()
-        open_action = QAction(self.model().icon_folder_gray, "Open")
+        open_action = QAction(self.source_model.icon_folder_gray, "Open")
         open_action.triggered.connect(
             lambda: self.open_folders(selected))
         share_action = QAction(QIcon(resource('share.png')), "Share...")
@@ -424,26 +486,32 @@ class View(QTreeView):
         menu.exec_(self.viewport().mapToGlobal(position))
 
     @inlineCallbacks
-    def add_folder(self, path):
-        path = os.path.realpath(path)
-        self.model().add_folder(path)
-        folder_name = os.path.basename(path)
+    def create_folders(self, paths):
+        paths = [os.path.realpath(path) for path in paths]
+        for path in paths:
+            self.source_model.add_folder(path)
         try:
-            yield self.gateway.create_magic_folder(path)
-        except Exception as e:  # pylint: disable=broad-except
-            error(
-                self,
-                'Error adding folder "{}"'.format(folder_name),
-                'An exception was raised when adding the "{}" folder:\n\n'
-                '{}: {}\n\nPlease try again later.'.format(
-                    folder_name, type(e).__name__, str(e)
+            results = yield self.gateway.create_magic_folders(paths)
+        except Exception:  # pylint: disable=broad-except
+            results = [(False, Failure())] * len(paths)
+        for path, (success, result) in zip(paths, results):
+            folder_name = os.path.basename(path)
+            if not success:
+                error(
+                    self,
+                    'Error adding folder "{}"'.format(folder_name),
+                    'An exception was raised when adding the "{}" folder:'
+                    '\n\n{}: {}\n\nPlease try again later.'.format(
+                        folder_name, result.type.__name__,
+                        result.getErrorMessage()
+                    )
                 )
-            )
-            self.model().remove_folder(folder_name)
-            return
-        self._restart_required = True
-        logging.debug(
-            'Successfully added folder "%s"; scheduled restart', folder_name)
+                self.source_model.remove_folder(folder_name)
+                continue
+            self._restart_required = True
+            logging.debug(
+                'Successfully added folder "%s"; scheduled restart',
+                folder_name)
 
     def add_folders(self, paths):
         paths_to_add = []
@@ -468,10 +536,8 @@ class View(QTreeView):
                 paths_to_add.append(path)
         if paths_to_add:
             self.hide_drop_label()
-            tasks = []
-            for path in paths_to_add:
-                tasks.append(self.add_folder(path))
-            d = DeferredList(tasks)
+            d = self.gateway.restarter.track(
+                self.create_folders(paths_to_add))
             d.addCallback(self.maybe_restart_gateway)
 
     def select_folder(self):
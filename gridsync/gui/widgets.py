@@ -3,12 +3,12 @@
 import json
 import os
 
-from PyQt5.QtCore import QPropertyAnimation, QThread
-from PyQt5.QtGui import QColor, QPainter, QPixmap
+from PyQt5.QtCore import QFileInfo, QPropertyAnimation, QThread
+from PyQt5.QtGui import QColor, QIcon, QPainter, QPixmap
 from PyQt5.QtWidgets import (
-    QComboBox, QDialogButtonBox, QFileDialog, QFormLayout, QGridLayout,
-    QGroupBox, QLabel, QLineEdit, QPlainTextEdit, QProgressDialog, QPushButton,
-    QSizePolicy, QSpacerItem, QSpinBox, QWidget)
+    QComboBox, QDialogButtonBox, QFileDialog, QFileIconProvider, QFormLayout,
+    QGridLayout, QGroupBox, QLabel, QLineEdit, QPlainTextEdit,
+    QProgressDialog, QPushButton, QSizePolicy, QSpacerItem, QSpinBox, QWidget)
 from twisted.internet import reactor
 from twisted.internet.defer import inlineCallbacks
 
@@ -16,6 +16,7 @@ from gridsync.crypto import Crypter
 from gridsync.gui.password import PasswordDialog
 from gridsync.msg import error
 from gridsync.tor import get_tor
+from gridsync.util import LRUCache
 
 
 class CompositePixmap(QPixmap):
@@ -37,6 +38,49 @@ class CompositePixmap(QPixmap):
         self.swap(base_pixmap)
 
 
+file_icon_cache = LRUCache(256)
+file_type_icon_cache = {}
+composite_icon_cache = LRUCache(128)
+
+
+def get_file_icon(path):
+    icon = file_icon_cache.get(path)
+    if icon is None:
+        icon = QFileIconProvider().icon(QFileInfo(path))
+        file_icon_cache.put(path, icon)
+    return icon
+
+
+def get_file_type_icon(path):
+    # Unlike get_file_icon(), this doesn't stat the file itself and assumes
+    # that all files sharing an extension share an icon; this makes it cheap
+    # enough to use for (potentially thousands of) history items
+    if path.endswith(os.sep):
+        key = os.sep
+    else:
+        key = os.path.splitext(path)[1].lower()
+    icon = file_type_icon_cache.get(key)
+    if icon is None:
+        icon = QFileIconProvider().icon(QFileInfo(path))
+        file_type_icon_cache[key] = icon
+    return icon
+
+
+def get_composite_icon(icon, overlay=None, grayout=False, size=256):
+    # Themed icons are keyed by name, others by their cacheKey (which is
+    # shared by copies of a QIcon and by the icons that get_file_icon() and
+    # get_file_type_icon() return for the same path or file type) so that the
+    # same icon is only composited once per overlay/grayout without rendering
+    # it first
+    key = (icon.name() or icon.cacheKey(), overlay, grayout, size)
+    composite_icon = composite_icon_cache.get(key)
+    if composite_icon is None:
+        composite_icon = QIcon(
+            CompositePixmap(icon.pixmap(size, size), overlay, grayout))
+        composite_icon_cache.put(key, composite_icon)
+    return composite_icon
+
+
 class ConnectionSettings(QWidget):
     def __init__(self):
         super(ConnectionSettings, self).__init__()
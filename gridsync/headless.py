@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import time
+
+from humanize import naturalsize
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks
+
+from gridsync import config_dir, APP_NAME
+from gridsync.control import ControlServer
+from gridsync.lock import FilesystemLock
+from gridsync.tahoe import get_nodedirs, Tahoe, select_executable
+from gridsync.tor import get_tor
+from gridsync.trace import TraceRecorder
+from gridsync.util import get_max_rss
+
+
+def log_startup_stats(start_time, mode):
+    # Only when logging has been configured (e.g., with --debug or in headless
+    # mode); otherwise there is nowhere for the stats to go
+    if not logging.getLogger().hasHandlers():
+        return
+    max_rss = get_max_rss()
+    logging.info(
+        "%s (%s mode) started in %.3f seconds; max RSS: %s", APP_NAME, mode,
+        time.time() - start_time,
+        naturalsize(max_rss) if max_rss is not None else "unknown")
+
+
+class BaseCore():
+    # The startup shared by HeadlessCore and the GUI's gridsync.core.Core;
+    # subclasses implement start_gateways(), which should start the gateways'
+    # nodes with start_nodes()
+    def __init__(self, args, start_time=None):
+        self.args = args
+        self.start_time = start_time or time.time()
+        self.gateways = []
+        self.control_server = ControlServer()
+        self.trace_recorder = None
+        trace_path = getattr(args, 'record_trace', None)
+        if trace_path:
+            self.trace_recorder = TraceRecorder(trace_path)
+        self.executable = None
+
+    def add_gateway(self, gateway):
+        # Called for gateways started here as well as for those added later
+        # on (e.g., by joining a grid through the welcome dialog)
+        if gateway in self.gateways:
+            return
+        self.gateways.append(gateway)
+        self.control_server.add_gateway(gateway)
+        if self.trace_recorder:
+            self.trace_recorder.attach(gateway)
+
+    def warn_tor_unavailable(self, gateway):  # pylint: disable=no-self-use
+        logging.warning(
+            'The "%s" connection is configured to use Tor, however, no '
+            'running tor daemon was found', gateway.name)
+
+    @inlineCallbacks
+    def start_nodes(self, nodedirs):
+        tor_available = yield get_tor(reactor)
+        logging.debug("Starting Tahoe-LAFS gateway(s)...")
+        for nodedir in nodedirs:
+            gateway = Tahoe(nodedir, executable=self.executable)
+            tcp = gateway.config_get('connections', 'tcp')
+            if tcp == 'tor' and not tor_available:
+                self.warn_tor_unavailable(gateway)
+            self.add_gateway(gateway)
+            d = gateway.start()
+            d.addCallback(gateway.ensure_folder_links)
+
+    def start_gateways(self):
+        raise NotImplementedError
+
+    def prepare(self):
+        # Called once the lock has been acquired, before the reactor runs
+        pass
+
+    def start(self):
+        try:
+            os.makedirs(config_dir)
+        except OSError:
+            pass
+
+        # Acquire a filesystem lock to prevent multiple instances from running
+        lock = FilesystemLock(
+            os.path.join(config_dir, "{}.lock".format(APP_NAME)))
+        lock.acquire()
+
+        logging.info("Core starting with args: %s", self.args)
+        logging.debug("$PATH is: %s", os.getenv('PATH'))
+
+        self.prepare()
+
+        reactor.callLater(0, self.start_gateways)
+        reactor.addSystemEventTrigger(
+            'before', 'shutdown', self.control_server.stop)
+        reactor.run()
+        if self.trace_recorder:
+            self.trace_recorder.close()
+        for nodedir in get_nodedirs(config_dir):
+            Tahoe(nodedir, executable=self.executable).kill()
+        lock.release()
+
+
+class HeadlessCore(BaseCore):
+    def add_gateway(self, gateway):
+        if gateway not in self.gateways:
+            self.connect_signals(gateway)
+        super(HeadlessCore, self).add_gateway(gateway)
+
+    @staticmethod
+    def connect_signals(gateway):
+        name = gateway.name
+        monitor = gateway.monitor
+        monitor.connected.connect(
+            lambda: print("[{}] Connected".format(name), flush=True))
+        monitor.nodes_updated.connect(
+            lambda connected, known: print(
+                "[{}] Connected to {} of {} storage nodes".format(
+                    name, connected, known), flush=True))
+        monitor.remote_folder_added.connect(
+            lambda folder, _: print(
+                "[{}] Found remote folder: {}".format(name, folder),
+                flush=True))
+        monitor.sync_started.connect(
+            lambda folder: print(
+                "[{}] {}: Syncing".format(name, folder), flush=True))
+        monitor.sync_finished.connect(
+            lambda folder: print(
+                "[{}] {}: Up to date".format(name, folder), flush=True))
+        monitor.file_updated.connect(
+            lambda folder, entry: print(
+                "[{}] {}: {} {}".format(
+                    name, folder, entry.action.capitalize(), entry.path),
+                flush=True))
+
+    @inlineCallbacks
+    def start_gateways(self):
+        nodedirs = get_nodedirs(config_dir)
+        if not nodedirs:
+            logging.error(
+                "No gateways found in %s; please join a grid first",
+                config_dir)
+            reactor.stop()
+            return
+        self.executable = yield select_executable()
+        if not self.executable:
+            logging.error(
+                "Could not find a suitable 'tahoe' executable in your PATH")
+            reactor.stop()
+            return
+        yield self.start_nodes(nodedirs)
+        self.control_server.listen()
+        log_startup_stats(self.start_time, 'headless')
@@ -2,12 +2,27 @@
 
 from collections import defaultdict
 import logging
+import os
 import time
 
 from PyQt5.QtCore import pyqtSignal, QObject
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet import reactor
+from twisted.internet.defer import DeferredLock, inlineCallbacks
 from twisted.internet.task import LoopingCall
 
+from gridsync.breaker import CircuitBreaker
+from gridsync.watcher import FolderWatcher
+
+
+# How often (in seconds) to check on the node while all of its local folders
+# are being watched for changes (and none of them are syncing)
+IDLE_CHECK_INTERVAL = 30
+
+# Tahoe-LAFS only queues an upload a little while after it notices a local
+# change itself, so a folder is checked again FOLLOW_UP_DELAY seconds after
+# the (last) change, in case the first check came too early to see it
+FOLLOW_UP_DELAY = 5
+
 
 class MagicFolderChecker(QObject):
 
@@ -46,11 +61,13 @@ class MagicFolderChecker(QObject):
 
         self.sync_time_started = 0
 
+        self.lock = DeferredLock()  # Checks can also be triggered locally
+
     def notify_updated_files(self):
         changes = defaultdict(list)
-        for item in self.updated_files:
-            changes[item['member']].insert(
-                int(item['mtime']), (item['action'], item['path'])
+        for entry in self.updated_files:
+            changes[entry.member].insert(
+                int(entry.mtime), (entry.action, entry.path)
             )
         self.updated_files = []
         for author, change in changes.items():
@@ -153,27 +170,27 @@ class MagicFolderChecker(QObject):
         return remote_scan_needed
 
     def compare_states(self, current, previous):
-        for mtime, data in current.items():
+        for mtime, entry in current.items():
             if mtime not in previous:
-                if data['deleted']:
-                    data['action'] = 'deleted'
+                if entry.deleted:
+                    entry.action = 'deleted'
                 else:
-                    path = data['path']
+                    path = entry.path
                     prev_entry = None
-                    for prev_data in previous.values():
-                        if prev_data['path'] == path:
-                            prev_entry = prev_data
+                    for prev in previous.values():
+                        if prev.path == path:
+                            prev_entry = prev
                     if prev_entry:
-                        if prev_entry['deleted']:
-                            data['action'] = 'restored'
+                        if prev_entry.deleted:
+                            entry.action = 'restored'
                         else:
-                            data['action'] = 'updated'
+                            entry.action = 'updated'
                     elif path.endswith('/'):
-                        data['action'] = 'created'
+                        entry.action = 'created'
                     else:
-                        data['action'] = 'added'
-                self.file_updated.emit(data)
-                self.updated_files.append(data)
+                        entry.action = 'added'
+                self.file_updated.emit(entry)
+                self.updated_files.append(entry)
 
     @inlineCallbacks
     def do_remote_scan(self, members=None):
@@ -192,8 +209,11 @@ class MagicFolderChecker(QObject):
                 self.updated_files = []  # Skip notifications
                 self.initial_scan_completed = True
 
-    @inlineCallbacks
     def do_check(self):
+        return self.lock.run(self._do_check)
+
+    @inlineCallbacks
+    def _do_check(self):
         status = yield self.gateway.get_magic_folder_status(self.name)
         scan_needed = self.process_status(status)
         if scan_needed or not self.initial_scan_completed:
@@ -275,10 +295,18 @@ class Monitor(QObject):
 
     check_finished = pyqtSignal()
 
-    def __init__(self, gateway):
+    circuit_state_changed = pyqtSignal(int)
+    supervisor_state_changed = pyqtSignal(int)
+
+    def __init__(self, gateway, clock=None):
         super(Monitor, self).__init__()
         self.gateway = gateway
+        self.clock = clock or reactor
         self.timer = LoopingCall(self.do_checks)
+        self.gateway.breaker.state_changed.connect(
+            self.circuit_state_changed.emit)
+        self.gateway.supervisor.state_changed.connect(
+            self.supervisor_state_changed.emit)
 
         self.grid_checker = GridChecker(self.gateway)
         self.grid_checker.connected.connect(self.connected.emit)
@@ -287,7 +315,11 @@ class Monitor(QObject):
         self.grid_checker.nodes_updated.connect(self.nodes_updated.emit)
         self.grid_checker.space_updated.connect(self.space_updated.emit)
         self.magic_folder_checkers = {}
+        self.watchers = {}
+        self.unwatchable = set()
+        self.follow_ups = {}
         self.total_sync_state = 0
+        self.interval = 2
 
     def add_magic_folder_checker(self, name, remote=False):
         mfc = MagicFolderChecker(self.gateway, name, remote)
@@ -315,6 +347,50 @@ class Monitor(QObject):
 
         self.magic_folder_checkers[name] = mfc
 
+    def update_watchers(self):
+        for name, watcher in list(self.watchers.items()):
+            if name not in self.gateway.magic_folders:
+                watcher.stop()
+                del self.watchers[name]
+                follow_up = self.follow_ups.pop(name, None)
+                if follow_up and follow_up.active():
+                    follow_up.cancel()
+        self.unwatchable &= set(self.gateway.magic_folders)
+        for name, settings in self.gateway.magic_folders.items():
+            directory = settings.get('directory')
+            if name in self.watchers or name in self.unwatchable \
+                    or not directory or not os.path.isdir(directory):
+                continue
+            watcher = FolderWatcher(
+                directory, lambda name=name: self.on_local_change(name))
+            if watcher.start():
+                self.watchers[name] = watcher
+            else:  # e.g., no inotify; rely on the regular checks instead
+                self.unwatchable.add(name)
+
+    def on_local_change(self, name):
+        self.check_folder(name)
+        follow_up = self.follow_ups.get(name)
+        if follow_up and follow_up.active():
+            follow_up.reset(FOLLOW_UP_DELAY)
+        else:
+            self.follow_ups[name] = self.clock.callLater(
+                FOLLOW_UP_DELAY, self.check_folder, name)
+
+    @inlineCallbacks
+    def check_folder(self, name):
+        # Checks a single folder right away (e.g., after a local change)
+        checker = self.magic_folder_checkers.get(name)
+        if not checker or checker.remote:
+            return
+        if not self.gateway.breaker.allow_request():
+            return
+        logging.debug("Local change in %s; checking...", name)
+        yield checker.do_check()
+        self.update_total_sync_state(set(
+            c.state for c in self.magic_folder_checkers.values()
+            if not c.remote))
+
     @inlineCallbacks
     def scan_rootcap(self, overlay_file=None):
         logging.debug("Scanning %s rootcap...", self.gateway.name)
@@ -334,17 +410,29 @@ class Monitor(QObject):
 
     @inlineCallbacks
     def do_checks(self):
+        # While the node is unreachable, skip checking entirely except for
+        # periodically probing it with a (cheap) grid status request
+        breaker = self.gateway.breaker
+        if not breaker.allow_request():
+            return
         yield self.grid_checker.do_check()
+        if breaker.state == CircuitBreaker.OPEN:
+            return
         for folder in list(self.gateway.magic_folders.keys()):
             if folder not in self.magic_folder_checkers:
                 self.add_magic_folder_checker(folder)
             elif self.magic_folder_checkers[folder].remote:
                 self.magic_folder_checkers[folder].remote = False
+        self.update_watchers()
         states = set()
         for magic_folder_checker in list(self.magic_folder_checkers.values()):
             if not magic_folder_checker.remote:
                 yield magic_folder_checker.do_check()
                 states.add(magic_folder_checker.state)
+        self.update_total_sync_state(states)
+        self.check_finished.emit()
+
+    def update_total_sync_state(self, states):
         if 1 in states or 99 in states:  # At least one folder is syncing
             state = 1
         elif 2 in states and len(states) == 1:  # All folders are up to date
@@ -354,7 +442,25 @@ class Monitor(QObject):
         if state != self.total_sync_state:
             self.total_sync_state = state
             self.total_sync_state_updated.emit(state)
-        self.check_finished.emit()
+        self.update_timer()
+
+    def update_timer(self):
+        # Local changes are picked up by the watchers, so while nothing is
+        # syncing, the node only needs checking for remote changes (provided
+        # that every folder is being watched)
+        interval = self.interval
+        if self.total_sync_state != 1 and self.watchers and all(
+                name in self.watchers
+                for name, checker in self.magic_folder_checkers.items()
+                if not checker.remote):
+            interval = max(interval, IDLE_CHECK_INTERVAL)
+        if not self.timer.running or interval == self.timer.interval:
+            return
+        faster = interval < self.timer.interval
+        self.timer.interval = interval
+        if faster:
+            self.timer.reset()
 
     def start(self, interval=2):
+        self.interval = interval
         self.timer.start(interval, now=True)
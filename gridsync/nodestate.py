@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+from collections import Counter
+from configparser import RawConfigParser
+import logging
+import os
+import time
+
+import yaml
+
+
+# Files modified less than RACY_WINDOW seconds ago are read every time; a
+# file rewritten again (in place, at the same size) within the filesystem's
+# timestamp granularity would otherwise look unchanged
+RACY_WINDOW = 1.0
+
+
+def read_text(path):
+    with open(path) as f:
+        return f.read().strip()
+
+
+def read_config(path):
+    config = RawConfigParser(allow_no_value=True)
+    with open(path) as f:
+        config.read_file(f)
+    return config
+
+
+def read_yaml(path):
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+
+def read_aliases(path):
+    aliases = {}
+    with open(path) as f:
+        for line in f.readlines():
+            if not line.startswith('#'):
+                try:
+                    name, cap = line.split(':', 1)
+                    aliases[name + ':'] = cap.strip()
+                except ValueError:
+                    pass
+    return aliases
+
+
+class NodeState():
+    # The parsed contents of a nodedir's state files (tahoe.cfg, node.url,
+    # private/aliases, etc.), kept in memory and read again only once a file
+    # has changed on disk -- i.e., its mtime, size or inode differ from when
+    # it was last read -- or has been invalidated after being written to.
+    # Parsed contents are shared; callers must copy them before modifying
+    def __init__(self, nodedir):
+        self.nodedir = nodedir
+        self.files = {}  # relpath -> (stat signature, parsed contents)
+        self.reloads = Counter()  # relpath -> number of times read
+        self.hits = 0
+
+    def read(self, relpath, parse, default=None):
+        path = os.path.join(self.nodedir, relpath)
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.files.pop(relpath, None)
+            return default
+        signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+        cached = self.files.get(relpath)
+        if cached and cached[0] == signature:
+            self.hits += 1
+            return cached[1]
+        try:
+            parsed = parse(path)
+        except OSError:
+            return default
+        self.reloads[relpath] += 1
+        logging.debug("Read %s (%i times)", path, self.reloads[relpath])
+        if time.time() - st.st_mtime >= RACY_WINDOW:
+            self.files[relpath] = (signature, parsed)
+        else:
+            self.files.pop(relpath, None)
+        return parsed
+
+    def invalidate(self, relpath):
+        self.files.pop(relpath, None)
+
+    def get_stats(self):
+        return {'hits': self.hits, 'reloads': dict(self.reloads)}
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from PyQt5.QtCore import pyqtSignal, QObject
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred, inlineCallbacks
+from twisted.python.failure import Failure
+
+
+# Restart requests made within RESTART_DELAY seconds of one another are
+# merged into a single restart (which happens no later than MAX_RESTART_DELAY
+# seconds after the first of them, unless folder operations are in progress)
+RESTART_DELAY = 2
+MAX_RESTART_DELAY = 10
+
+
+# Restarting the node disconnects it from every storage server, so requests
+# to restart a gateway (e.g., after each of several folders has been added or
+# removed) are coalesced, and a restart is deferred until any (tracked) folder
+# operations still in flight -- which might otherwise require yet another
+# restart, or be interrupted by this one -- have finished
+class RestartScheduler(QObject):
+
+    restarted = pyqtSignal(float)  # downtime (in seconds)
+
+    def __init__(self, gateway, clock=None):
+        super(RestartScheduler, self).__init__()
+        self.gateway = gateway
+        self.clock = clock or reactor
+        self.operations = 0
+        self.delayed_call = None
+        self.first_requested = 0
+        self.due = False
+        self.restarting = False
+        self.waiting = []  # Deferreds to fire once the next restart is done
+        self.requests = 0
+        self.restarts = 0
+        self.last_downtime = None
+        self.total_downtime = 0.0
+
+    def track(self, d):
+        # Defers restarts until `d` (a folder operation) has fired
+        self.operations += 1
+
+        def done(result):
+            self.operations -= 1
+            self._maybe_restart()
+            return result
+        return d.addBoth(done)
+
+    def request(self):
+        # Returns a Deferred that fires once a restart that began after this
+        # request has finished
+        self.requests += 1
+        d = Deferred()
+        self.waiting.append(d)
+        now = self.clock.seconds()
+        if self.delayed_call and self.delayed_call.active():
+            delay = min(
+                RESTART_DELAY, self.first_requested + MAX_RESTART_DELAY - now)
+            self.delayed_call.reset(max(0, delay))
+        elif not self.due:
+            self.first_requested = now
+            self.delayed_call = self.clock.callLater(
+                RESTART_DELAY, self._on_delay_elapsed)
+        return d
+
+    def _on_delay_elapsed(self):
+        self.delayed_call = None
+        self.due = True
+        self._maybe_restart()
+
+    def _maybe_restart(self):
+        if not self.due or self.operations or self.restarting:
+            return
+        self.due = False
+        waiting, self.waiting = self.waiting, []
+        self._restart(waiting)
+
+    @inlineCallbacks
+    def _restart(self, waiting):
+        logging.debug(
+            "Restarting %s (for %i request(s))...", self.gateway.name,
+            len(waiting))
+        self.restarting = True
+        try:
+            downtime = yield self.gateway.restart()
+        except Exception:  # pylint: disable=broad-except
+            failure = Failure()
+            logging.error(
+                "Error restarting %s: %s", self.gateway.name,
+                failure.getErrorMessage())
+            self.restarting = False
+            for d in waiting:
+                d.errback(failure)
+            self._maybe_restart()
+            return
+        self.restarting = False
+        if downtime is not None:  # Otherwise, the restart was aborted
+            self.restarts += 1
+            self.last_downtime = downtime
+            self.total_downtime += downtime
+            logging.info(
+                "Restarted %s; it was unavailable for %.1f seconds",
+                self.gateway.name, downtime)
+            self.restarted.emit(downtime)
+        for d in waiting:
+            d.callback(downtime)
+        self._maybe_restart()
+
+    def get_stats(self):
+        return {
+            'requests': self.requests,
+            'restarts': self.restarts,
+            'last_downtime': self.last_downtime,
+            'total_downtime': round(self.total_downtime, 3)
+        }
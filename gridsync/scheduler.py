@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+import itertools
+
+from twisted.internet.defer import Deferred, maybeDeferred
+from twisted.python.failure import Failure
+
+
+# Priority classes, highest first
+INTERACTIVE = 0  # Actions initiated by the user (e.g., adding a folder)
+SETUP = 1  # Joining a grid, restoring from a Recovery Key, etc.
+BACKGROUND = 2  # Remote folder/rootcap scans
+STATS = 3  # Periodic status polling
+
+
+class RequestScheduler():
+    def __init__(self, max_concurrency=4):
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        self.queue = []
+        self.running = {}
+        self._dispatching = False
+        self._counter = itertools.count()  # Keeps FIFO order within a class
+
+    def run(self, priority, f, *args, **kwargs):
+        # Queued requests are dispatched in priority order as slots become
+        # available; requests that have already been dispatched are never
+        # preempted. Cancelling the returned Deferred removes the request from
+        # the queue (or cancels it, if already dispatched)
+        d = Deferred(self._cancel)
+        heapq.heappush(
+            self.queue, (priority, next(self._counter), d, f, args, kwargs))
+        self._dispatch()
+        return d
+
+    @property
+    def pending(self):
+        return len([entry for entry in self.queue if not entry[2].called])
+
+    def _cancel(self, d):
+        inner = self.running.get(d)
+        if inner is not None:
+            inner.cancel()
+
+    def _dispatch(self):
+        if self._dispatching:
+            return  # Re-entered from _finished(); the loop continues below
+        self._dispatching = True
+        while self.queue and self.active < self.max_concurrency:
+            _, _, d, f, args, kwargs = heapq.heappop(self.queue)
+            if d.called:  # Cancelled while queued
+                continue
+            self.active += 1
+            inner = maybeDeferred(f, *args, **kwargs)
+            if not inner.called:
+                self.running[d] = inner
+            inner.addBoth(self._finished, d)
+        self._dispatching = False
+
+    def _finished(self, result, d):
+        self.active -= 1
+        self.running.pop(d, None)
+        if not d.called:
+            if isinstance(result, Failure):
+                d.errback(result)
+            else:
+                d.callback(result)
+        self._dispatch()
@@ -16,6 +16,7 @@ from twisted.internet.defer import inlineCallbacks
 from gridsync import config_dir, resource, APP_NAME
 from gridsync.config import Config
 from gridsync.errors import UpgradeRequiredError, TorError
+from gridsync.scheduler import SETUP
 from gridsync.tahoe import Tahoe, select_executable
 from gridsync.tor import tor_required, get_tor, get_tor_with_prompt
 
@@ -255,28 +256,25 @@ class SetupRunner(QObject):
                 pass
             with open(settings_path, 'w') as f:
                 f.write(json.dumps(settings))
-            settings_cap = yield self.gateway.upload(settings_path)
+            settings_cap = yield self.gateway.upload(
+                settings_path, priority=SETUP)
             yield self.gateway.link(
-                self.gateway.rootcap, 'settings.json', settings_cap)
+                self.gateway.rootcap, 'settings.json', settings_cap,
+                priority=SETUP)
 
     @inlineCallbacks
     def join_folders(self, folders_data):
         folders = []
+        children = {}
         for folder, data in folders_data.items():
             self.update_progress.emit('Joining folder "{}"...'.format(folder))
             collective, personal = data['code'].split('+')
-            yield self.gateway.link(
-                self.gateway.get_rootcap(),
-                folder + ' (collective)',
-                collective
-            )
-            yield self.gateway.link(
-                self.gateway.get_rootcap(),
-                folder + ' (personal)',
-                personal
-            )
+            children[folder + ' (collective)'] = collective
+            children[folder + ' (personal)'] = personal
             folders.append(folder)
         if folders:
+            yield self.gateway.set_children(
+                self.gateway.get_rootcap(), children, priority=SETUP)
             self.joined_folders.emit(folders)
 
     @inlineCallbacks
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+import codecs
+import json
+import re
+
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r'[ \t\n\r]*')
+
+# Parser states
+START = 0  # Expecting '['
+NODE_TYPE = 1  # Expecting the node type (e.g., "dirnode") and ','
+NODE_DATA = 2  # Expecting '{'
+KEY = 3  # Expecting the next key of the node's data (or '}')
+CHILD = 4  # Expecting the next child name (or '}')
+END = 5  # Expecting ']'
+DONE = 6
+
+
+class _Incomplete(Exception):
+    pass
+
+
+class ListingParser():
+    # Incrementally parses a Tahoe-LAFS directory listing (i.e., the response
+    # to a "?t=json" request for a dirnode) as it is received, calling
+    # `on_child(name, node)` for every child as soon as it is complete. Only
+    # the children -- not the full document -- are ever decoded and the
+    # bytes that have been consumed are released along the way
+    def __init__(self, on_child):
+        self.on_child = on_child
+        self.node_type = None
+        self.has_children = False
+        self.state = START
+        self.first = True  # Whether no key/child has been read yet
+        self.buffer = ''
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.steps = {
+            START: self._start,
+            NODE_TYPE: self._node_type,
+            NODE_DATA: self._node_data,
+            KEY: self._key,
+            CHILD: self._child,
+            END: self._end
+        }
+
+    def _skip(self, pos):
+        pos = _whitespace.match(self.buffer, pos).end()
+        if pos >= len(self.buffer):
+            raise _Incomplete
+        return pos
+
+    def _expect(self, pos, char):
+        pos = self._skip(pos)
+        if self.buffer[pos] != char:
+            raise ValueError(
+                "Unexpected {!r} in directory listing".format(
+                    self.buffer[pos]))
+        return pos + 1
+
+    def _value(self, pos):
+        pos = self._skip(pos)
+        try:
+            value, pos = _decoder.raw_decode(self.buffer, pos)
+        except ValueError:
+            raise _Incomplete
+        # Make sure that the value wasn't cut short (e.g., a number) by
+        # requiring that the following delimiter has been received
+        self._skip(pos)
+        return value, pos
+
+    def _pair(self, pos):
+        # Reads `[","] "name":` and returns the name and the new position,
+        # or None (and the position after the closing brace) at the end
+        pos = self._skip(pos)
+        if self.buffer[pos] == '}':
+            return None, pos + 1
+        if not self.first:
+            pos = self._expect(pos, ',')
+        name, pos = self._value(pos)
+        if not isinstance(name, str):
+            raise ValueError("Invalid key in directory listing")
+        pos = self._expect(pos, ':')
+        return name, pos
+
+    # Each of the following either completes a step (returning the position
+    # after it) or raises _Incomplete before changing any state
+
+    def _start(self, pos):
+        pos = self._expect(pos, '[')
+        self.state = NODE_TYPE
+        return pos
+
+    def _node_type(self, pos):
+        node_type, pos = self._value(pos)
+        pos = self._expect(pos, ',')
+        self.node_type = node_type
+        self.state = NODE_DATA
+        return pos
+
+    def _node_data(self, pos):
+        pos = self._expect(pos, '{')
+        self.state = KEY
+        return pos
+
+    def _key(self, pos):
+        key, pos = self._pair(pos)
+        if key is None:
+            self.state = END
+        elif key == 'children':
+            pos = self._expect(pos, '{')
+            self.has_children = True
+            self.state = CHILD
+        else:
+            _, pos = self._value(pos)  # Skipped
+        self.first = self.state == CHILD
+        return pos
+
+    def _child(self, pos):
+        name, pos = self._pair(pos)
+        if name is None:
+            self.state = KEY
+        else:
+            node, pos = self._value(pos)
+            self.on_child(name, node)
+        self.first = False
+        return pos
+
+    def _end(self, pos):
+        pos = self._expect(pos, ']')
+        self.state = DONE
+        return pos
+
+    def feed(self, data):
+        self.buffer += self.utf8.decode(data)
+        pos = 0
+        try:
+            while self.state != DONE:
+                pos = self.steps[self.state](pos)
+        except _Incomplete:
+            pass
+        self.buffer = self.buffer[pos:]
+
+    def close(self):
+        self.buffer += self.utf8.decode(b'', final=True)
+        if self.state != DONE or self.buffer.strip():
+            raise ValueError("Truncated or malformed directory listing")
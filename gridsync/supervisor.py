@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+from collections import deque
+import logging
+
+from PyQt5.QtCore import pyqtSignal, QObject
+import treq
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks
+from twisted.internet.task import LoopingCall
+
+
+# How often (in seconds) a running node's web API is probed, how long a probe
+# may take, and how many probes in a row must fail for the node to be
+# considered hung (and restarted)
+PROBE_INTERVAL = 10
+PROBE_TIMEOUT = 10
+PROBE_FAILURE_THRESHOLD = 3
+
+# Restarts are delayed by BACKOFF_INITIAL seconds, doubling (up to
+# BACKOFF_MAX) with every restart until the node has stayed up for
+# STABLE_UPTIME seconds
+BACKOFF_INITIAL = 1
+BACKOFF_MAX = 300
+STABLE_UPTIME = 60
+
+# If the node has already been restarted MAX_RESTARTS times within the last
+# RESTART_WINDOW seconds, it is left stopped instead (until it is started
+# again by other means); something is evidently wrong that restarting it
+# won't fix
+MAX_RESTARTS = 5
+RESTART_WINDOW = 600
+
+
+# Watches a gateway's `tahoe run` child process -- both for the process
+# exiting while it isn't being stopped and, since a process can also be alive
+# but unresponsive, by periodically probing its web API -- restarting it when
+# it has died or hung
+class Supervisor(QObject):
+
+    STOPPED = 0  # Not (yet) supervising
+    RUNNING = 1
+    DEGRADED = 2  # Down; waiting to restart or restarting
+    FAILED = 3  # Down; gave up restarting
+
+    state_changed = pyqtSignal(int)
+
+    def __init__(self, gateway, clock=None):
+        super(Supervisor, self).__init__()
+        self.gateway = gateway
+        self.clock = clock or reactor
+        self.state = Supervisor.STOPPED
+        self.prober = None
+        self.failed_probes = 0
+        self.backoff = BACKOFF_INITIAL
+        self.delayed_call = None
+        self.restart_times = deque()
+        self.started_at = None
+        self.restarts = 0
+        self.crashes = 0
+        self.hangs = 0
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            self.state_changed.emit(state)
+
+    def start(self):
+        # Called whenever the node has (re)started
+        self.started_at = self.clock.seconds()
+        self.failed_probes = 0
+        if not self.prober:
+            self.prober = LoopingCall(self.probe)
+            self.prober.clock = self.clock
+            self.prober.start(PROBE_INTERVAL, now=False)
+        self._set_state(Supervisor.RUNNING)
+
+    def stop(self):
+        if self.prober and self.prober.running:
+            self.prober.stop()
+        self.prober = None
+        if self.delayed_call and self.delayed_call.active():
+            self.delayed_call.cancel()
+        self.delayed_call = None
+        self._set_state(Supervisor.STOPPED)
+
+    def _supervising(self):
+        return self.state == Supervisor.RUNNING and \
+            self.gateway.state == self.gateway.STARTED
+
+    def process_ended(self, reason):
+        if not self._supervising():  # Stopped (or restarted) on purpose
+            return
+        logging.warning(
+            "The tahoe process for %s exited unexpectedly: %s",
+            self.gateway.name, reason.getErrorMessage())
+        self.crashes += 1
+        self.schedule_restart()
+
+    @inlineCallbacks
+    def probe(self):
+        if not self._supervising():
+            return
+        try:
+            d = self.gateway.http.get(self.gateway.nodeurl)
+            d.addTimeout(PROBE_TIMEOUT, self.clock)
+            resp = yield d
+            yield treq.content(resp)
+        except Exception as e:  # pylint: disable=broad-except
+            self.failed_probes += 1
+            logging.debug(
+                "Health probe %i of %s failed: %s: %s", self.failed_probes,
+                self.gateway.name, type(e).__name__, str(e))
+            if self.failed_probes >= PROBE_FAILURE_THRESHOLD \
+                    and self._supervising():
+                logging.warning(
+                    "The tahoe process for %s is unresponsive",
+                    self.gateway.name)
+                self.hangs += 1
+                self.schedule_restart()
+            return
+        self.failed_probes = 0
+        if self.clock.seconds() - self.started_at >= STABLE_UPTIME:
+            self.backoff = BACKOFF_INITIAL
+
+    def schedule_restart(self):
+        now = self.clock.seconds()
+        while self.restart_times and \
+                self.restart_times[0] <= now - RESTART_WINDOW:
+            self.restart_times.popleft()
+        if len(self.restart_times) >= MAX_RESTARTS:
+            logging.error(
+                "%s was restarted %i times in %i seconds; giving up",
+                self.gateway.name, len(self.restart_times), RESTART_WINDOW)
+            self._set_state(Supervisor.FAILED)
+            return
+        self._set_state(Supervisor.DEGRADED)
+        logging.info(
+            "Restarting %s in %i seconds...", self.gateway.name, self.backoff)
+        self.delayed_call = self.clock.callLater(self.backoff, self.restart)
+        self.backoff = min(self.backoff * 2, BACKOFF_MAX)
+
+    @inlineCallbacks
+    def restart(self):
+        self.delayed_call = None
+        if self.state != Supervisor.DEGRADED:  # e.g., stopped meanwhile
+            return
+        self.restart_times.append(self.clock.seconds())
+        self.restarts += 1
+        try:
+            # Through the gateway's RestartScheduler, so as not to race with
+            # (but be coalesced with) restarts requested elsewhere. Stopping
+            # the gateway pauses supervision (see stop()); starting it again
+            # resumes it (see start())
+            yield self.gateway.restarter.request()
+        except Exception as e:  # pylint: disable=broad-except
+            logging.error(
+                "Error restarting %s: %s: %s", self.gateway.name,
+                type(e).__name__, str(e))
+            self.schedule_restart()
+
+    def get_stats(self):
+        if self.state == Supervisor.RUNNING:
+            uptime = round(self.clock.seconds() - self.started_at, 3)
+        else:
+            uptime = None
+        return {
+            'state': self.state,
+            'uptime': uptime,
+            'restarts': self.restarts,
+            'crashes': self.crashes,
+            'hangs': self.hangs,
+            'backoff': self.backoff
+        }
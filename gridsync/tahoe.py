@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+from base64 import b32decode, b32encode
+from binascii import Error as BinasciiError
 import errno
 import hashlib
 import json
@@ -8,33 +10,240 @@ import os
 import re
 import shutil
 import signal
+import socket
 import sys
 import tempfile
 from collections import defaultdict, OrderedDict
+from configparser import NoOptionError, NoSectionError
+import copy
+from functools import partial, wraps
 from io import BytesIO
 
 
 import treq
+from treq.client import HTTPClient
 from twisted.internet import reactor
 from twisted.internet.defer import (
-    Deferred, DeferredList, DeferredLock, inlineCallbacks)
+    Deferred, DeferredList, DeferredLock, inlineCallbacks, maybeDeferred,
+    TimeoutError)
+from twisted.internet.endpoints import UNIXClientEndpoint
 from twisted.internet.error import ConnectError, ProcessDone
 from twisted.internet.protocol import ProcessProtocol
 from twisted.internet.task import deferLater
+from twisted.internet.threads import deferToThread
+from twisted.python.failure import Failure
 from twisted.python.procutils import which
+from twisted.web.client import (
+    Agent, HTTPConnectionPool, ResponseFailed, ResponseNeverReceived)
+from twisted.web.iweb import IAgentEndpointFactory
 import yaml
+from zope.interface import implementer
 
-from gridsync import pkgdir
+from gridsync import pkgdir, settings
+from gridsync.breaker import CircuitBreaker
 from gridsync.config import Config
+from gridsync.entries import FileEntry
 from gridsync.errors import TahoeError, TahoeCommandError, TahoeWebError
 from gridsync.monitor import Monitor
+from gridsync.nodestate import (
+    NodeState, read_aliases, read_config, read_text, read_yaml)
+from gridsync.scheduler import (
+    BACKGROUND, INTERACTIVE, RequestScheduler, SETUP, STATS)
 from gridsync.preferences import set_preference, get_preference
+from gridsync.restarter import RestartScheduler
+from gridsync.streaming import ListingParser
+from gridsync.supervisor import Supervisor
 
 
 def is_valid_furl(furl):
     return re.match(r'^pb://[a-z2-7]+@[a-zA-Z0-9\.:,-]+:\d+/[a-z2-7]+$', furl)
 
 
+# Seconds after which a request to the given web API endpoint is cancelled, or
+# None to wait indefinitely (e.g., for potentially large transfers). These can
+# be overridden in the "[timeouts]" section of config.txt
+DEFAULT_REQUEST_TIMEOUTS = {
+    'grid_status': 15,
+    'welcome': 15,
+    'magic_folder_status': 15,
+    'json': 60,
+    'mkdir': 60,
+    'link': 60,
+    'unlink': 60,
+    'upload': None,
+    'download': None,
+}
+
+# The priority with which requests to each endpoint are scheduled unless
+# overridden by the caller (e.g., get_json(cap, priority=INTERACTIVE))
+DEFAULT_REQUEST_PRIORITIES = {
+    'grid_status': STATS,
+    'welcome': STATS,
+    'magic_folder_status': STATS,
+    'json': BACKGROUND,
+    'mkdir': INTERACTIVE,
+    'link': INTERACTIVE,
+    'unlink': INTERACTIVE,
+    'upload': INTERACTIVE,
+    'download': INTERACTIVE,
+}
+
+# Failures indicating that the web API could not be reached at all (as opposed
+# to, e.g., an HTTP error response); these count against the circuit breaker
+CONNECTION_ERRORS = (
+    ConnectError, ResponseFailed, ResponseNeverReceived, TimeoutError)
+
+
+def _raise_timeout(result, timeout):
+    if isinstance(result, Failure):  # Typically a CancelledError
+        raise TimeoutError("Request timed out after {} seconds".format(timeout))
+    return result
+
+
+def _on_request_success(result, gateway):
+    gateway.breaker.record_success()
+    return result
+
+
+def _on_request_failure(failure, gateway, endpoint, none_if_unreachable):
+    if not failure.check(*CONNECTION_ERRORS):
+        gateway.breaker.record_success()  # The node responded
+        return failure
+    gateway.breaker.record_failure()
+    if none_if_unreachable:
+        log.debug(
+            "Error reaching %s web API (%s): %s", gateway.name, endpoint,
+            failure.getErrorMessage())
+        return None
+    return failure
+
+
+# Responses (in bytes) and directory listings (in number of children) at least
+# this large are decoded/processed in the reactor's thread pool instead of in
+# the reactor (i.e., GUI) thread, with the results delivered back to the
+# latter. Note that json.loads() holds the GIL throughout; the history building
+# that follows, however, can be interleaved with the handling of GUI events
+OFFLOAD_JSON_SIZE = 256 * 1024
+OFFLOAD_CHILDREN = 1000
+
+
+def run_offloadable(offload, f, *args):
+    if offload:
+        return deferToThread(f, *args)
+    return maybeDeferred(f, *args)
+
+
+def _decode_json(content):
+    return json.loads(content.decode('utf-8'))
+
+
+def decode_json(content):
+    return run_offloadable(
+        len(content) >= OFFLOAD_JSON_SIZE, _decode_json, content)
+
+
+def is_readonly_cap(cap):
+    return '-RO:' in cap or cap.startswith(
+        ('URI:CHK:', 'URI:LIT:', 'URI:DIR2-CHK:', 'URI:DIR2-LIT:'))
+
+
+# Mutable directory writecap prefixes and those of their readcaps
+READCAP_PREFIXES = {
+    'URI:DIR2:': 'URI:DIR2-RO:',
+    'URI:DIR2-MDMF:': 'URI:DIR2-MDMF-RO:',
+}
+
+
+def derive_readcap(writecap):
+    # Derives a mutable directory's readcap from its writecap, as Tahoe-LAFS
+    # itself does (see allmydata.uri and allmydata.util.hashutil), sparing a
+    # request for it; returns None for caps that can't be attenuated locally
+    for prefix, ro_prefix in READCAP_PREFIXES.items():
+        if writecap.startswith(prefix):
+            break
+    else:
+        return None
+    try:
+        writekey, fingerprint = writecap[len(prefix):].split(':')
+        writekey = b32decode(
+            writekey.upper() + '=' * (-len(writekey) % 8), casefold=True)
+    except (ValueError, BinasciiError):
+        return None
+    if len(writekey) != 16:
+        return None
+    tag = b'allmydata_mutable_writekey_to_readkey_v1'
+    netstring = '{}:'.format(len(tag)).encode() + tag + b','
+    readkey = hashlib.sha256(
+        hashlib.sha256(netstring + writekey).digest()).digest()[:16]
+    return '{}{}:{}'.format(
+        ro_prefix, b32encode(readkey).decode().rstrip('=').lower(),
+        fingerprint)
+
+
+def _children_json(children):
+    # The body of a t=mkdir-with-children or t=set_children request
+    data = {}
+    for name, cap in children.items():
+        if cap.startswith('URI:DIR2'):
+            node = ['dirnode', {'ro_uri': cap}]
+        else:
+            node = ['filenode', {'ro_uri': cap}]
+        if not is_readonly_cap(cap):
+            node[1]['rw_uri'] = cap
+        data[name] = node
+    return data
+
+
+def web_request(endpoint, none_if_unreachable=False):
+    # Queues requests with the gateway's scheduler, cancels them if they take
+    # longer than the endpoint's timeout (once dispatched), and reports their
+    # outcome to the gateway's circuit breaker
+    def decorator(func):
+        func = inlineCallbacks(func)
+
+        def request(self, *args, **kwargs):
+            d = func(self, *args, **kwargs)
+            timeout = self.request_timeouts.get(endpoint)
+            if timeout:
+                d.addTimeout(timeout, reactor, onTimeoutCancel=_raise_timeout)
+            d.addCallbacks(
+                _on_request_success, _on_request_failure,
+                callbackArgs=(self,),
+                errbackArgs=(self, endpoint, none_if_unreachable))
+            return d
+
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            priority = kwargs.pop('priority', None)
+            if priority is None:
+                priority = DEFAULT_REQUEST_PRIORITIES[endpoint]
+            if not self.nodeurl:
+                return func(self, *args, **kwargs)
+            return self.scheduler.run(priority, request, self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# The URL used for nodes whose web API listens on a UNIX domain socket (in which
+# case Tahoe-LAFS doesn't write a "node.url" file); the host part is ignored
+UNIX_NODEURL = 'http://localhost/'
+
+TCP_WEBPORT = 'tcp:0:interface=127.0.0.1'
+
+
+def unix_webport_supported():
+    return sys.platform != 'win32' and hasattr(socket, 'AF_UNIX')
+
+
+@implementer(IAgentEndpointFactory)
+class UNIXEndpointFactory():
+    def __init__(self, path):
+        self.path = path
+
+    def endpointForURI(self, uri):  # pylint: disable=unused-argument
+        return UNIXClientEndpoint(reactor, self.path)
+
+
 def get_nodedirs(basedir):
     nodedirs = []
     try:
@@ -55,6 +264,7 @@ class CommandProtocol(ProcessProtocol):
         self.trigger = callback_trigger
         self.done = Deferred()
         self.output = BytesIO()
+        self.started = False
 
     def outReceived(self, data):
         self.output.write(data)
@@ -63,6 +273,7 @@ class CommandProtocol(ProcessProtocol):
             if line:
                 self.parent.line_received(line)
             if not self.done.called and self.trigger and self.trigger in line:
+                self.started = True
                 self.done.callback(self.transport.pid)
 
     def errReceived(self, data):
@@ -71,6 +282,8 @@ class CommandProtocol(ProcessProtocol):
     def processEnded(self, reason):
         if not self.done.called:
             self.done.callback(self.output.getvalue().decode('utf-8'))
+        elif self.started:  # A long-running process (i.e., `tahoe run`)
+            self.parent.supervisor.process_ended(reason)
 
     def processExited(self, reason):
         if not self.done.called and not isinstance(reason.value, ProcessDone):
@@ -97,6 +310,7 @@ class Tahoe():
         self.servers_yaml_path = os.path.join(
             self.nodedir, 'private', 'servers.yaml')
         self.config = Config(os.path.join(self.nodedir, 'tahoe.cfg'))
+        self.node_state = NodeState(self.nodedir)
         self.pidfile = os.path.join(self.nodedir, 'twistd.pid')
         self.nodeurl = None
         self.shares_happy = None
@@ -108,15 +322,38 @@ class Tahoe():
         self.magic_folders = defaultdict(dict)
         self.remote_magic_folders = defaultdict(dict)
         self.use_tor = False
+        self.web_socket = None
+        self._http_client = None
+        self.request_timeouts = dict(DEFAULT_REQUEST_TIMEOUTS)
+        for endpoint, value in settings.get('timeouts', {}).items():
+            self.request_timeouts[endpoint] = float(value) or None
+        self.breaker = CircuitBreaker(self.name)
+        self.scheduler = RequestScheduler()
+        self.restarter = RestartScheduler(self)
+        self.supervisor = Supervisor(self)
         self.monitor = Monitor(self)
         self._monitor_started = False
         self.state = Tahoe.STOPPED
 
+    def get_debug_stats(self):
+        return {
+            'node_state': self.node_state.get_stats(),
+            'restarts': self.restarter.get_stats(),
+            'supervisor': self.supervisor.get_stats()
+        }
+
     def config_set(self, section, option, value):
         self.config.set(section, option, value)
+        self.node_state.invalidate('tahoe.cfg')
 
     def config_get(self, section, option):
-        return self.config.get(section, option)
+        config = self.node_state.read('tahoe.cfg', read_config)
+        if config is None:
+            return None
+        try:
+            return config.get(section, option)
+        except (NoOptionError, NoSectionError):
+            return None
 
     def get_settings(self, include_rootcap=False):
         settings = {
@@ -137,7 +374,7 @@ class Tahoe():
             with open(icon_url_path) as f:
                 settings['icon_url'] = f.read().strip()
         if include_rootcap and os.path.exists(self.rootcap_path):
-            settings['rootcap'] = self.read_cap_from_file(self.rootcap_path)
+            settings['rootcap'] = self.get_rootcap()
         # TODO: Verify integrity? Support 'icon_base64'?
         return settings
 
@@ -151,20 +388,8 @@ class Tahoe():
         log.debug("Exported settings to '%s'", dest)
 
     def get_aliases(self):
-        aliases = {}
-        aliases_file = os.path.join(self.nodedir, 'private', 'aliases')
-        try:
-            with open(aliases_file) as f:
-                for line in f.readlines():
-                    if not line.startswith('#'):
-                        try:
-                            name, cap = line.split(':', 1)
-                            aliases[name + ':'] = cap.strip()
-                        except ValueError:
-                            pass
-            return aliases
-        except IOError:
-            return aliases
+        return dict(self.node_state.read(
+            os.path.join('private', 'aliases'), read_aliases, {}))
 
     def get_alias(self, alias):
         if not alias.endswith(':'):
@@ -177,17 +402,22 @@ class Tahoe():
         except AttributeError:
             return None
 
-    def _set_alias(self, alias, cap=None):
-        if not alias.endswith(':'):
-            alias = alias + ':'
+    def _set_aliases(self, changes):
+        # `changes` maps aliases to caps, or to None for aliases to remove;
+        # the aliases file is rewritten (at most) once for all of them
         aliases = self.get_aliases()
-        if cap:
-            aliases[alias] = cap
-        else:
-            try:
+        changed = False
+        for alias, cap in changes.items():
+            if not alias.endswith(':'):
+                alias = alias + ':'
+            if cap:
+                aliases[alias] = cap
+                changed = True
+            elif alias in aliases:
                 del aliases[alias]
-            except (KeyError, TypeError):
-                return
+                changed = True
+        if not changed:
+            return
         tmp_aliases_file = os.path.join(self.nodedir, 'private', 'aliases.tmp')
         with open(tmp_aliases_file, 'w') as f:
             data = ''
@@ -196,6 +426,10 @@ class Tahoe():
             f.write(data)
         aliases_file = os.path.join(self.nodedir, 'private', 'aliases')
         shutil.move(tmp_aliases_file, aliases_file)
+        self.node_state.invalidate(os.path.join('private', 'aliases'))
+
+    def _set_alias(self, alias, cap=None):
+        self._set_aliases({alias: cap})
 
     def add_alias(self, alias, cap):
         self._set_alias(alias, cap)
@@ -204,11 +438,8 @@ class Tahoe():
         self._set_alias(alias)
 
     def _read_servers_yaml(self):
-        try:
-            with open(self.servers_yaml_path) as f:
-                return yaml.safe_load(f)
-        except OSError:
-            return {}
+        return copy.deepcopy(self.node_state.read(
+            os.path.join('private', 'servers.yaml'), read_yaml, {}))
 
     def get_storage_servers(self):
         yaml_data = self._read_servers_yaml()
@@ -243,6 +474,7 @@ class Tahoe():
         with open(self.servers_yaml_path + '.tmp', 'w') as f:
             f.write(yaml.safe_dump(yaml_data, default_flow_style=False))
         shutil.move(self.servers_yaml_path + '.tmp', self.servers_yaml_path)
+        self.node_state.invalidate(os.path.join('private', 'servers.yaml'))
         log.debug("Added storage server: %s", server_id)
 
     def add_storage_servers(self, storage_servers):
@@ -254,14 +486,19 @@ class Tahoe():
             else:
                 log.warning("No storage fURL provided for %s!", server_id)
 
-    def load_magic_folders(self):
-        data = {}
+    def _read_magic_folders_yaml(self):
+        return copy.deepcopy(self.node_state.read(
+            os.path.join('private', 'magic_folders.yaml'), read_yaml, {}))
+
+    def _write_magic_folders_yaml(self, folders_data):
         yaml_path = os.path.join(self.nodedir, 'private', 'magic_folders.yaml')
-        try:
-            with open(yaml_path) as f:
-                data = yaml.safe_load(f)
-        except OSError:
-            pass
+        with open(yaml_path, 'w') as f:
+            f.write(yaml.safe_dump({'magic-folders': folders_data}))
+        self.node_state.invalidate(
+            os.path.join('private', 'magic_folders.yaml'))
+
+    def load_magic_folders(self):
+        data = self._read_magic_folders_yaml()
         folders_data = data.get('magic-folders')
         if folders_data:
             for key, value in folders_data.items():  # to preserve defaultdict
@@ -336,7 +573,8 @@ class Tahoe():
         if os.path.exists(self.nodedir):
             raise FileExistsError(
                 "Nodedir already exists: {}".format(self.nodedir))
-        args = ['create-client', '--webport=tcp:0:interface=127.0.0.1']
+        args = ['create-client', '--webport=' + self.get_webport_endpoint(
+            kwargs.get('webport', get_preference('connection', 'webport')))]
         for key, value in kwargs.items():
             if key in ('nickname', 'introducer', 'shares-needed',
                        'shares-happy', 'shares-total'):
@@ -367,6 +605,7 @@ class Tahoe():
     @inlineCallbacks
     def stop(self):
         log.debug('Stopping "%s" tahoe client...', self.name)
+        self.supervisor.stop()  # Resumed by start()
         if not os.path.isfile(self.pidfile):
             log.error('No "twistd.pid" file found in %s', self.nodedir)
             return
@@ -432,10 +671,8 @@ class Tahoe():
                 yield self.command(
                     ['add-alias', alias, collective_dircap_rw])
 
-        yaml_path = os.path.join(self.nodedir, 'private', 'magic_folders.yaml')
-        log.debug("Writing magic-folder configs to %s...", yaml_path)
-        with open(yaml_path, 'w') as f:
-            f.write(yaml.safe_dump({'magic-folders': magic_folders}))
+        log.debug("Writing magic-folder configs to %s...", self.nodedir)
+        self._write_magic_folders_yaml(magic_folders)
 
         log.debug("Backing up legacy configuration...")
         shutil.move(self.magic_folders_dir, self.magic_folders_dir + '.backup')
@@ -445,6 +682,69 @@ class Tahoe():
 
         log.debug("Finished upgrading legacy configuration")
 
+    @property
+    def socket_path(self):
+        return os.path.join(self.nodedir, 'private', 'web.sock')
+
+    def get_webport_endpoint(self, webport=None):
+        # UNIX socket paths are limited to ~100 bytes (104 on macOS)
+        if webport == 'unix' and unix_webport_supported() and \
+                len(self.socket_path.encode()) < 100:
+            return 'unix:{}:mode=600'.format(
+                self.socket_path.replace('\\', '\\\\').replace(':', '\\:'))
+        if webport == 'unix':
+            log.warning(
+                "Cannot use a UNIX socket for the %s web API; using TCP",
+                self.name)
+        return TCP_WEBPORT
+
+    def get_web_socket(self):
+        # The path of the UNIX socket that the web API listens on, if any
+        webport = self.config_get('node', 'web.port')
+        if not webport or not webport.startswith('unix:'):
+            return None
+        path = re.split(r'(?<!\\):', webport[len('unix:'):])[0]
+        path = re.sub(r'\\(.)', r'\1', path)
+        return os.path.join(self.nodedir, path)
+
+    def set_webport(self, webport):
+        # Switch an existing node's web API to a UNIX socket ('unix') or a
+        # loopback TCP port ('tcp'); takes effect when the node is restarted
+        endpoint = self.get_webport_endpoint(webport)
+        if endpoint == self.config_get('node', 'web.port'):
+            return False
+        log.debug("Setting %s web.port to %s", self.name, endpoint)
+        self.config_set('node', 'web.port', endpoint)
+        if endpoint != TCP_WEBPORT:
+            try:
+                os.remove(os.path.join(self.nodedir, 'node.url'))  # Stale
+            except OSError:
+                pass
+        return True
+
+    def read_nodeurl(self):
+        if self.web_socket:
+            return UNIX_NODEURL
+        nodeurl = self.node_state.read('node.url', read_text)
+        if nodeurl is None:
+            raise OSError(errno.ENOENT, "No such file", os.path.join(
+                self.nodedir, 'node.url'))
+        return nodeurl
+
+    @property
+    def http(self):
+        # treq's module-level API (for the usual TCP web port) or, if the web
+        # API listens on a UNIX socket, an HTTPClient connected to it
+        if not self.web_socket:
+            return treq
+        if not self._http_client or self._http_client[0] != self.web_socket:
+            self._http_client = (
+                self.web_socket,
+                HTTPClient(Agent.usingEndpointFactory(
+                    reactor, UNIXEndpointFactory(self.web_socket),
+                    pool=HTTPConnectionPool(reactor))))
+        return self._http_client[1]
+
     @inlineCallbacks
     def start(self):
         log.debug('Starting "%s" tahoe client...', self.name)
@@ -457,6 +757,9 @@ class Tahoe():
             self.use_tor = True
         if os.path.isfile(self.pidfile):
             yield self.stop()
+        webport = get_preference('connection', 'webport')
+        if webport:
+            self.set_webport(webport)
         if self.multi_folder_support and os.path.isdir(self.magic_folders_dir):
             yield self.upgrade_legacy_config()
         pid = yield self.command(['run'], 'client running')
@@ -464,47 +767,52 @@ class Tahoe():
         if sys.platform == 'win32' and pid.isdigit():
             with open(self.pidfile, 'w') as f:
                 f.write(pid)
-        with open(os.path.join(self.nodedir, 'node.url')) as f:
-            self.nodeurl = f.read().strip()
-        token_file = os.path.join(self.nodedir, 'private', 'api_auth_token')
-        with open(token_file) as f:
-            self.api_token = f.read().strip()
+        self.web_socket = self.get_web_socket()
+        self.nodeurl = self.read_nodeurl()
+        self.api_token = self.node_state.read(
+            os.path.join('private', 'api_auth_token'), read_text)
         self.shares_happy = int(self.config_get('client', 'shares.happy'))
         self.load_magic_folders()
+        self.breaker.reset()
         self.state = Tahoe.STARTED
+        self.supervisor.start()
         log.debug(
             'Finished starting "%s" tahoe client (pid: %s)', self.name, pid)
 
     @inlineCallbacks
     def restart(self):
+        # Returns the number of seconds for which the node was unavailable
+        # (i.e., until it had reconnected to enough storage servers), or None
+        # if the restart was aborted. Use self.restarter.request() instead to
+        # coalesce restarts with others requested around the same time
         log.debug("Restarting %s client...", self.name)
         if self.state in (Tahoe.STOPPING, Tahoe.STARTING):
             log.warning(
                 'Aborting restart operation; '
                 'the "%s" client is already (re)starting',
                 self.name)
-            return
+            return None
         # Temporarily disable desktop notifications for (dis)connect events
         pref = get_preference('notifications', 'connection')
         set_preference('notifications', 'connection', 'false')
+        stopped = reactor.seconds()
         yield self.stop()
         yield self.start()
         yield self.await_ready()
+        downtime = reactor.seconds() - stopped
         yield deferLater(reactor, 1, lambda: None)
         set_preference('notifications', 'connection', pref)
         log.debug("Finished restarting %s client.", self.name)
+        return downtime
 
-    @inlineCallbacks
+    @web_request('grid_status', none_if_unreachable=True)
     def get_grid_status(self):
         if not self.nodeurl:
             return None
-        try:
-            resp = yield treq.get(self.nodeurl + '?t=json')
-        except ConnectError:
-            return None
+        resp = yield self.http.get(self.nodeurl + '?t=json')
         if resp.code == 200:
             content = yield treq.content(resp)
-            content = json.loads(content.decode('utf-8'))
+            content = yield decode_json(content)
             servers_connected = 0
             servers_known = 0
             available_space = 0
@@ -519,14 +827,11 @@ class Tahoe():
             return servers_connected, servers_known, available_space
         return None
 
-    @inlineCallbacks
+    @web_request('welcome', none_if_unreachable=True)
     def get_connected_servers(self):
         if not self.nodeurl:
             return None
-        try:
-            resp = yield treq.get(self.nodeurl)
-        except ConnectError:
-            return None
+        resp = yield self.http.get(self.nodeurl)
         if resp.code == 200:
             html = yield treq.content(resp)
             match = re.search(
@@ -552,37 +857,59 @@ class Tahoe():
             yield deferLater(reactor, 0.2, lambda: None)
             ready = yield self.is_ready()
 
-    @inlineCallbacks
+    @web_request('mkdir')
     def mkdir(self, parentcap=None, childname=None):
         url = self.nodeurl + 'uri'
         params = {'t': 'mkdir'}
         if parentcap and childname:
             url += '/' + parentcap
             params['name'] = childname
-        resp = yield treq.post(url, params=params)
+        resp = yield self.http.post(url, params=params)
+        if resp.code == 200:
+            content = yield treq.content(resp)
+            return content.decode('utf-8').strip()
+        raise TahoeWebError(
+            "Error creating Tahoe-LAFS directory: {}".format(resp.code))
+
+    @web_request('mkdir')
+    def mkdir_with_children(self, children):
+        # Creates a directory already containing `children` (a dict mapping
+        # names to caps) in a single request
+        resp = yield self.http.post(
+            self.nodeurl + 'uri', params={'t': 'mkdir-with-children'},
+            data=json.dumps(_children_json(children)).encode('utf-8'))
         if resp.code == 200:
             content = yield treq.content(resp)
             return content.decode('utf-8').strip()
         raise TahoeWebError(
             "Error creating Tahoe-LAFS directory: {}".format(resp.code))
 
+    @inlineCallbacks
+    def get_readcap(self, dircap):
+        readcap = derive_readcap(dircap)
+        if readcap:
+            return readcap
+        json_data = yield self.get_json(dircap, priority=INTERACTIVE)
+        return json_data[1]['ro_uri']
+
     @inlineCallbacks
     def create_rootcap(self):
         log.debug("Creating rootcap...")
         if os.path.exists(self.rootcap_path):
             raise OSError(
                 "Rootcap file already exists: {}".format(self.rootcap_path))
-        self.rootcap = yield self.mkdir()
+        self.rootcap = yield self.mkdir(priority=SETUP)
         with open(self.rootcap_path, 'w') as f:
             f.write(self.rootcap)
+        self.node_state.invalidate(os.path.join('private', 'rootcap'))
         log.debug("Rootcap saved to file: %s", self.rootcap_path)
         return self.rootcap
 
-    @inlineCallbacks
+    @web_request('upload')
     def upload(self, local_path):
         log.debug("Uploading %s...", local_path)
         with open(local_path, 'rb') as f:
-            resp = yield treq.put('{}uri'.format(self.nodeurl), f)
+            resp = yield self.http.put('{}uri'.format(self.nodeurl), f)
         if resp.code == 200:
             content = yield treq.content(resp)
             log.debug("Successfully uploaded %s", local_path)
@@ -590,10 +917,10 @@ class Tahoe():
         content = yield treq.content(resp)
         raise TahoeWebError(content.decode('utf-8'))
 
-    @inlineCallbacks
+    @web_request('download')
     def download(self, cap, local_path):
         log.debug("Downloading %s...", local_path)
-        resp = yield treq.get('{}uri/{}'.format(self.nodeurl, cap))
+        resp = yield self.http.get('{}uri/{}'.format(self.nodeurl, cap))
         if resp.code == 200:
             with open(local_path, 'wb') as f:
                 yield treq.collect(resp, f.write)
@@ -602,7 +929,7 @@ class Tahoe():
             content = yield treq.content(resp)
             raise TahoeWebError(content.decode('utf-8'))
 
-    @inlineCallbacks
+    @web_request('link')
     def link(self, dircap, childname, childcap):
         dircap_hash = hashlib.sha256(dircap.encode()).hexdigest()
         childcap_hash = hashlib.sha256(childcap.encode()).hexdigest()
@@ -610,7 +937,7 @@ class Tahoe():
                   dircap_hash)
         yield self.lock.acquire()
         try:
-            resp = yield treq.post(
+            resp = yield self.http.post(
                 '{}uri/{}/?t=uri&name={}&uri={}'.format(
                     self.nodeurl, dircap, childname, childcap))
         finally:
@@ -621,13 +948,34 @@ class Tahoe():
         log.debug('Done linking "%s" (%s) into %s', childname, childcap_hash,
                   dircap_hash)
 
-    @inlineCallbacks
+    @web_request('link')
+    def set_children(self, dircap, children):
+        # Links (or replaces) all of `children` (a dict mapping names to caps)
+        # into `dircap` in a single request
+        dircap_hash = hashlib.sha256(dircap.encode()).hexdigest()
+        log.debug('Linking %i children into %s...', len(children),
+                  dircap_hash)
+        yield self.lock.acquire()
+        try:
+            resp = yield self.http.post(
+                '{}uri/{}/'.format(self.nodeurl, dircap),
+                params={'t': 'set_children'},
+                data=json.dumps(_children_json(children)).encode('utf-8'))
+        finally:
+            yield self.lock.release()
+        if resp.code != 200:
+            content = yield treq.content(resp)
+            raise TahoeWebError(content.decode('utf-8'))
+        log.debug('Done linking %i children into %s', len(children),
+                  dircap_hash)
+
+    @web_request('unlink')
     def unlink(self, dircap, childname):
         dircap_hash = hashlib.sha256(dircap.encode()).hexdigest()
         log.debug('Unlinking "%s" from %s...', childname, dircap_hash)
         yield self.lock.acquire()
         try:
-            resp = yield treq.post(
+            resp = yield self.http.post(
                 '{}uri/{}/?t=unlink&name={}'.format(
                     self.nodeurl, dircap, childname))
         finally:
@@ -638,20 +986,29 @@ class Tahoe():
         log.debug('Done unlinking "%s" from %s', childname, dircap_hash)
 
     @inlineCallbacks
+    def link_magic_folders_to_rootcap(self, names):
+        log.debug("Linking folders %s to rootcap...", names)
+        children = {}
+        for name in names:
+            admin_dircap = self.get_admin_dircap(name)
+            if admin_dircap:
+                children[name + ' (admin)'] = admin_dircap
+            children[name + ' (collective)'] = self.get_collective_dircap(
+                name)
+            children[name + ' (personal)'] = self.get_magic_folder_dircap(
+                name)
+        try:
+            yield self.set_children(self.get_rootcap(), children)
+        except Exception as e:  # pylint: disable=broad-except
+            # Any still-unlinked folders are linked by ensure_folder_links()
+            # on the next start
+            log.warning("Error linking folders %s to rootcap: %s: %s",
+                        names, type(e).__name__, str(e))
+            return
+        log.debug("Successfully linked folders %s to rootcap", names)
+
     def link_magic_folder_to_rootcap(self, name):
-        log.debug("Linking folder '%s' to rootcap...", name)
-        rootcap = self.get_rootcap()
-        tasks = []
-        admin_dircap = self.get_admin_dircap(name)
-        if admin_dircap:
-            tasks.append(self.link(rootcap, name + ' (admin)', admin_dircap))
-        collective_dircap = self.get_collective_dircap(name)
-        tasks.append(
-            self.link(rootcap, name + ' (collective)', collective_dircap))
-        personal_dircap = self.get_magic_folder_dircap(name)
-        tasks.append(self.link(rootcap, name + ' (personal)', personal_dircap))
-        yield DeferredList(tasks)
-        log.debug("Successfully linked folder '%s' to rootcap", name)
+        return self.link_magic_folders_to_rootcap([name])
 
     @inlineCallbacks
     def unlink_magic_folder_from_rootcap(self, name):
@@ -667,31 +1024,65 @@ class Tahoe():
         log.debug("Successfully unlinked folder '%s' from rootcap", name)
 
     @inlineCallbacks
-    def _create_magic_folder(self, path, alias, poll_interval=60):
+    def _provision_magic_folder(self, path, poll_interval=60):
+        # Creates the folder's upload directory and then its collective
+        # (admin) directory with the former's readcap already linked into it;
+        # readcaps are derived locally where possible, leaving one request
+        # per directory. Returns an (admin dircap, yaml settings) tuple
         log.debug("Creating magic-folder for %s...", path)
-        admin_dircap = yield self.mkdir()
-        admin_dircap_json = yield self.get_json(admin_dircap)
-        collective_dircap = admin_dircap_json[1]['ro_uri']
         upload_dircap = yield self.mkdir()
-        upload_dircap_json = yield self.get_json(upload_dircap)
-        upload_dircap_ro = upload_dircap_json[1]['ro_uri']
-        yield self.link(admin_dircap, 'admin', upload_dircap_ro)
-        yaml_path = os.path.join(self.nodedir, 'private', 'magic_folders.yaml')
-        try:
-            with open(yaml_path) as f:
-                yaml_data = yaml.safe_load(f)
-        except OSError:
-            yaml_data = {}
-        folders_data = yaml_data.get('magic-folders', {})
-        folders_data[os.path.basename(path)] = {
+        upload_dircap_ro = yield self.get_readcap(upload_dircap)
+        admin_dircap = yield self.mkdir_with_children(
+            {'admin': upload_dircap_ro})
+        collective_dircap = yield self.get_readcap(admin_dircap)
+        return admin_dircap, {
             'directory': path,
             'collective_dircap': collective_dircap,
             'upload_dircap': upload_dircap,
             'poll_interval': poll_interval,
         }
-        with open(yaml_path, 'w') as f:
-            f.write(yaml.safe_dump({'magic-folders': folders_data}))
-        self.add_alias(alias, admin_dircap)
+
+    def _save_magic_folders(self, folders):
+        # `folders` maps aliases to (admin dircap, yaml settings) tuples
+        yaml_data = self._read_magic_folders_yaml()
+        folders_data = yaml_data.get('magic-folders', {})
+        aliases = {}
+        for alias, (admin_dircap, folder_data) in folders.items():
+            folders_data[os.path.basename(folder_data['directory'])] = \
+                folder_data
+            aliases[alias] = admin_dircap
+        self._write_magic_folders_yaml(folders_data)
+        self._set_aliases(aliases)
+
+    @inlineCallbacks
+    def _create_magic_folder(self, path, alias, poll_interval=60):
+        folder = yield self._provision_magic_folder(path, poll_interval)
+        self._save_magic_folders({alias: folder})
+
+    @inlineCallbacks
+    def _call_with_retry(self, calls):
+        # Calls each of `calls` (magic-folder creation steps) concurrently
+        # once the node is ready, and those that failed once more a few
+        # seconds later. Returns a list of (success, result) tuples, as
+        # DeferredList does
+        yield self.await_ready()
+        results = yield DeferredList(
+            [maybeDeferred(call) for call in calls], consumeErrors=True)
+        retries = [i for i, (success, _) in enumerate(results) if not success]
+        if retries:
+            for i in retries:
+                failure = results[i][1]
+                log.debug(
+                    'Magic-folder creation failed: "%s: %s"; retrying...',
+                    failure.type.__name__, failure.getErrorMessage())
+            yield deferLater(reactor, 3, lambda: None)  # XXX
+            yield self.await_ready()
+            retried = yield DeferredList(
+                [maybeDeferred(calls[i]) for i in retries],
+                consumeErrors=True)
+            for i, result in zip(retries, retried):
+                results[i] = result
+        return results
 
     @inlineCallbacks
     def create_magic_folder(self, path, join_code=None, admin_dircap=None,
@@ -710,23 +1101,53 @@ class Tahoe():
             if admin_dircap:
                 self.add_alias(alias, admin_dircap)
         else:
-            yield self.await_ready()
             #yield self.command(['magic-folder', 'create', '-p', poll_interval,
             #                    '-n', name, alias, 'admin', path])
-            try:
-                yield self._create_magic_folder(path, alias, poll_interval)
-            except Exception as e:  # pylint: disable=broad-except
-                log.debug(
-                    'Magic-folder creation failed: "%s: %s"; retrying...',
-                    type(e).__name__, str(e))
-                yield deferLater(reactor, 3, lambda: None)  # XXX
-                yield self.await_ready()
-                yield self._create_magic_folder(path, alias, poll_interval)
+            results = yield self._call_with_retry([
+                lambda: self._create_magic_folder(path, alias, poll_interval)
+            ])
+            success, result = results[0]
+            if not success:
+                result.raiseException()
         if not self.config_get('magic_folder', 'enabled'):
             self.config_set('magic_folder', 'enabled', 'True')
         self.load_magic_folders()
         yield self.link_magic_folder_to_rootcap(name)
 
+    @inlineCallbacks
+    def create_magic_folders(self, paths, poll_interval=60):
+        # Like create_magic_folder() (without a join code) for many folders at
+        # once: their directories are created concurrently, after which the
+        # config and aliases are written, and the folders are linked to the
+        # rootcap, a single time for all of them. Returns a list of (success,
+        # result) tuples for `paths`, as DeferredList does
+        paths = [os.path.realpath(os.path.expanduser(p)) for p in paths]
+        poll_interval = str(poll_interval)
+        for path in paths:
+            try:
+                os.makedirs(path)
+            except OSError:
+                pass
+        results = yield self._call_with_retry([
+            partial(self._provision_magic_folder, p, poll_interval)
+            for p in paths
+        ])
+        folders = {}
+        names = []
+        for path, (success, result) in zip(paths, results):
+            if success:
+                name = os.path.basename(path)
+                alias = hashlib.sha256(name.encode()).hexdigest() + ':'
+                folders[alias] = result
+                names.append(name)
+        if folders:
+            self._save_magic_folders(folders)
+            if not self.config_get('magic_folder', 'enabled'):
+                self.config_set('magic_folder', 'enabled', 'True')
+            self.load_magic_folders()
+            yield self.link_magic_folders_to_rootcap(names)
+        return results
+
     @inlineCallbacks
     def restore_magic_folder(self, folder_name, dest):
         data = self.remote_magic_folders[folder_name]
@@ -790,36 +1211,64 @@ class Tahoe():
             yield self.command(['magic-folder', 'leave', '-n', name])
             self.remove_alias(hashlib.sha256(name.encode()).hexdigest())
 
-    @inlineCallbacks
+    @web_request('magic_folder_status', none_if_unreachable=True)
     def get_magic_folder_status(self, name):
         if not self.nodeurl or not self.api_token:
             return None
-        try:
-            resp = yield treq.post(
-                self.nodeurl + 'magic_folder',
-                {'token': self.api_token, 'name': name, 't': 'json'}
-            )
-        except ConnectError:
-            return None
+        resp = yield self.http.post(
+            self.nodeurl + 'magic_folder',
+            {'token': self.api_token, 'name': name, 't': 'json'}
+        )
         if resp.code == 200:
             content = yield treq.content(resp)
-            return json.loads(content.decode('utf-8'))
+            json_data = yield decode_json(content)
+            return json_data
         return None
 
-    @inlineCallbacks
+    @web_request('json', none_if_unreachable=True)
     def get_json(self, cap):
         if not cap or not self.nodeurl:
             return None
         uri = '{}uri/{}/?t=json'.format(self.nodeurl, cap)
-        try:
-            resp = yield treq.get(uri)
-        except ConnectError:
-            return None
+        resp = yield self.http.get(uri)
         if resp.code == 200:
             content = yield treq.content(resp)
-            return json.loads(content.decode('utf-8'))
+            json_data = yield decode_json(content)
+            return json_data
         return None
 
+    @web_request('json', none_if_unreachable=True)
+    def get_listing(self, cap):
+        # Like get_json() but parses the directory's children as they arrive,
+        # keeping only the metadata of the files (see _extract_metadata());
+        # returns a list of FileEntry objects or None if `cap` does not refer
+        # to a directory
+        if not cap or not self.nodeurl:
+            return None
+        uri = '{}uri/{}/?t=json'.format(self.nodeurl, cap)
+        resp = yield self.http.get(uri)
+        if resp.code != 200:
+            return None
+        records = []
+
+        def on_child(name, node):
+            # Magic folder DMDs are flat: a file in a subdirectory is linked
+            # as "subdir@_file" while the subdirectory itself is only marked
+            # by a "subdir@_" entry, which is ignored (see Tahoe-LAFS #2924)
+            # https://tahoe-lafs.org/trac/tahoe-lafs/ticket/2924
+            if name.endswith('@_'):
+                return
+            try:
+                metadata = self._extract_metadata(node[1])
+            except (IndexError, KeyError, TypeError):
+                return
+            records.append(
+                FileEntry(name.replace('@_', os.path.sep), **metadata))
+        parser = ListingParser(on_child)
+        yield treq.collect(resp, parser.feed)
+        parser.close()
+        return records if parser.has_children else None
+
     @staticmethod
     def read_cap_from_file(filepath):
         try:
@@ -831,7 +1280,8 @@ class Tahoe():
 
     def get_rootcap(self):
         if not self.rootcap:
-            self.rootcap = self.read_cap_from_file(self.rootcap_path)
+            self.rootcap = self.node_state.read(
+                os.path.join('private', 'rootcap'), read_text)
         return self.rootcap
 
     def get_admin_dircap(self, name):
@@ -891,12 +1341,15 @@ class Tahoe():
             yield self.create_rootcap()
         if self.magic_folders:
             remote_folders = yield self.get_magic_folders_from_rootcap()
+            unlinked = []
             for folder in self.magic_folders:
                 if folder not in remote_folders:
-                    self.link_magic_folder_to_rootcap(folder)
+                    unlinked.append(folder)
                 else:
                     log.debug('Folder "%s" already linked to rootcap; '
                               'skipping.', folder)
+            if unlinked:
+                self.link_magic_folders_to_rootcap(unlinked)
 
     @inlineCallbacks
     def get_magic_folder_members(self, name, content=None):
@@ -938,33 +1391,33 @@ class Tahoe():
             'cap': cap
         }
 
-    @inlineCallbacks
-    def get_magic_folder_state(self, name, members=None):
+    @staticmethod
+    def _build_history(listings):
+        # listings: [(member, records), ...]; called from a worker thread for
+        # large folders so must not touch any (non-local) state
         total_size = 0
         history_dict = {}
+        for member, records in listings:
+            for entry in records:
+                entry.member = member
+                history_dict[entry.mtime] = entry
+                total_size += entry.size
+        history_od = OrderedDict(sorted(history_dict.items()))
+        return total_size, history_od
+
+    @inlineCallbacks
+    def get_magic_folder_state(self, name, members=None):
+        listings = []
         if not members:
             members = yield self.get_magic_folder_members(name)
         if members:
             for member, dircap in members:
-                json_data = yield self.get_json(dircap)
-                try:
-                    children = json_data[1]['children']
-                except (TypeError, KeyError):
-                    continue
-                for filenode, data in children.items():
-                    if filenode.endswith('@_'):
-                        # Ignore subdirectories, due to Tahoe-LAFS bug #2924
-                        # https://tahoe-lafs.org/trac/tahoe-lafs/ticket/2924
-                        continue
-                    try:
-                        metadata = self._extract_metadata(data[1])
-                    except KeyError:
-                        continue
-                    metadata['path'] = filenode.replace('@_', os.path.sep)
-                    metadata['member'] = member
-                    history_dict[metadata['mtime']] = metadata
-                    total_size += metadata['size']
-        history_od = OrderedDict(sorted(history_dict.items()))
+                records = yield self.get_listing(dircap)
+                if records is not None:
+                    listings.append((member, records))
+        num_records = sum(len(records) for _, records in listings)
+        total_size, history_od = yield run_offloadable(
+            num_records >= OFFLOAD_CHILDREN, self._build_history, listings)
         latest_mtime = next(reversed(history_od), 0)
         return members, total_size, latest_mtime, history_od
 
@@ -2,7 +2,6 @@
 
 import logging
 
-from PyQt5.QtWidgets import QMessageBox
 from twisted.internet.defer import inlineCallbacks
 import txtorcon
 
@@ -44,6 +43,7 @@ def get_tor(reactor):  # TODO: Add launch option?
 
 @inlineCallbacks
 def get_tor_with_prompt(reactor, parent=None):
+    from PyQt5.QtWidgets import QMessageBox
     tor = yield get_tor(reactor)
     while not tor:
         msgbox = QMessageBox(parent)
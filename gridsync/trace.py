@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+
+from collections import defaultdict, deque
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks, succeed
+from twisted.internet.task import deferLater
+
+from gridsync.entries import FileEntry
+from gridsync.tahoe import Tahoe
+
+
+RECORDED_METHODS = (
+    'get_grid_status', 'get_magic_folder_status', 'get_json', 'get_listing')
+
+
+def redact_cap(cap):
+    # Replace the secret parts of a capability string with (consistent)
+    # hashes, preserving its type, parameters, and the fact that read- and
+    # write-caps for the same directory share a fingerprint
+    parts = []
+    for part in cap.split(':'):
+        if part.isdigit() or part.upper() == part:
+            parts.append(part)
+        else:
+            parts.append(hashlib.sha256(part.encode()).hexdigest()[:26])
+    return ':'.join(parts)
+
+
+def redact(obj):
+    if isinstance(obj, str):
+        return redact_cap(obj) if obj.startswith('URI:') else obj
+    if isinstance(obj, (list, tuple)):
+        return [redact(item) for item in obj]
+    if isinstance(obj, dict):
+        return {key: redact(value) for key, value in obj.items()}
+    return obj
+
+
+def to_json(obj):
+    if isinstance(obj, FileEntry):
+        return obj.as_dict()
+    if isinstance(obj, (list, tuple)):
+        return [to_json(item) for item in obj]
+    return obj
+
+
+class TraceRecorder():
+    def __init__(self, path, redact_caps=True):
+        self.path = path
+        self.redact_caps = redact_caps
+        self.file = gzip.open(path, 'wt')
+        self.start_time = time.time()
+        self.gateways = []
+
+    def write(self, record):
+        record['t'] = round(time.time() - self.start_time, 6)
+        if self.redact_caps:
+            record = redact(record)
+        self.file.write(json.dumps(record) + '\n')
+
+    def attach(self, gateway):
+        gateway.load_magic_folders()
+        folders = {}
+        for name, settings in gateway.magic_folders.items():
+            folders[name] = {
+                'collective_dircap': settings.get('collective_dircap'),
+                'upload_dircap': settings.get('upload_dircap')
+            }
+        shares_happy = gateway.shares_happy
+        if shares_happy is None:  # Not started yet
+            shares_happy = int(gateway.config_get('client', 'shares.happy'))
+        self.write({
+            'type': 'gateway',
+            'gateway': gateway.name,
+            'shares_happy': shares_happy,
+            'folders': folders
+        })
+        for method in RECORDED_METHODS:
+            setattr(gateway, method, self._wrap(gateway, method))
+        gateway.monitor.check_finished.connect(
+            lambda: self.write({'type': 'tick', 'gateway': gateway.name}))
+        self.gateways.append(gateway)
+        logging.debug("Recording %s trace to %s", gateway.name, self.path)
+
+    def _wrap(self, gateway, method):
+        func = getattr(gateway, method)
+
+        def on_result(result, args):
+            self.write({
+                'type': 'call',
+                'gateway': gateway.name,
+                'method': method,
+                'args': list(args),
+                'result': to_json(result)
+            })
+            return result
+
+        def wrapper(*args, **kwargs):
+            d = func(*args, **kwargs)
+            d.addCallback(on_result, args)
+            return d
+        return wrapper
+
+    def close(self):
+        for gateway in self.gateways:
+            for method in RECORDED_METHODS:
+                try:
+                    delattr(gateway, method)
+                except AttributeError:
+                    pass
+        self.gateways = []
+        self.file.close()
+
+
+def load_trace(path):
+    with gzip.open(path, 'rt') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ReplayGateway(Tahoe):
+    def __init__(self, header, nodedir):
+        super(ReplayGateway, self).__init__(
+            os.path.join(nodedir, header['gateway']))
+        self.nodeurl = 'http://replay.invalid/'
+        self.shares_happy = header['shares_happy']
+        for name, settings in header['folders'].items():
+            self.magic_folders[name] = dict(settings)
+        # Only the checks driven by Monitor.do_checks() are replayed
+        self.monitor.grid_checker.connected.disconnect(
+            self.monitor.scan_rootcap)
+        self.responses = defaultdict(deque)  # (method, args) -> (tick, result)
+        self.last_responses = {}
+        self.current_tick = 0
+        self.misses = 0
+
+    def add_response(self, tick, method, args, result):
+        self.responses[(method, json.dumps(args))].append((tick, result))
+
+    def _replay(self, method, *args):
+        # Responses are handed out in the order that they were recorded but
+        # never ahead of the tick they were recorded in; responses left over
+        # from earlier ticks (e.g., from calls made outside of the monitor)
+        # are skipped
+        key = (method, json.dumps(list(args)))
+        queue = self.responses.get(key)
+        while queue and queue[0][0] < self.current_tick:
+            self.last_responses[key] = queue.popleft()[1]
+        if queue and queue[0][0] == self.current_tick:
+            self.last_responses[key] = queue.popleft()[1]
+        elif key not in self.last_responses:
+            self.misses += 1
+        return self.last_responses.get(key)
+
+    def get_grid_status(self):
+        return succeed(self._replay('get_grid_status'))
+
+    def get_magic_folder_status(self, name):
+        return succeed(self._replay('get_magic_folder_status', name))
+
+    def get_json(self, cap, priority=None):  # pylint: disable=unused-argument
+        if not cap:
+            return succeed(None)
+        return succeed(self._replay('get_json', cap))
+
+    def get_listing(self, cap, priority=None):  # pylint: disable=unused-argument
+        if not cap:
+            return succeed(None)
+        records = self._replay('get_listing', cap)
+        if records is None:
+            return succeed(None)
+        # Fresh entries, since the Monitor annotates them (e.g., with actions)
+        return succeed([FileEntry(**record) for record in records])
+
+
+class TraceReplayer():
+    def __init__(self, records, speed=None, trace_memory=False):
+        # speed: None to replay as fast as possible, 1 for real-time, 10 for
+        # ten times faster than real-time, etc.
+        self.speed = speed
+        self.trace_memory = trace_memory
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.gateways = {}
+        self.ticks = defaultdict(list)  # gateway name -> [timestamps]
+        for record in records:
+            name = record['gateway']
+            if record['type'] == 'gateway':
+                self.gateways[name] = ReplayGateway(record, self.tmpdir.name)
+            elif record['type'] == 'call':
+                self.gateways[name].add_response(
+                    len(self.ticks[name]), record['method'], record['args'],
+                    record['result'])
+            elif record['type'] == 'tick':
+                self.ticks[name].append(record['t'])
+
+    @classmethod
+    def from_file(cls, path, speed=None, trace_memory=False):
+        return cls(load_trace(path), speed, trace_memory)
+
+    @inlineCallbacks
+    def run(self):
+        # Merge every gateway's ticks into a single, time-ordered schedule
+        schedule = sorted(
+            (t, name, tick) for name, times in self.ticks.items()
+            for tick, t in enumerate(times))
+        if self.trace_memory:
+            tracemalloc.start()
+        start_wall = time.time()
+        start_cpu = time.process_time()
+        for t, name, tick in schedule:
+            if self.speed:
+                delay = t / self.speed - (time.time() - start_wall)
+                if delay > 0:
+                    yield deferLater(reactor, delay, lambda: None)
+            gateway = self.gateways[name]
+            gateway.current_tick = tick
+            yield gateway.monitor.do_checks()
+        stats = {
+            'ticks': len(schedule),
+            'wall_time': time.time() - start_wall,
+            'cpu_time': time.process_time() - start_cpu,
+            'misses': sum(g.misses for g in self.gateways.values())
+        }
+        if self.trace_memory:
+            stats['peak_memory'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return stats
+
+    def close(self):
+        self.tmpdir.cleanup()
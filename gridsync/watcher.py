@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from twisted.internet import reactor
+from twisted.python.filepath import FilePath
+
+try:
+    from twisted.internet import inotify
+except ImportError:  # Not Linux
+    inotify = None
+
+
+# A burst of changes is reported once it has been quiet for DEBOUNCE_DELAY
+# seconds (but no later than MAX_DELAY seconds after it began)
+DEBOUNCE_DELAY = 1.0
+MAX_DELAY = 5.0
+
+
+class FolderWatcher():
+    # Watches a (magic folder's local) directory tree with inotify, calling
+    # `callback()` once for every burst of changes. There is no fallback
+    # where inotify is unavailable: rescanning the tree would cost more I/O
+    # than the Monitor's regular checks, which already pick up local changes
+    def __init__(self, path, callback, clock=None):
+        self.path = path
+        self.callback = callback
+        self.clock = clock or reactor
+        self.notifier = None
+        self.delayed_call = None
+        self.burst_started = 0
+
+    def start(self):
+        # Returns True if the directory is now being watched
+        if inotify is None:
+            return False
+        try:
+            self.notifier = inotify.INotify()
+            self.notifier.startReading()
+            self.notifier.watch(
+                FilePath(self.path),
+                mask=(inotify.IN_CREATE | inotify.IN_DELETE
+                      | inotify.IN_CLOSE_WRITE | inotify.IN_MOVED_FROM
+                      | inotify.IN_MOVED_TO | inotify.IN_ATTRIB),
+                autoAdd=True, recursive=True, callbacks=[self._on_event])
+        except Exception as e:  # pylint: disable=broad-except
+            logging.warning(
+                "Error watching %s with inotify: %s", self.path, str(e))
+            self._stop_notifier()
+            return False
+        logging.debug("Watching %s with inotify", self.path)
+        return True
+
+    def _stop_notifier(self):
+        if self.notifier:
+            self.notifier.loseConnection()
+            self.notifier = None
+
+    def stop(self):
+        self._stop_notifier()
+        if self.delayed_call and self.delayed_call.active():
+            self.delayed_call.cancel()
+        self.delayed_call = None
+
+    def _on_event(self, _, filepath, mask):  # pylint: disable=unused-argument
+        self.changed()
+
+    def changed(self):
+        now = self.clock.seconds()
+        if self.delayed_call and self.delayed_call.active():
+            delay = min(
+                DEBOUNCE_DELAY, self.burst_started + MAX_DELAY - now)
+            self.delayed_call.reset(max(0, delay))
+            return
+        self.burst_started = now
+        self.delayed_call = self.clock.callLater(DEBOUNCE_DELAY, self._fire)
+
+    def _fire(self):
+        self.delayed_call = None
+        self.callback()
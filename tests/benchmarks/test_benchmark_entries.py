@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+import gc
+import os
+import tracemalloc
+
+import pytest
+from pytest_twisted import inlineCallbacks
+
+from fake_tahoe import (
+    FakeTahoeNode, listen, make_nodedir, make_synthetic_grid, start_gateway)
+
+
+ENTRY_COUNTS = [
+    # entries (in total); every folder has 2 members
+    pytest.param(2000),
+    pytest.param(100000, marks=pytest.mark.slow),
+]
+
+
+def make_caps_unique(node):
+    # Files with identical contents share a cap; real folders don't
+    for children in node.dirnodes.values():
+        for i, (name, (cap, metadata)) in enumerate(children.items()):
+            if cap.startswith('URI:CHK:'):
+                cap = cap.replace('URI:CHK:', 'URI:CHK:{:08d}'.format(i), 1)
+                metadata['last_downloaded_uri'] = cap
+                children[name] = (cap, metadata)
+
+
+@pytest.mark.parametrize('num_entries', ENTRY_COUNTS)
+@inlineCallbacks
+def test_benchmark_entries(benchmark_recorder, tmpdir, num_entries):
+    node = FakeTahoeNode()
+    nodedir = os.path.join(str(tmpdir), 'BenchmarkGrid')
+    port = listen(node)
+    make_nodedir(
+        nodedir, 'http://127.0.0.1:{}/'.format(port.getHost().port),
+        node.api_token)
+    make_synthetic_grid(node, nodedir, 1, 2, num_entries // 2)
+    make_caps_unique(node)
+    gateway = start_gateway(nodedir)
+    gateway.monitor.grid_checker.connected.disconnect(
+        gateway.monitor.scan_rootcap)
+    yield gateway.monitor.do_checks()
+    checker = gateway.monitor.magic_folder_checkers['Folder-0']
+    checker.history = {}
+
+    gc.collect()
+    tracemalloc.start()
+    yield checker.do_remote_scan()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # The previous scan's history is still held while the next is compared
+    # against it, so this shows how much of the two is (not) shared
+    tracemalloc.start()
+    yield checker.do_remote_scan()
+    rescan_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    yield port.stopListening()
+
+    benchmark_recorder.record('entries_{}'.format(num_entries), {
+        'entries': num_entries,
+        'memory': {
+            'history_retained': retained,
+            'history_bytes_per_entry': retained // num_entries,
+            'rescan_peak': rescan_peak
+        }
+    })
+    assert len(checker.history) == num_entries
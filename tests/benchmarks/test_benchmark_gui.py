@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+import os
+import statistics
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from PyQt5.QtCore import QEvent, QObject, Qt
+from PyQt5.QtWidgets import QApplication
+
+from gridsync.entries import FileEntry
+from gridsync.gui.history import HistoryListView
+from gridsync.gui.view import View
+from gridsync.monitor import Monitor
+
+
+FOLDER_COUNTS = [
+    pytest.param(10),
+    pytest.param(100),
+    pytest.param(1000, marks=pytest.mark.slow),
+    pytest.param(5000, marks=pytest.mark.slow),
+]
+
+HISTORY_COUNTS = [
+    pytest.param(2000),
+    pytest.param(10000, marks=pytest.mark.slow),
+]
+
+
+class PaintCounter(QObject):
+    def __init__(self, widget):
+        super(PaintCounter, self).__init__()
+        self.count = 0
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):  # pylint: disable=unused-argument
+        if event.type() == QEvent.Paint:
+            self.count += 1
+        return False
+
+
+def make_gateway(tmpdir, num_folders=0):
+    gateway = MagicMock()
+    gateway.name = 'BenchmarkGrid'
+    gateway.use_tor = False
+    gateway.monitor = Monitor(gateway)
+    folders = {}
+    for i in range(num_folders):
+        name = 'Folder-{}'.format(i)
+        folders[name] = {'directory': os.path.join(str(tmpdir), name)}
+    gateway.load_magic_folders.return_value = folders
+    gateway.get_magic_folder_directory.side_effect = \
+        lambda name: os.path.join(str(tmpdir), name)
+    return gateway
+
+
+def get_rss():
+    # The process' current (rather than peak) RSS, so that each benchmark can
+    # report how much its widgets grew it by; Linux only
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE')
+
+
+@pytest.fixture()
+def rss_growth():
+    before = get_rss()
+
+    def growth():
+        after = get_rss()
+        if before is None or after is None:
+            return None
+        return max(0, after - before)
+    return growth
+
+
+def flush():
+    # Deliver pending (coalesced) update requests so that paint costs are
+    # included in the timings
+    QApplication.processEvents()
+    QApplication.processEvents()
+
+
+def timed_batches(batches):
+    latencies = []
+    for batch in batches:
+        start = time.perf_counter()
+        batch()
+        flush()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+@pytest.mark.parametrize('num_folders', FOLDER_COUNTS)
+def test_benchmark_view(benchmark_recorder, rss_growth, qtbot, tmpdir,
+                        num_folders):
+    gateway = make_gateway(tmpdir, num_folders)
+    monitor = gateway.monitor
+    names = sorted(gateway.load_magic_folders.return_value)
+    timings = {}
+
+    start = time.perf_counter()
+    view = View(MagicMock(), gateway)
+    qtbot.addWidget(view)
+    view.resize(800, 600)
+    view.show()
+    flush()
+    timings['populate'] = time.perf_counter() - start
+    paints = PaintCounter(view.viewport())
+
+    def burst(signal, value):
+        return lambda: [signal.emit(name, value) for name in names]
+
+    batches = []
+    for i in range(5):
+        batches.append(burst(monitor.status_updated, 1 if i % 2 else 2))
+        batches.append(
+            burst(monitor.mtime_updated, int(time.time()) - 3600 + i))
+        batches.append(burst(monitor.size_updated, 1024 * (i + 1)))
+    latencies = timed_batches(batches)
+    timings['update_batch_median'] = statistics.median(latencies)
+    timings['update_batch_max'] = max(latencies)
+
+    start = time.perf_counter()
+    view.sortByColumn(3, Qt.AscendingOrder)
+    flush()
+    timings['sort'] = time.perf_counter() - start
+
+    benchmark_recorder.record('view_{}'.format(num_folders), {
+        'folders': num_folders,
+        'paints': {'update_batches': paints.count},
+        'timings': timings,
+        'memory': {'rss_growth': rss_growth()}
+    })
+    assert view.source_model.rowCount() == num_folders
+
+
+@pytest.mark.parametrize('num_events', HISTORY_COUNTS)
+def test_benchmark_history(benchmark_recorder, rss_growth, qtbot, tmpdir,
+                           num_events):
+    gateway = make_gateway(tmpdir)
+    view = HistoryListView(gateway)
+    qtbot.addWidget(view)
+    view.resize(400, 600)
+    view.show()
+    flush()
+    paints = PaintCounter(view.viewport())
+    timings = {}
+
+    def event_burst(first, count):
+        def burst():
+            for i in range(first, first + count):
+                gateway.monitor.file_updated.emit(
+                    'Folder-{}'.format(i % 10), FileEntry(
+                        'file-{}.txt'.format(i), 1024, 1500000000 + i,
+                        member='admin', action='added'))
+        return burst
+
+    batch_size = 500
+    latencies = timed_batches([
+        event_burst(i, batch_size) for i in range(0, num_events, batch_size)])
+    timings['add_batch_median'] = statistics.median(latencies)
+    timings['add_batch_max'] = max(latencies)
+    add_paints = paints.count
+
+    scrollbar = view.verticalScrollBar()
+
+    def scroll_step():
+        scrollbar.setValue(scrollbar.value() + view.viewport().height())
+
+    start = time.perf_counter()
+    steps = 0
+    while view.model().rowCount() < num_events or \
+            scrollbar.value() < scrollbar.maximum():
+        scroll_step()
+        flush()
+        steps += 1
+    timings['scroll_to_end'] = time.perf_counter() - start
+    timings['scroll_step_mean'] = timings['scroll_to_end'] / steps
+
+    benchmark_recorder.record('history_{}'.format(num_events), {
+        'events': num_events,
+        'paints': {
+            'add_batches': add_paints,
+            'scroll': paints.count - add_paints
+        },
+        'timings': timings,
+        'memory': {'rss_growth': rss_growth()}
+    })
+    assert view.model().rowCount() == num_events
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import pytest
+from pytest_twisted import inlineCallbacks
+
+from fake_tahoe import (
+    FakeTahoeNode, listen, listen_unix, make_nodedir, make_synthetic_grid,
+    start_gateway)
+from gridsync.tahoe import unix_webport_supported
+
+
+GRIDS = [
+    # name, servers, folders, members, files (per member)
+    pytest.param('small', 10, 2, 2, 10),
+    pytest.param('medium', 10, 10, 3, 100, marks=pytest.mark.slow),
+    pytest.param('large', 50, 50, 5, 200, marks=pytest.mark.slow),
+]
+
+
+@inlineCallbacks
+def start_and_check(nodedir):
+    gateway = start_gateway(nodedir)
+    # The rootcap scan normally triggered by the first "connected" signal
+    # runs concurrently with later ticks; it is measured on its own instead
+    gateway.monitor.grid_checker.connected.disconnect(
+        gateway.monitor.scan_rootcap)
+    yield gateway.await_ready()
+    yield gateway.monitor.do_checks()
+    return gateway
+
+
+@pytest.fixture(params=['tcp', 'unix'])
+def transport(request):
+    if request.param == 'unix' and not unix_webport_supported():
+        pytest.skip("UNIX sockets are not supported on this platform")
+    return request.param
+
+
+def serve(node, nodedir, transport):
+    if transport == 'unix':
+        # Kept short, since socket paths are limited to ~100 bytes
+        socket_dir = tempfile.mkdtemp()
+        path = os.path.join(socket_dir, 'web.sock')
+        port = listen_unix(node, path)
+        make_nodedir(nodedir, None, node.api_token, webport='unix:' + path)
+        port.socket_dir = socket_dir
+    else:
+        port = listen(node)
+        make_nodedir(
+            nodedir, 'http://127.0.0.1:{}/'.format(port.getHost().port),
+            node.api_token)
+    return port
+
+
+@inlineCallbacks
+def stop_serving(port):
+    yield port.stopListening()
+    if hasattr(port, 'socket_dir'):
+        shutil.rmtree(port.socket_dir)
+
+
+@pytest.mark.parametrize('name,servers,folders,members,files', GRIDS)
+@inlineCallbacks
+def test_benchmark_monitor(benchmark_recorder, tmpdir, transport, name,
+                           servers, folders, members, files):
+    node = FakeTahoeNode(servers)
+    nodedir = os.path.join(str(tmpdir), 'BenchmarkGrid')
+    port = serve(node, nodedir, transport)
+    make_synthetic_grid(node, nodedir, folders, members, files)
+
+    requests = {}
+    timings = {}
+
+    start = time.perf_counter()
+    gateway = yield start_and_check(nodedir)
+    timings['startup_to_ready'] = time.perf_counter() - start
+    for endpoint, count in node.request_counts.items():
+        requests['startup ' + endpoint] = count
+
+    node.request_counts.clear()
+    latencies = []
+    for _ in range(10):
+        start = time.perf_counter()
+        yield gateway.monitor.do_checks()
+        latencies.append(time.perf_counter() - start)
+    timings['tick_median'] = statistics.median(latencies)
+    timings['tick_max'] = max(latencies)
+    for endpoint, count in node.request_counts.items():
+        requests['tick ' + endpoint] = count // len(latencies)
+
+    node.request_counts.clear()
+    start = time.perf_counter()
+    for checker in gateway.monitor.magic_folder_checkers.values():
+        yield checker.do_remote_scan()
+    timings['remote_scan'] = time.perf_counter() - start
+    for endpoint, count in node.request_counts.items():
+        requests['remote_scan ' + endpoint] = count
+
+    start = time.perf_counter()
+    yield gateway.monitor.scan_rootcap()
+    timings['rootcap_scan'] = time.perf_counter() - start
+
+    # Measured separately since tracing allocations skews the timings above
+    tracemalloc.start()
+    yield start_and_check(nodedir)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    yield stop_serving(port)
+    if transport != 'tcp':
+        name += '-' + transport
+    benchmark_recorder.record(name, {
+        'transport': transport,
+        'grid': {
+            'servers': servers,
+            'folders': folders,
+            'members': members,
+            'files': files
+        },
+        'requests': requests,
+        'timings': timings,
+        'memory': {'startup_peak': peak}
+    })
+    assert len(gateway.monitor.magic_folder_checkers) == folders
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+
+import pytest
+from pytest_twisted import inlineCallbacks
+
+from fake_tahoe import (
+    FakeTahoeNode, listen, make_nodedir, make_synthetic_grid, start_gateway)
+
+
+@pytest.mark.parametrize('num_folders', [50])
+@inlineCallbacks
+def test_benchmark_provision(benchmark_recorder, tmpdir, num_folders):
+    node = FakeTahoeNode()
+    nodedir = os.path.join(str(tmpdir), 'BenchmarkGrid')
+    port = listen(node)
+    make_nodedir(
+        nodedir, 'http://127.0.0.1:{}/'.format(port.getHost().port),
+        node.api_token)
+    make_synthetic_grid(node, nodedir, 1, 1, 1)
+    gateway = start_gateway(nodedir)
+    gateway.monitor.grid_checker.connected.disconnect(
+        gateway.monitor.scan_rootcap)
+    yield gateway.await_ready()
+    paths = [str(tmpdir.join('New-{}'.format(i)))
+             for i in range(num_folders)]
+
+    node.request_counts.clear()
+    start = time.time()
+    results = yield gateway.create_magic_folders(paths)
+    elapsed = time.time() - start
+    requests = dict(node.request_counts)
+    yield port.stopListening()
+
+    benchmark_recorder.record('provision_{}'.format(num_folders), {
+        'folders': num_folders,
+        'requests': requests,
+        'timings': {
+            'create_magic_folders': round(elapsed, 4)
+        }
+    })
+    assert [success for success, _ in results] == [True] * num_folders
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+import gc
+import json
+import os
+import time
+import tracemalloc
+
+import pytest
+from pytest_twisted import inlineCallbacks
+from twisted.internet.task import LoopingCall
+
+from fake_tahoe import (
+    FakeTahoeNode, listen, make_nodedir, make_synthetic_grid, start_gateway)
+
+
+FILE_COUNTS = [
+    # files (per member); every folder has 2 members
+    pytest.param(2000),
+    pytest.param(20000, marks=pytest.mark.slow),
+]
+
+HEARTBEAT_INTERVAL = 0.005
+
+
+class Heartbeat():
+    # Measures how long the reactor (and thus the UI) is unable to process
+    # events by recording the gaps between the calls of a LoopingCall
+    def __init__(self, interval=HEARTBEAT_INTERVAL):
+        self.interval = interval
+        self.last = None
+        self.gaps = []
+        self.loop = LoopingCall(self.beat)
+
+    def beat(self):
+        now = time.perf_counter()
+        if self.last is not None:
+            self.gaps.append(now - self.last)
+        self.last = now
+
+    def start(self):
+        self.loop.start(self.interval)
+
+    def stop(self):
+        self.loop.stop()
+        self.beat()  # Include a stall that lasted until the end
+
+    @property
+    def max_stall(self):
+        return max(self.gaps or [0]) - self.interval
+
+    @property
+    def total_stall(self):
+        return sum(max(gap - self.interval, 0) for gap in self.gaps)
+
+
+def cache_responses(node):
+    # The fake node runs in the same process (and reactor) as the client;
+    # serve pre-encoded directory listings so that only the stalls caused by
+    # the client are measured
+    get_json = node.get_json
+    encoded = {}
+
+    def cached_get_json(cap):
+        if cap not in encoded:
+            encoded[cap] = json.dumps(get_json(cap)).encode('utf-8')
+        return encoded[cap]
+    node.get_json = cached_get_json
+
+
+@pytest.mark.parametrize('num_files', FILE_COUNTS)
+@pytest.mark.parametrize('offload', [False, True])
+@inlineCallbacks
+def test_benchmark_stall(benchmark_recorder, monkeypatch, tmpdir, num_files,
+                         offload):
+    if not offload:
+        monkeypatch.setattr('gridsync.tahoe.OFFLOAD_JSON_SIZE', float('inf'))
+        monkeypatch.setattr('gridsync.tahoe.OFFLOAD_CHILDREN', float('inf'))
+    node = FakeTahoeNode()
+    nodedir = os.path.join(str(tmpdir), 'BenchmarkGrid')
+    port = listen(node)
+    make_nodedir(
+        nodedir, 'http://127.0.0.1:{}/'.format(port.getHost().port),
+        node.api_token)
+    make_synthetic_grid(node, nodedir, 1, 2, num_files)
+    cache_responses(node)
+    gateway = start_gateway(nodedir)
+    gateway.monitor.grid_checker.connected.disconnect(
+        gateway.monitor.scan_rootcap)
+    yield gateway.monitor.do_checks()  # Also warms up the response cache
+    checker = gateway.monitor.magic_folder_checkers['Folder-0']
+
+    gc.collect()  # Don't count collections of garbage left by earlier tests
+    heartbeat = Heartbeat()
+    heartbeat.start()
+    start = time.perf_counter()
+    yield checker.do_remote_scan()
+    remote_scan = time.perf_counter() - start
+    heartbeat.stop()
+
+    # Measured separately since tracing allocations skews the timings above
+    tracemalloc.start()
+    yield checker.do_remote_scan()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    yield port.stopListening()
+
+    name = 'stall_{}_{}'.format(num_files, 'offload' if offload else 'inline')
+    benchmark_recorder.record(name, {
+        'files': num_files * 2,
+        'offload': offload,
+        'timings': {
+            'remote_scan': remote_scan,
+            'max_stall': heartbeat.max_stall,
+            'total_stall': heartbeat.total_stall
+        },
+        'memory': {'remote_scan_peak': peak}
+    })
+    assert len(checker.history) == num_files * 2
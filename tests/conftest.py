@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+
+import pytest
+
+
+# RSS grows in whole pages and allocator arenas rather than byte by byte
+MEMORY_SLACK = 4 * 1024 * 1024
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks')
+    group.addoption(
+        '--benchmark-output', metavar='PATH',
+        help='Write benchmark results to PATH as JSON.')
+    group.addoption(
+        '--benchmark-baseline', metavar='PATH',
+        default=os.path.join(
+            os.path.dirname(__file__), 'benchmarks', 'baseline.json'),
+        help='Baseline to compare benchmark results against.')
+    group.addoption(
+        '--benchmark-compare', action='store_true',
+        help='Fail benchmarks whose timings regress beyond the tolerance. '
+        '(Request and paint counts are always compared.)')
+    group.addoption(
+        '--benchmark-tolerance', type=float, default=1.5, metavar='FACTOR',
+        help='Allowed slowdown relative to the baseline (default: 1.5).')
+
+
+class BenchmarkRecorder():
+    def __init__(self, config):
+        self.config = config
+        self.results = {}
+        try:
+            with open(config.getoption('benchmark_baseline')) as f:
+                self.baseline = json.load(f)
+        except (OSError, ValueError):
+            self.baseline = {}
+
+    def record(self, name, results):
+        self.results[name] = results
+        baseline = self.baseline.get(name)
+        if not baseline:
+            return
+        # Counts (of requests made or of paint events) should be stable
+        # across machines and are therefore always checked
+        for kind in ('requests', 'paints'):
+            for key, value in baseline.get(kind, {}).items():
+                count = results[kind].get(key, 0)
+                assert count <= value, '{}: {} {} for "{}" (baseline: {})'.format(
+                    name, count, kind, key, value)
+        if not self.config.getoption('benchmark_compare'):
+            return
+        tolerance = self.config.getoption('benchmark_tolerance')
+        for key, value in baseline.get('timings', {}).items():
+            assert results['timings'][key] <= value * tolerance, \
+                '{}: {} took {:.4f}s (baseline: {:.4f}s)'.format(
+                    name, key, results['timings'][key], value)
+        for key, value in baseline.get('memory', {}).items():
+            if results['memory'].get(key) is None:  # Not measurable here
+                continue
+            assert results['memory'][key] <= \
+                value * tolerance + MEMORY_SLACK, \
+                '{}: {} was {} bytes (baseline: {} bytes)'.format(
+                    name, key, results['memory'][key], value)
+
+    def write(self):
+        path = self.config.getoption('benchmark_output')
+        if path and self.results:
+            with open(path, 'w') as f:
+                json.dump(self.results, f, indent=2, sort_keys=True)
+
+
+@pytest.fixture(scope='session')
+def benchmark_recorder(request):
+    recorder = BenchmarkRecorder(request.config)
+    yield recorder
+    recorder.write()
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+A stand-in for the parts of the Tahoe-LAFS web API that Gridsync uses, with
+helpers for generating synthetic grids on top of it.
+"""
+
+from base64 import b32encode
+from collections import Counter
+import hashlib
+import json
+import os
+import time
+
+from twisted.internet import reactor
+from twisted.web.resource import Resource
+from twisted.web.server import Site
+import yaml
+
+from gridsync.tahoe import Tahoe, derive_readcap
+
+
+def _random_key(length=26):
+    return hashlib.sha256(os.urandom(32)).hexdigest()[:length]
+
+
+def _random_base32(num_bytes):
+    return b32encode(os.urandom(num_bytes)).decode().rstrip('=').lower()
+
+
+class FakeTahoeNode():
+    def __init__(self, num_servers=10, api_token=None):
+        self.api_token = api_token or _random_key(32)
+        self.servers = []
+        for i in range(num_servers):
+            self.add_server('server-{}'.format(i))
+        self.dirnodes = {}  # writecap -> {childname: (cap, metadata)}
+        self.readcaps = {}  # readcap -> writecap
+        self.writecaps = {}  # writecap -> readcap
+        self.files = {}  # cap -> bytes
+        self.magic_folder_status = {}  # folder name -> list of tasks
+        self.request_counts = Counter()
+
+    def add_server(self, nickname, connected=True, available_space=2 ** 40):
+        self.servers.append({
+            'nodeid': 'v0-' + _random_key(52),
+            'nickname': nickname,
+            'connection_status': (
+                'Connected to tcp:127.0.0.1:1234 via tcp' if connected
+                else 'Disconnected'),
+            'available_space': available_space if connected else None,
+            'version': 'tahoe-lafs/1.13.0',
+        })
+
+    @property
+    def num_connected(self):
+        return len([s for s in self.servers
+                    if s['connection_status'].startswith('Connected')])
+
+    def mkdir(self, children=None):
+        # Real(istic) caps, so that readcaps can be derived from writecaps
+        writecap = 'URI:DIR2:{}:{}'.format(
+            _random_base32(16), _random_base32(32))
+        readcap = derive_readcap(writecap)
+        self.dirnodes[writecap] = {}
+        self.readcaps[readcap] = writecap
+        self.writecaps[writecap] = readcap
+        for name, cap in (children or {}).items():
+            self.link(writecap, name, cap)
+        return writecap
+
+    def readcap(self, writecap):
+        return self.writecaps.get(writecap)
+
+    def put(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        cap = 'URI:CHK:{}:{}:1:1:{}'.format(digest[:26], digest[26:], len(data))
+        self.files[cap] = data
+        return cap
+
+    def link(self, dircap, name, childcap, metadata=None):
+        dircap = self.readcaps.get(dircap, dircap)
+        self.dirnodes[dircap][name] = (childcap, metadata or {
+            'tahoe': {'linkmotime': time.time(), 'linkcrtime': time.time()}})
+
+    def set_children(self, dircap, children):
+        for name, childcap in children.items():
+            self.link(dircap, name, childcap)
+
+    def unlink(self, dircap, name):
+        del self.dirnodes[dircap][name]
+
+    def add_file(self, dircap, name, size=0, mtime=None, deleted=False):
+        cap = self.put(b'\x00' * size)
+        mtime = mtime or time.time()
+        self.link(dircap, name, cap, {
+            'deleted': deleted,
+            'last_downloaded_uri': cap,
+            'version': 1,
+            'tahoe': {'linkmotime': mtime, 'linkcrtime': mtime}})
+        return cap
+
+    def _node_json(self, cap, metadata=None):
+        if cap in self.dirnodes or cap in self.readcaps:
+            writecap = self.readcaps.get(cap, cap)
+            data = {'ro_uri': self.readcap(writecap), 'mutable': True}
+            if cap == writecap:
+                data['rw_uri'] = writecap
+            if metadata is not None:
+                data['metadata'] = metadata
+            return ['dirnode', data]
+        data = {
+            'ro_uri': cap,
+            'size': len(self.files.get(cap, b'')),
+            'mutable': False
+        }
+        if metadata is not None:
+            data['metadata'] = metadata
+        return ['filenode', data]
+
+    def get_json(self, cap):
+        node = self._node_json(cap)
+        writecap = self.readcaps.get(cap, cap)
+        if writecap in self.dirnodes:
+            node[1]['children'] = {}
+            for name, (childcap, metadata) in self.dirnodes[writecap].items():
+                if writecap != cap and childcap in self.dirnodes:
+                    childcap = self.readcap(childcap)  # Attenuate to readcap
+                node[1]['children'][name] = self._node_json(childcap, metadata)
+        return node
+
+    def grid_status(self):
+        return {'servers': self.servers}
+
+    def welcome_page(self):
+        return (
+            '<html><body><div>Connected to <span>{}</span> of <span>{}</span>'
+            ' known storage servers</div></body></html>'.format(
+                self.num_connected, len(self.servers)))
+
+
+class FakeTahoeResource(Resource):
+    isLeaf = True
+
+    def __init__(self, node):
+        Resource.__init__(self)
+        self.node = node
+
+    @staticmethod
+    def _arg(request, name):
+        values = request.args.get(name.encode())
+        if values:
+            return values[0].decode('utf-8')
+        return None
+
+    @staticmethod
+    def _children(request):
+        children = {}
+        body = request.content.read()
+        if not body:
+            return children
+        for name, (_, data) in json.loads(body.decode('utf-8')).items():
+            children[name] = data.get('rw_uri') or data['ro_uri']
+        return children
+
+    @staticmethod
+    def endpoint(request):
+        segments = [s for s in request.path.decode('utf-8').split('/') if s]
+        base = '/' + segments[0] if segments else '/'
+        t = request.args.get(b't')
+        if t:
+            return '{} {}?t={}'.format(
+                request.method.decode(), base, t[0].decode())
+        return '{} {}'.format(request.method.decode(), base)
+
+    def render(self, request):
+        self.node.request_counts[self.endpoint(request)] += 1
+        try:
+            result = self.dispatch(request)
+        except KeyError:
+            request.setResponseCode(404)
+            return b'Not Found'
+        if isinstance(result, bytes):
+            return result
+        if isinstance(result, str):
+            return result.encode('utf-8')
+        request.setHeader(b'content-type', b'application/json')
+        return json.dumps(result).encode('utf-8')
+
+    def dispatch(self, request):
+        node = self.node
+        segments = [s for s in request.path.decode('utf-8').split('/') if s]
+        t = self._arg(request, 't')
+        if not segments:
+            if t == 'json':
+                return node.grid_status()
+            return node.welcome_page()
+        if segments[0] == 'magic_folder':
+            if self._arg(request, 'token') != node.api_token:
+                request.setResponseCode(401)
+                return b'Invalid token'
+            return node.magic_folder_status[self._arg(request, 'name')]
+        if segments[0] != 'uri':
+            raise KeyError(segments[0])
+        return self.dispatch_uri(
+            request, segments[1] if len(segments) > 1 else None, t)
+
+    def dispatch_uri(self, request, cap, t):
+        if request.method == b'PUT':
+            return self.node.put(request.content.read())
+        handler = self.uri_handlers.get(t)
+        if handler:
+            return handler(self, request, cap)
+        return self.node.files[cap]
+
+    def mkdir(self, request, cap):
+        writecap = self.node.mkdir(self._children(request))
+        if cap:
+            self.node.link(cap, self._arg(request, 'name'), writecap)
+        return writecap
+
+    def set_children(self, request, cap):
+        self.node.set_children(cap, self._children(request))
+        return b''
+
+    def link(self, request, cap):
+        self.node.link(
+            cap, self._arg(request, 'name'), self._arg(request, 'uri'))
+        return b''
+
+    def unlink(self, request, cap):
+        self.node.unlink(cap, self._arg(request, 'name'))
+        return b''
+
+    def get_json(self, request, cap):  # pylint: disable=unused-argument
+        node = self.node
+        if cap not in node.dirnodes and cap not in node.readcaps \
+                and cap not in node.files:
+            raise KeyError(cap)
+        return node.get_json(cap)
+
+    # Handlers for the (non-PUT) /uri requests, keyed by their t= argument
+    uri_handlers = {
+        'mkdir': mkdir,
+        'mkdir-with-children': mkdir,
+        'set_children': set_children,
+        'set-children': set_children,
+        'uri': link,
+        'unlink': unlink,
+        'json': get_json
+    }
+
+
+def listen(node, port=0):
+    return reactor.listenTCP(
+        port, Site(FakeTahoeResource(node)), interface='127.0.0.1')
+
+
+def listen_unix(node, path):
+    return reactor.listenUNIX(path, Site(FakeTahoeResource(node)))
+
+
+def make_nodedir(nodedir, nodeurl, api_token, shares_happy=7,
+                 webport='tcp:0:interface=127.0.0.1'):
+    # For a UNIX socket web port, pass nodeurl=None (since Tahoe-LAFS doesn't
+    # write a node.url file in that case) and webport='unix:<path>'
+    os.makedirs(os.path.join(nodedir, 'private'), exist_ok=True)
+    with open(os.path.join(nodedir, 'tahoe.cfg'), 'w') as f:
+        f.write(
+            '[node]\nnickname = {}\nweb.port = {}\n\n'
+            '[client]\nintroducer.furl = pb://{}@127.0.0.1:12345/introducer\n'
+            'shares.needed = 3\nshares.happy = {}\n'
+            'shares.total = 10\n\n[magic_folder]\nenabled = True\n'.format(
+                os.path.basename(nodedir), webport, _random_key(32),
+                shares_happy))
+    if nodeurl:
+        with open(os.path.join(nodedir, 'node.url'), 'w') as f:
+            f.write(nodeurl)
+    with open(os.path.join(nodedir, 'private', 'api_auth_token'), 'w') as f:
+        f.write(api_token)
+
+
+def make_synthetic_grid(node, nodedir, num_folders=1, num_members=1,
+                        num_files=10, file_size=1024):
+    # Every folder gets `num_members` members with `num_files` files each;
+    # the first member of each folder is "us" (i.e., has the upload_dircap)
+    rootcap = node.mkdir()
+    folders = {}
+    aliases = ''
+    mtime = 1500000000.0
+    for i in range(num_folders):
+        name = 'Folder-{}'.format(i)
+        admin_dircap = node.mkdir()
+        collective_dircap = node.readcap(admin_dircap)
+        upload_dircap = None
+        for j in range(num_members):
+            member_dircap = node.mkdir()
+            if j == 0:
+                upload_dircap = member_dircap
+            node.link(
+                admin_dircap, 'Member-{}'.format(j),
+                node.readcap(member_dircap))
+            for k in range(num_files):
+                mtime += 1
+                node.add_file(
+                    member_dircap, 'subdir@_file-{}-{}.txt'.format(j, k),
+                    file_size, mtime)
+        node.link(rootcap, name + ' (admin)', admin_dircap)
+        node.link(rootcap, name + ' (collective)', collective_dircap)
+        node.link(rootcap, name + ' (personal)', upload_dircap)
+        node.magic_folder_status[name] = []
+        folders[name] = {
+            'directory': os.path.join(nodedir, 'magic-folders', name),
+            'collective_dircap': collective_dircap,
+            'upload_dircap': upload_dircap,
+            'poll_interval': 60,
+        }
+        aliases += '{}: {}\n'.format(
+            hashlib.sha256(name.encode()).hexdigest(), admin_dircap)
+    private_dir = os.path.join(nodedir, 'private')
+    with open(os.path.join(private_dir, 'rootcap'), 'w') as f:
+        f.write(rootcap)
+    with open(os.path.join(private_dir, 'aliases'), 'w') as f:
+        f.write(aliases)
+    with open(os.path.join(private_dir, 'magic_folders.yaml'), 'w') as f:
+        f.write(yaml.safe_dump({'magic-folders': folders}))
+    return rootcap
+
+
+def start_gateway(nodedir):
+    # Like Tahoe.start() but without spawning a 'tahoe run' process
+    gateway = Tahoe(nodedir, executable='tahoe')
+    gateway.web_socket = gateway.get_web_socket()
+    gateway.nodeurl = gateway.read_nodeurl()
+    with open(os.path.join(nodedir, 'private', 'api_auth_token')) as f:
+        gateway.api_token = f.read().strip()
+    gateway.shares_happy = int(gateway.config_get('client', 'shares.happy'))
+    gateway.load_magic_folders()
+    gateway.state = Tahoe.STARTED
+    return gateway
@@ -5,206 +5,224 @@ import shutil
 from unittest.mock import MagicMock, call
 
 import pytest
+from PyQt5.QtCore import QPoint, Qt
+from PyQt5.QtGui import QPixmap
 
+from gridsync.entries import FileEntry
 from gridsync.gui.history import (
-    HistoryItemWidget, HistoryListWidget, HistoryView)
+    DETAILS_ROLE, HistoryListModel, HistoryListView, HistoryView)
+from gridsync.gui.ticker import Ticker
+
+
+def make_data(path='pixel.png', mtime=123456789, member='admin',
+              action='added'):
+    return FileEntry(path, 0, mtime, member=member, action=action)
 
 
 @pytest.fixture(scope='function')
-def hiw(tmpdir_factory):
+def hlm(tmpdir_factory):
     src = os.path.join(os.getcwd(), 'gridsync', 'resources', 'pixel.png')
     dst = str(tmpdir_factory.mktemp('test-magic-folder'))
     shutil.copy(src, dst)
     gateway = MagicMock()
     gateway.get_magic_folder_directory.return_value = dst
-    return HistoryItemWidget(
-        gateway,
-        'TestFolder',
-        {
-            'action': 'added',
-            'member': 'admin',
-            'mtime': 123456789,
-            'path': 'pixel.png',
-            'size': 0
-        },
-        HistoryListWidget(gateway)
-    )
+    return HistoryListModel(gateway, page_size=10)
 
 
-def test_history_item_widget_init(hiw):
-    assert hiw
+def test_history_list_model_add_item(hlm):
+    hlm.add_item('TestFolder', make_data())
+    assert hlm.rowCount() == 1
 
 
-def test_history_item_widget__do_load_thumbnail(hiw):
-    hiw._do_load_thumbnail()
-    assert hiw.icon.pixmap()  # XXX
+def test_history_list_model_add_item_joins_directory(hlm):
+    hlm.add_item('TestFolder', make_data())
+    assert os.path.isfile(hlm.index(0).data(Qt.UserRole).path)
 
 
-def test_history_item_widget_load_thumbnail(hiw, monkeypatch):
-    monkeypatch.setattr(
-        'gridsync.gui.history.HistoryItemWidget.isVisible', lambda _: True
-    )
-    hiw.load_thumbnail()
-    assert hiw._thumbnail_loaded is True
+def test_history_list_model_add_item_newest_first(hlm):
+    hlm.add_item('TestFolder', make_data('a', mtime=1))
+    hlm.add_item('TestFolder', make_data('c', mtime=3))
+    hlm.add_item('TestFolder', make_data('b', mtime=2))
+    assert [hlm.index(i).data() for i in range(3)] == ['c', 'b', 'a']
+
+
+def test_history_list_model_add_item_deduplicate(hlm):
+    hlm.add_item('TestFolder', make_data(mtime=123456788))
+    hlm.add_item('TestFolder', make_data(mtime=123456789))
+    assert (hlm.rowCount(), hlm.index(0).data(Qt.UserRole).mtime) == \
+        (1, 123456789)
+
+
+def test_history_list_model_add_item_deduplicate_by_member(hlm):
+    hlm.add_item('TestFolder', make_data(member='admin'))
+    hlm.add_item('TestFolder', make_data(member='bob'))
+    assert hlm.rowCount() == 2
+
+
+def test_history_list_model_add_item_no_deduplicate(hlm):
+    hlm.deduplicate = False
+    hlm.add_item('TestFolder', make_data(mtime=123456788))
+    hlm.add_item('TestFolder', make_data(mtime=123456789))
+    assert hlm.rowCount() == 2
+
+
+def test_history_list_model_max_items(hlm):
+    hlm.max_items = 2
+    for i in range(5):
+        hlm.add_item('TestFolder', make_data(str(i), mtime=i))
+    assert [hlm.index(i).data() for i in range(hlm.rowCount())] == ['4', '3']
 
 
-def test_history_item_widget_unhilight(hiw):
-    hiw.button.show()
-    hiw.unhighlight()
-    assert hiw.button.isHidden()
+def test_history_list_model_pages_older_items(hlm):
+    for i in range(25):
+        hlm.add_item('TestFolder', make_data(str(i), mtime=1000 - i))
+    assert (hlm.rowCount(), hlm.canFetchMore()) == (10, True)
 
 
-def test_history_item_widget_enter_event(hiw):
-    hiw.enterEvent(None)
-    assert hiw.parent.highlighted == hiw
+def test_history_list_model_fetch_more(hlm):
+    for i in range(25):
+        hlm.add_item('TestFolder', make_data(str(i), mtime=1000 - i))
+    hlm.fetchMore()
+    hlm.fetchMore()
+    assert (hlm.rowCount(), hlm.canFetchMore()) == (25, False)
 
 
-def test_history_item_widget_enter_event_call_unhighlight(hiw):
+def test_history_list_model_newer_items_are_exposed(hlm):
+    for i in range(25):
+        hlm.add_item('TestFolder', make_data(str(i), mtime=1000 - i))
+    hlm.add_item('TestFolder', make_data('newest', mtime=2000))
+    assert (hlm.rowCount(), hlm.index(0).data()) == (11, 'newest')
+
+
+def test_history_list_model_details(hlm):
+    hlm.add_item('TestFolder', make_data())
+    assert hlm.index(0).data(DETAILS_ROLE).startswith('Added ')
+
+
+def test_history_list_model_data_does_not_refresh_details(hlm):
+    hlm.add_item('TestFolder', make_data())
+    hlm.items[0].details = 'Stale'
+    hlm.items[0].deadline = 0
+    assert (hlm.index(0).data(DETAILS_ROLE), hlm.items[0].deadline) == \
+        ('Stale', 0)
+
+
+def test_history_list_model_fetch_more_sets_details(hlm):
+    for i in range(25):
+        hlm.add_item('TestFolder', make_data(str(i), mtime=1000 - i))
+    hlm.fetchMore()
+    assert hlm.index(19).data(DETAILS_ROLE).startswith('Added ')
+
+
+def test_history_list_model_update_details_emits_on_change(hlm):
+    hlm.add_item('TestFolder', make_data())
+    hlm.items[0].details = 'Stale'
+    hlm.items[0].deadline = 0
     m = MagicMock()
-    hiw.parent.highlighted = m
-    hiw.enterEvent(None)
-    assert m.method_calls == [call.unhighlight()]
+    hlm.dataChanged.connect(m)
+    hlm.update_details(0)
+    assert len(m.mock_calls) == 1
 
 
-def test_history_item_widget_enter_event_pass_runtime_error(hiw):
-    hiw.parent.highlighted = MagicMock()
-    hiw.parent.highlighted.unhighlight = MagicMock(side_effect=RuntimeError)
-    hiw.enterEvent(None)
-    assert hiw.parent.highlighted == hiw
+def test_history_list_model_update_details_skips_before_deadline(hlm):
+    hlm.add_item('TestFolder', make_data())
+    hlm.update_details(0)
+    m = MagicMock()
+    hlm.dataChanged.connect(m)
+    hlm.update_details(0)
+    assert m.mock_calls == []
+
+
+def test_history_list_model_later_deadline_survives_earlier_tick(
+        hlm, monkeypatch):
+    ticker = Ticker()
+    monkeypatch.setattr('gridsync.gui.history.get_ticker', lambda: ticker)
+    monkeypatch.setattr('gridsync.gui.history.time.time', lambda: 10000)
+    hlm.add_item('TestFolder', make_data('a', mtime=10000 - 55))
+    hlm.add_item('TestFolder', make_data('b', mtime=10000 - 3000))
+    deadlines = [item.deadline for item in hlm.items]
+    monkeypatch.setattr(
+        'gridsync.gui.history.time.time', lambda: min(deadlines))
+    ticker.on_timeout()
+    for row in range(hlm.rowCount()):
+        hlm.update_details(row)
+    assert sorted(ticker.deadlines) == [min(deadlines) + 1, max(deadlines)]
+
+
+def test_history_list_model_on_thumbnail_loaded(hlm):
+    hlm.add_item('TestFolder', make_data())
+    hlm.on_thumbnail_loaded(QPixmap(48, 48), hlm.items[0])
+    assert isinstance(hlm.index(0).data(Qt.DecorationRole), QPixmap)
+
+
+def test_history_list_model_on_thumbnail_loaded_not_an_image(hlm):
+    hlm.add_item('TestFolder', make_data('not-an-image.txt'))
+    hlm.on_thumbnail_loaded(None, hlm.items[0])
+    assert hlm.thumbnails.get(hlm.items[0].path) is False
+
+
+def test_history_list_model_load_thumbnail_skips_pending(hlm):
+    hlm.thumbnail_loader = MagicMock()
+    hlm.add_item('TestFolder', make_data())
+    hlm.load_thumbnail(hlm.items[0])
+    hlm.load_thumbnail(hlm.items[0])
+    assert hlm.thumbnail_loader.load.call_count == 1
 
 
 @pytest.fixture(scope='function')
-def hlw(tmpdir_factory):
+def hlv(tmpdir_factory):
     directory = str(tmpdir_factory.mktemp('test-magic-folder'))
     gateway = MagicMock()
     gateway.get_magic_folder_directory.return_value = directory
-    return HistoryListWidget(gateway)
+    return HistoryListView(gateway)
 
 
-def test_history_list_widget_on_double_click(hlw, monkeypatch):
+def test_history_list_view_on_double_click(hlv, monkeypatch):
     m = MagicMock()
     monkeypatch.setattr('gridsync.gui.history.open_enclosing_folder', m)
-    monkeypatch.setattr(
-        'gridsync.gui.history.HistoryListWidget.itemWidget', MagicMock()
-    )
-    hlw.on_double_click(None)
+    hlv.model().add_item('TestFolder', make_data())
+    hlv.on_double_click(hlv.model().index(0))
     assert m.mock_calls
 
 
-def test_history_list_widget_on_right_click(hlw, monkeypatch):
+def test_history_list_view_on_right_click(hlv, monkeypatch):
+    hlv.model().add_item('TestFolder', make_data())
     monkeypatch.setattr(
-        'gridsync.gui.history.HistoryListWidget.itemAt', MagicMock())
-    monkeypatch.setattr(
-        'gridsync.gui.history.HistoryListWidget.itemWidget', MagicMock())
-    monkeypatch.setattr(
-        'gridsync.gui.history.HistoryListWidget.itemWidget', MagicMock())
-    monkeypatch.setattr(
-        'gridsync.gui.history.HistoryListWidget.viewport', MagicMock())
+        'gridsync.gui.history.HistoryListView.indexAt',
+        lambda self, _: self.model().index(0))
     m = MagicMock()
     monkeypatch.setattr('gridsync.gui.history.QMenu', m)
-    hlw.on_right_click(None)
+    hlv.on_right_click(QPoint(1, 1))
     assert m.mock_calls
 
 
-def test_history_list_widget_on_right_click_no_item_return(hlw, monkeypatch):
-    monkeypatch.setattr(
-        'gridsync.gui.history.HistoryListWidget.itemAt', lambda x, y: None)
+def test_history_list_view_on_right_click_no_item_return(hlv, monkeypatch):
     m = MagicMock()
     monkeypatch.setattr('gridsync.gui.history.QMenu', m)
-    hlw.on_right_click(None)
+    hlv.on_right_click(QPoint(1, 1))
     assert m.mock_calls == []
 
 
-def test_history_list_widget_add_item(hlw):
-    hlw.add_item(
-        'TestFolder',
-        {
-            'action': 'added',
-            'member': 'admin',
-            'mtime': 123456789,
-            'path': 'pixel.png',
-            'size': 0
-        }
-    )
-    assert hlw.count() == 1
-
-
-def test_history_list_widget_add_item_deduplicate(hlw):
-    hlw.add_item(
-        'TestFolder',
-        {
-            'action': 'updated',
-            'member': 'admin',
-            'mtime': 123456788,
-            'path': 'pixel.png',
-            'size': 0
-        }
-    )
-    hlw.add_item(
-        'TestFolder',
-        {
-            'action': 'updated',
-            'member': 'admin',
-            'mtime': 123456789,
-            'path': 'pixel.png',
-            'size': 0
-        }
-    )
-    assert hlw.count() == 1
-
-
-def test_history_list_widget_update_visible_widgets(hlw, monkeypatch):
-    hlw.add_item(
-        'TestFolder',
-        {
-            'action': 'added',
-            'member': 'admin',
-            'mtime': 99999,
-            'path': 'pixel.png',
-            'size': 0
-        }
-    )
-    m = MagicMock()
-    monkeypatch.setattr(
-        'gridsync.gui.history.HistoryItemWidget.update_text', m
-    )
-    monkeypatch.setattr(
-        'gridsync.gui.history.HistoryListWidget.isVisible', lambda _: True
-    )
-    hlw.update_visible_widgets()
-    assert m.mock_calls == [call()]
-
-
-def test_history_list_widget_update_visible_widgets_return(hlw, monkeypatch):
-    hlw.add_item(
-        'TestFolder',
-        {
-            'action': 'added',
-            'member': 'admin',
-            'mtime': 99999,
-            'path': 'pixel.png',
-            'size': 0
-        }
-    )
+def test_history_list_view_update_visible_rows(hlv, monkeypatch):
+    hlv.model().add_item('TestFolder', make_data(mtime=99999))
     m = MagicMock()
     monkeypatch.setattr(
-        'gridsync.gui.history.HistoryItemWidget.update_text', m
-    )
+        'gridsync.gui.history.HistoryListModel.update_details', m)
     monkeypatch.setattr(
-        'gridsync.gui.history.HistoryListWidget.isVisible', lambda _: False
-    )
-    hlw.update_visible_widgets()
-    assert m.mock_calls == []
+        'gridsync.gui.history.HistoryListView.isVisible', lambda _: True)
+    hlv.update_visible_rows()
+    assert m.mock_calls == [call(0)]
 
 
-def test_history_list_widget_update_visible_widgets_on_show_event(
-        hlw, monkeypatch):
+def test_history_list_view_update_visible_rows_return(hlv, monkeypatch):
+    hlv.model().add_item('TestFolder', make_data(mtime=99999))
     m = MagicMock()
     monkeypatch.setattr(
-        'gridsync.gui.history.HistoryListWidget.update_visible_widgets', m
-    )
-    hlw.showEvent(None)
-    assert m.mock_calls == [call()]
+        'gridsync.gui.history.HistoryListModel.update_details', m)
+    monkeypatch.setattr(
+        'gridsync.gui.history.HistoryListView.isVisible', lambda _: False)
+    hlv.update_visible_rows()
+    assert m.mock_calls == []
 
 
 def test_history_view_init():
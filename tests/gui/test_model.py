@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import MagicMock
+
+import pytest
+from PyQt5.QtCore import Qt
+
+from gridsync.gui.model import Model, NATURAL_TIME_DEADLINE_ROLE
+
+
+@pytest.fixture(scope='function')
+def model(tmpdir_factory):
+    view = MagicMock()
+    view.gateway.name = 'TestGrid'
+    view.gateway.get_magic_folder_directory.return_value = str(
+        tmpdir_factory.mktemp('test-magic-folder'))
+    return Model(view)
+
+
+def test_model_add_folder(model):
+    model.add_folder('/tmp/TestFolder')
+    assert model.index(0, 0).data() == 'TestFolder'
+
+
+def test_model_add_folder_sets_loading_status(model):
+    model.add_folder('/tmp/TestFolder')
+    assert model.index(0, 1).data() == 'Loading...'
+
+
+def test_model_add_folder_skip_duplicate(model):
+    model.add_folder('/tmp/TestFolder')
+    model.add_folder('/tmp/TestFolder')
+    assert model.rowCount() == 1
+
+
+def test_model_remove_folder_reindexes_rows(model):
+    model.add_folder('/tmp/TestFolder1')
+    model.add_folder('/tmp/TestFolder2')
+    model.add_folder('/tmp/TestFolder3')
+    model.remove_folder('TestFolder1')
+    assert model.row_index == {'TestFolder2': 0, 'TestFolder3': 1}
+
+
+def test_model_remove_folder_missing_is_noop(model):
+    model.add_folder('/tmp/TestFolder')
+    model.remove_folder('NonExistentFolder')
+    assert model.rowCount() == 1
+
+
+@pytest.mark.parametrize("status,text", [
+    [0, "Loading..."],
+    [1, "Syncing"],
+    [2, "Up to date"],
+    [3, "Stored remotely"],
+    [99, "Scanning"],
+])
+def test_model_set_status(model, status, text):
+    model.add_folder('/tmp/TestFolder')
+    model.set_status('TestFolder', status)
+    assert (model.index(0, 1).data(), model.index(0, 1).data(Qt.UserRole)) \
+        == (text, status)
+
+
+def test_model_set_size(model):
+    model.add_folder('/tmp/TestFolder')
+    model.set_size('TestFolder', 1024)
+    assert model.index(0, 3).data() == '1.0 kB'
+
+
+def test_model_set_transfer_progress(model):
+    model.add_folder('/tmp/TestFolder')
+    model.set_transfer_progress('TestFolder', 50, 100)
+    assert model.index(0, 1).data() == 'Syncing (50%)'
+
+
+def test_model_set_data_emits_only_changed_roles(model):
+    model.add_folder('/tmp/TestFolder')
+    model.set_size('TestFolder', 1024)
+    m = MagicMock()
+    model.dataChanged.connect(m)
+    model.set_size('TestFolder', 1024)
+    assert m.mock_calls == []
+
+
+def test_model_fade_row(model):
+    model.add_remote_folder('TestFolder')
+    assert model.index(0, 2).data(Qt.FontRole).italic()
+
+
+def test_model_unfade_row(model):
+    model.add_remote_folder('TestFolder')
+    model.unfade_row('TestFolder')
+    assert model.index(0, 2).data(Qt.FontRole) is None
+
+
+def test_model_update_natural_time_skips_before_deadline(model):
+    model.add_folder('/tmp/TestFolder')
+    model.set_mtime('TestFolder', 123456789)
+    m = MagicMock()
+    model.dataChanged.connect(m)
+    model.update_natural_time(0)
+    assert m.mock_calls == []
+
+
+def test_model_update_natural_time_emits_when_text_changes(model):
+    model.add_folder('/tmp/TestFolder')
+    model.set_mtime('TestFolder', 123456789)
+    model.rows[0][2][Qt.DisplayRole] = "Stale"
+    model.rows[0][2][NATURAL_TIME_DEADLINE_ROLE] = 0
+    m = MagicMock()
+    model.dataChanged.connect(m)
+    model.update_natural_time(0)
+    assert len(m.mock_calls) == 1
+
+
+def test_model_data_does_not_refresh_natural_time(model):
+    model.add_folder('/tmp/TestFolder')
+    model.set_mtime('TestFolder', 123456789)
+    model.rows[0][2][Qt.DisplayRole] = "Stale"
+    model.rows[0][2][NATURAL_TIME_DEADLINE_ROLE] = 0
+    m = MagicMock()
+    model.dataChanged.connect(m)
+    assert (model.index(0, 2).data(), m.mock_calls) == ("Stale", [])
+
+
+@pytest.mark.parametrize("status,loading,syncing", [
+    [0, {'TestFolder'}, set()],
+    [1, set(), {'TestFolder'}],
+    [2, set(), set()],
+    [99, set(), {'TestFolder'}],
+])
+def test_model_set_status_tracks_animated_folders(
+        model, status, loading, syncing):
+    model.add_folder('/tmp/TestFolder')
+    model.set_status('TestFolder', status)
+    assert (model.loading_folders, model.syncing_folders) == (loading, syncing)
+
+
+def test_model_remove_folder_untracks_animated_folder(model):
+    model.add_folder('/tmp/TestFolder')
+    model.set_status('TestFolder', 1)
+    model.remove_folder('TestFolder')
+    assert model.syncing_folders == set()
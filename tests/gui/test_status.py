@@ -4,7 +4,9 @@ from unittest.mock import MagicMock
 
 import pytest
 
+from gridsync.breaker import CircuitBreaker
 from gridsync.gui.status import StatusPanel
+from gridsync.supervisor import Supervisor
 
 
 def test_status_panel_hide_tor_button():
@@ -48,3 +50,29 @@ def test_on_nodes_updated():
     sp = StatusPanel(MagicMock())
     sp.on_nodes_updated(4, 5)
     assert (sp.num_connected, sp.num_known) == (4, 5)
+
+
+def test_on_circuit_state_changed_open_shows_problem():
+    sp = StatusPanel(MagicMock())
+    sp.on_circuit_state_changed(CircuitBreaker.OPEN)
+    assert sp.status_label.text() == "Unable to reach Tahoe-LAFS; retrying..."
+
+
+def test_on_circuit_state_changed_closed_restores_sync_state():
+    sp = StatusPanel(MagicMock())
+    sp.on_sync_state_updated(2)
+    sp.on_circuit_state_changed(CircuitBreaker.OPEN)
+    sp.on_circuit_state_changed(CircuitBreaker.CLOSED)
+    assert sp.status_label.text() == "Up to date"
+
+
+@pytest.mark.parametrize("state,text", [
+    [Supervisor.DEGRADED, "Restarting Tahoe-LAFS..."],
+    [Supervisor.FAILED, "Tahoe-LAFS keeps stopping unexpectedly"],
+    [Supervisor.RUNNING, "Up to date"]
+])
+def test_on_supervisor_state_changed(state, text):
+    sp = StatusPanel(MagicMock())
+    sp.on_sync_state_updated(2)
+    sp.on_supervisor_state_changed(state)
+    assert sp.status_label.text() == text
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+
+import pytest
+from pytest_twisted import inlineCallbacks
+from PyQt5.QtGui import QImage, QPixmap
+
+from gridsync.gui.thumbnails import ThumbnailCache, ThumbnailLoader
+
+
+@pytest.fixture(scope='function')
+def image_path(tmpdir):
+    src = os.path.join(os.getcwd(), 'gridsync', 'resources', 'pixel.png')
+    shutil.copy(src, str(tmpdir))
+    return os.path.join(str(tmpdir), 'pixel.png')
+
+
+@pytest.fixture(scope='function')
+def loader(tmpdir):
+    return ThumbnailLoader(ThumbnailCache(str(tmpdir.mkdir('thumbnails'))))
+
+
+def test_thumbnail_loader_read_scales_image(loader, image_path):
+    image = loader.read(image_path)
+    assert (image.width(), image.height()) == (48, 48)
+
+
+def test_thumbnail_loader_read_not_an_image(loader, tmpdir):
+    path = str(tmpdir.join('not-an-image.txt'))
+    with open(path, 'w') as f:
+        f.write('test')
+    assert loader.read(path) is None
+
+
+def test_thumbnail_loader_read_missing_file(loader, tmpdir):
+    assert loader.read(str(tmpdir.join('missing.png'))) is None
+
+
+def test_thumbnail_loader_read_caches_to_disk(loader, image_path):
+    loader.read(image_path)
+    assert len(os.listdir(loader.cache.directory)) == 1
+
+
+def test_thumbnail_loader_read_uses_disk_cache(loader, image_path):
+    loader.read(image_path)
+    cache_path = os.path.join(
+        loader.cache.directory, os.listdir(loader.cache.directory)[0])
+    QImage(16, 16, QImage.Format_ARGB32).save(cache_path, 'PNG')
+    assert loader.read(image_path).width() == 16
+
+
+def test_thumbnail_cache_key_changes_with_mtime(loader):
+    assert loader.cache.path_for('a.png', 1, 1, 48, 48) != \
+        loader.cache.path_for('a.png', 2, 1, 48, 48)
+
+
+def test_thumbnail_cache_evicts_least_recently_used(tmpdir):
+    cache = ThumbnailCache(str(tmpdir))
+    image = QImage(48, 48, QImage.Format_ARGB32)
+    old_path = cache.path_for('old.png', 1, 1, 48, 48)
+    cache.put(old_path, image)
+    os.utime(old_path, (0, 0))
+    new_path = cache.path_for('new.png', 1, 1, 48, 48)
+    cache.max_size = int(os.path.getsize(old_path) * 1.5)
+    cache.put(new_path, image)
+    assert (os.path.exists(old_path), os.path.exists(new_path)) == \
+        (False, True)
+
+
+def test_thumbnail_cache_replacing_entry_keeps_size(tmpdir):
+    cache = ThumbnailCache(str(tmpdir))
+    image = QImage(48, 48, QImage.Format_ARGB32)
+    path = cache.path_for('a.png', 1, 1, 48, 48)
+    cache.put(path, image)
+    cache.put(path, image)
+    cache.put(path, image)
+    assert cache.size == os.path.getsize(path)
+
+
+@inlineCallbacks
+def test_thumbnail_loader_load_returns_pixmap(loader, image_path):
+    pixmap = yield loader.load(image_path)
+    assert isinstance(pixmap, QPixmap)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from gridsync.gui.ticker import (
+    get_ticker, natural_time, seconds_until_change, Ticker)
+
+
+@pytest.mark.parametrize("delta,seconds", [
+    [-5, 1],
+    [0, 1],
+    [59, 1],
+    [60, 30],
+    [75, 15],
+    [3599, 1],
+    [3600, 1800],
+    [4500, 900],
+    [86400, 43200],
+    [86400 * 3 + 1, 43199],
+])
+def test_seconds_until_change(delta, seconds):
+    assert seconds_until_change(delta) == seconds
+
+
+def test_natural_time():
+    assert natural_time(1000, 1000 + 300) == ("5 minutes ago", 1000 + 330)
+
+
+def test_natural_time_text_unchanged_until_deadline():
+    text, deadline = natural_time(1000, 1000 + 300)
+    assert natural_time(1000, deadline - 0.01)[0] == text
+
+
+def test_natural_time_text_changed_by_next_deadline():
+    text, deadline = natural_time(1000, 1000 + 300)
+    _, deadline = natural_time(1000, deadline)
+    assert natural_time(1000, deadline)[0] != text
+
+
+def test_ticker_schedule_keeps_earliest_deadline():
+    ticker = Ticker()
+    ticker.schedule(100)
+    ticker.schedule(200)
+    assert ticker.deadline == 100
+
+
+def test_ticker_schedule_rearms_earlier_deadline():
+    ticker = Ticker()
+    ticker.schedule(200)
+    ticker.schedule(100)
+    assert ticker.deadline == 100
+
+
+def test_ticker_on_timeout_emits_tick():
+    ticker = Ticker()
+    m = MagicMock()
+    ticker.tick.connect(m)
+    ticker.schedule(100)
+    ticker.on_timeout()
+    assert (m.mock_calls, ticker.deadline) == ([()], None)
+
+
+def test_ticker_on_timeout_rearms_for_next_pending_deadline(monkeypatch):
+    monkeypatch.setattr('gridsync.gui.ticker.time.time', lambda: 1000)
+    ticker = Ticker()
+    ticker.schedule(1004.2)
+    ticker.schedule(1009.2)
+    monkeypatch.setattr('gridsync.gui.ticker.time.time', lambda: 1004.2)
+    ticker.on_timeout()
+    assert (ticker.deadline, round(ticker.timer.remainingTime() / 1000)) == \
+        (1009.2, 5)
+
+
+def test_ticker_schedule_ignores_duplicate_deadlines():
+    ticker = Ticker()
+    ticker.schedule(100)
+    ticker.schedule(100)
+    assert ticker.deadlines == [100]
+
+
+def test_get_ticker_returns_shared_instance():
+    assert get_ticker() is get_ticker()
@@ -1,6 +1,14 @@
 # -*- coding: utf-8 -*-
 
-from gridsync.gui.widgets import EncodingParameters, TahoeConfigForm
+import os
+from unittest.mock import MagicMock
+
+from PyQt5.QtGui import QIcon
+
+from gridsync import resource
+from gridsync.gui.widgets import (
+    composite_icon_cache, EncodingParameters, get_composite_icon,
+    get_file_icon, TahoeConfigForm)
 
 
 def test_decrement_shares_needed_with_shares_total():
@@ -35,3 +43,42 @@ def test_tahoe_config_form_get_settings():
     widget = TahoeConfigForm()
     widget.connection_settings.introducer_text_edit.setPlainText('test')
     assert widget.get_settings()['introducer'] == 'test'
+
+
+def test_get_composite_icon_is_cached():
+    icon = QIcon(resource('tahoe-lafs.png'))
+    assert get_composite_icon(icon, resource('user.png')) is \
+        get_composite_icon(icon, resource('user.png'))
+
+
+def test_get_composite_icon_shared_by_copies_of_an_icon():
+    icon = QIcon(resource('tahoe-lafs.png'))
+    assert get_composite_icon(icon) is get_composite_icon(QIcon(icon))
+
+
+def test_get_composite_icon_shared_by_file_icons_for_same_path(tmpdir):
+    path = str(tmpdir)
+    assert get_composite_icon(get_file_icon(path), grayout=True) is \
+        get_composite_icon(get_file_icon(path), grayout=True)
+
+
+def test_get_composite_icon_does_not_render_cached_icons():
+    icon = MagicMock()
+    icon.name.return_value = ''
+    icon.cacheKey.return_value = 12345
+    composite_icon = get_composite_icon(QIcon(resource('tahoe-lafs.png')))
+    composite_icon_cache.put(
+        (12345, None, False, 256), composite_icon)
+    assert (get_composite_icon(icon), icon.pixmap.called) == \
+        (composite_icon, False)
+
+
+def test_get_composite_icon_keyed_by_grayout():
+    icon = QIcon(resource('tahoe-lafs.png'))
+    assert get_composite_icon(icon) is not \
+        get_composite_icon(icon, grayout=True)
+
+
+def test_get_file_icon_is_cached():
+    path = os.path.join(os.getcwd(), 'gridsync', 'resources')
+    assert get_file_icon(path) is get_file_icon(path)
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+A fault- and latency-injecting layer on top of fake_tahoe for simulating slow
+or flaky connections (e.g., Tor) to a Tahoe-LAFS node.
+"""
+
+from collections import defaultdict
+import random
+
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks
+from twisted.protocols.policies import WrappingFactory
+from twisted.web.server import NOT_DONE_YET, Site
+
+from fake_tahoe import FakeTahoeResource
+
+
+def constant(seconds):
+    return lambda rng: seconds
+
+
+def uniform(low, high):
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal(median, sigma):
+    # A long-tailed distribution, roughly resembling Tor circuit latency
+    return lambda rng: median * rng.lognormvariate(0, sigma)
+
+
+def spiky(base, spike, probability):
+    return lambda rng: spike if rng.random() < probability else base
+
+
+class Rule():
+    def __init__(self, latency=None, refuse=0.0, timeout=0.0, partial=0.0,
+                 bandwidth=None):
+        self.latency = latency or constant(0)
+        self.refuse = refuse  # Probability of resetting the connection
+        self.timeout = timeout  # Probability of never responding
+        self.partial = partial  # Probability of truncating the response
+        self.bandwidth = bandwidth  # Bytes per second, or None for no cap
+
+
+class SimulatedResource(FakeTahoeResource):
+    def __init__(self, node, simulator):
+        FakeTahoeResource.__init__(self, node)
+        self.simulator = simulator
+
+    def render(self, request):
+        sim = self.simulator
+        endpoint = self.endpoint(request)
+        rule = sim.rule_for(endpoint)
+        record = {
+            'endpoint': endpoint, 'start': sim.clock.seconds(),
+            'outcome': None}
+        sim.records.append(record)
+        finished = request.notifyFinish()
+        finished.addErrback(lambda _: record.update(
+            outcome=record['outcome'] or 'disconnected'))
+        if sim.rng.random() < rule.refuse:
+            # The request never reaches the node
+            record['outcome'] = 'refused'
+            request.transport.abortConnection()
+            return NOT_DONE_YET
+        body = FakeTahoeResource.render(self, request)
+        if sim.rng.random() < rule.timeout:
+            record['outcome'] = 'timeout'
+            sim.hung.append(request)
+            return NOT_DONE_YET
+        partial = sim.rng.random() < rule.partial
+        delay = rule.latency(sim.rng)
+        sim.pending.append(sim.clock.callLater(
+            delay, self.respond, request, body, rule, partial, record))
+        return NOT_DONE_YET
+
+    def respond(self, request, body, rule, partial, record):
+        if record['outcome']:
+            return  # Client went away
+        request.setHeader(b'content-length', str(len(body)).encode())
+        if partial:
+            record['outcome'] = 'partial'
+            request.write(body[:len(body) // 2])
+            request.transport.abortConnection()
+            return
+        if rule.bandwidth:
+            self.throttle(request, body, rule.bandwidth, record)
+            return
+        request.write(body)
+        request.finish()
+        record.update(outcome='ok', end=self.simulator.clock.seconds())
+
+    def throttle(self, request, body, bandwidth, record, interval=0.05):
+        if record['outcome']:
+            return
+        chunk_size = max(1, int(bandwidth * interval))
+        request.write(body[:chunk_size])
+        record['chunks'] = record.get('chunks', 0) + 1
+        remaining = body[chunk_size:]
+        if remaining:
+            self.simulator.pending.append(self.simulator.clock.callLater(
+                interval, self.throttle, request, remaining, bandwidth,
+                record, interval))
+        else:
+            request.finish()
+            record.update(outcome='ok', end=self.simulator.clock.seconds())
+
+
+class NetworkSimulator():
+    def __init__(self, node, seed=0):
+        self.node = node
+        self.clock = reactor
+        self.rng = random.Random(seed)
+        self.rules = {}
+        self.default_rule = Rule()
+        self.records = []
+        self.hung = []
+        self.pending = []
+        self.factory = None
+        self.port = None
+        self.portnum = 0
+
+    def set_rule(self, endpoint=None, **kwargs):
+        # `endpoint` is as reported by FakeTahoeResource.endpoint(), e.g.,
+        # "POST /magic_folder?t=json"; None sets the default for all others
+        if endpoint is None:
+            self.default_rule = Rule(**kwargs)
+        else:
+            self.rules[endpoint] = Rule(**kwargs)
+
+    def rule_for(self, endpoint):
+        return self.rules.get(endpoint, self.default_rule)
+
+    def clear_rules(self):
+        self.rules = {}
+        self.default_rule = Rule()
+
+    def listen(self):
+        # WrappingFactory keeps track of connections so they can be dropped
+        self.factory = WrappingFactory(
+            Site(SimulatedResource(self.node, self)))
+        self.port = reactor.listenTCP(
+            self.portnum, self.factory, interface='127.0.0.1')
+        self.portnum = self.port.getHost().port
+        return self.port
+
+    @property
+    def nodeurl(self):
+        return 'http://127.0.0.1:{}/'.format(self.portnum)
+
+    @inlineCallbacks
+    def go_down(self):
+        # Stop listening so that new connections are actively refused, and
+        # drop any existing (persistent) connections
+        yield self.port.stopListening()
+        self.port = None
+        for protocol in list(self.factory.protocols):
+            protocol.transport.abortConnection()
+
+    def go_up(self):
+        return self.listen()
+
+    def request_counts(self, since=0):
+        counts = defaultdict(int)
+        for record in self.records[since:]:
+            counts[record['endpoint']] += 1
+        return dict(counts)
+
+    @inlineCallbacks
+    def stop(self):
+        for call in self.pending:
+            if call.active():
+                call.cancel()
+        for request in self.hung:
+            request.transport.abortConnection()
+        if self.port:
+            yield self.port.stopListening()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import MagicMock
+
+import pytest
+from twisted.internet.task import Clock
+
+from gridsync.breaker import CircuitBreaker
+
+
+@pytest.fixture()
+def breaker():
+    return CircuitBreaker(
+        'TestGrid', failure_threshold=3, reset_timeout=5,
+        max_reset_timeout=20, clock=Clock())
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+def test_breaker_closed_by_default(breaker):
+    assert (breaker.state, breaker.allow_request()) == \
+        (CircuitBreaker.CLOSED, True)
+
+
+def test_breaker_stays_closed_below_threshold(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_opens_at_threshold(breaker):
+    open_breaker(breaker)
+    assert (breaker.state, breaker.allow_request()) == \
+        (CircuitBreaker.OPEN, False)
+
+
+def test_breaker_success_resets_failure_count(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_half_opens_after_reset_timeout(breaker):
+    open_breaker(breaker)
+    breaker.clock.advance(5)
+    assert (breaker.allow_request(), breaker.state) == \
+        (True, CircuitBreaker.HALF_OPEN)
+
+
+def test_breaker_allows_only_one_probe(breaker):
+    open_breaker(breaker)
+    breaker.clock.advance(5)
+    breaker.allow_request()
+    assert breaker.allow_request() is False
+
+
+def test_breaker_closes_after_successful_probe(breaker):
+    open_breaker(breaker)
+    breaker.clock.advance(5)
+    breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_reopens_after_failed_probe(breaker):
+    open_breaker(breaker)
+    breaker.clock.advance(5)
+    breaker.allow_request()
+    breaker.record_failure()
+    assert (breaker.state, breaker.allow_request()) == \
+        (CircuitBreaker.OPEN, False)
+
+
+def test_breaker_backs_off_after_failed_probes(breaker):
+    open_breaker(breaker)
+    timeouts = []
+    for _ in range(4):
+        breaker.clock.advance(breaker.reset_timeout)
+        breaker.allow_request()
+        breaker.record_failure()
+        timeouts.append(breaker.reset_timeout)
+    assert timeouts == [10, 20, 20, 20]
+
+
+def test_breaker_success_resets_backoff(breaker):
+    open_breaker(breaker)
+    breaker.clock.advance(5)
+    breaker.allow_request()
+    breaker.record_failure()
+    breaker.clock.advance(10)
+    breaker.allow_request()
+    breaker.record_success()
+    assert breaker.reset_timeout == 5
+
+
+def test_breaker_reset(breaker):
+    open_breaker(breaker)
+    breaker.reset()
+    assert (breaker.state, breaker.failures) == (CircuitBreaker.CLOSED, 0)
+
+
+def test_breaker_emits_state_changed(breaker):
+    m = MagicMock()
+    breaker.state_changed.connect(m)
+    open_breaker(breaker)
+    breaker.record_failure()
+    assert m.call_count == 1
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_twisted import inlineCallbacks
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred, succeed
+from twisted.internet.endpoints import connectProtocol, UNIXClientEndpoint
+from twisted.protocols.basic import LineOnlyReceiver
+from twisted.test.proto_helpers import StringTransport
+
+from gridsync.breaker import CircuitBreaker
+from gridsync.control import ControlServer
+from gridsync.monitor import Monitor
+from gridsync.supervisor import Supervisor
+
+
+@pytest.fixture()
+def gateway():
+    gateway = MagicMock()
+    gateway.name = 'TestGrid'
+    gateway.breaker.state = CircuitBreaker.CLOSED
+    gateway.supervisor.state = Supervisor.RUNNING
+    gateway.monitor = Monitor(gateway)
+    gateway.monitor.add_magic_folder_checker('TestFolder')
+    return gateway
+
+
+@pytest.fixture()
+def server(gateway):
+    server = ControlServer()
+    server.add_gateway(gateway)
+    return server
+
+
+@pytest.fixture()
+def protocol(server):
+    protocol = server.buildProtocol(None)
+    protocol.makeConnection(StringTransport())
+    return protocol
+
+
+def request(protocol, **kwargs):
+    protocol.transport.clear()
+    protocol.lineReceived(json.dumps(kwargs).encode('utf-8'))
+    lines = protocol.transport.value().decode('utf-8').splitlines()
+    return [json.loads(line) for line in lines]
+
+
+def test_state_cache_initial_folder_state(server):
+    folders = server.cache.snapshot('TestGrid')['TestGrid']['folders']
+    assert folders == {
+        'TestFolder': {'status': None, 'remote': False, 'members': []}}
+
+
+def test_state_cache_tracks_monitor_signals(server, gateway):
+    gateway.monitor.size_updated.emit('TestFolder', 1024)
+    gateway.monitor.nodes_updated.emit(3, 5)
+    state = server.cache.snapshot()['TestGrid']
+    assert (state['folders']['TestFolder']['size'],
+            state['grid']['nodes_connected'],
+            state['grid']['nodes_known']) == (1024, 3, 5)
+
+
+def test_state_cache_tracks_circuit_state(server, gateway):
+    gateway.monitor.circuit_state_changed.emit(CircuitBreaker.OPEN)
+    state = server.cache.snapshot()['TestGrid']
+    assert state['grid']['circuit_state'] == CircuitBreaker.OPEN
+
+
+def test_state_cache_tracks_supervisor_state(server, gateway):
+    gateway.monitor.supervisor_state_changed.emit(Supervisor.DEGRADED)
+    state = server.cache.snapshot()['TestGrid']
+    assert state['grid']['supervisor_state'] == Supervisor.DEGRADED
+
+
+def test_state_cache_strips_member_readcaps(server, gateway):
+    gateway.monitor.members_updated.emit(
+        'TestFolder', [('Alice', 'URI:DIR2-RO:aaa')])
+    state = server.cache.snapshot()['TestGrid']
+    assert state['folders']['TestFolder']['members'] == ['Alice']
+
+
+def test_control_get_state(protocol):
+    response = request(protocol, id=1, command='get_state')
+    assert response[0]['result']['TestGrid']['grid']['nodes_known'] == 0
+
+
+def test_control_get_state_unknown_gateway(protocol):
+    response = request(protocol, id=1, command='get_state', gateway='Nope')
+    assert response == [{'id': 1, 'error': 'Unknown gateway "Nope"'}]
+
+
+def test_control_malformed_request(protocol):
+    protocol.lineReceived(b'not json')
+    assert json.loads(protocol.transport.value().decode('utf-8')) == \
+        {'id': None, 'error': 'Malformed request'}
+
+
+def test_control_unknown_command(protocol):
+    response = request(protocol, id=2, command='frobnicate')
+    assert response == [{'id': 2, 'error': 'Unknown command "frobnicate"'}]
+
+
+def test_control_subscribe_streams_deltas(protocol, gateway):
+    request(protocol, id=1, command='subscribe')
+    protocol.transport.clear()
+    gateway.monitor.status_updated.emit('TestFolder', 1)
+    assert json.loads(protocol.transport.value().decode('utf-8')) == {
+        'event': 'update',
+        'gateway': 'TestGrid',
+        'folder': 'TestFolder',
+        'changes': {'status': 1}
+    }
+
+
+def test_control_subscribe_skips_unchanged_values(protocol, gateway):
+    request(protocol, id=1, command='subscribe')
+    gateway.monitor.status_updated.emit('TestFolder', 1)
+    protocol.transport.clear()
+    gateway.monitor.status_updated.emit('TestFolder', 1)
+    assert protocol.transport.value() == b''
+
+
+def test_control_unsubscribe(protocol, gateway):
+    request(protocol, id=1, command='subscribe')
+    request(protocol, id=2, command='unsubscribe')
+    protocol.transport.clear()
+    gateway.monitor.status_updated.emit('TestFolder', 1)
+    assert protocol.transport.value() == b''
+
+
+def test_control_connection_lost_unsubscribes(protocol, server):
+    request(protocol, id=1, command='subscribe')
+    protocol.connectionLost(None)
+    assert server.cache.subscribers == {}
+
+
+def test_control_rescan_rootcap(protocol, gateway):
+    gateway.monitor.scan_rootcap = MagicMock(return_value=succeed(None))
+    request(protocol, id=1, command='rescan_rootcap')
+    assert gateway.monitor.scan_rootcap.call_count == 1
+
+
+def test_control_get_stats(protocol, gateway):
+    gateway.get_debug_stats.return_value = {'node_state': {'hits': 1}}
+    response = request(protocol, id=1, command='get_stats')
+    assert response[0]['result'] == {'TestGrid': {'node_state': {'hits': 1}}}
+
+
+def test_control_add_folder(protocol, gateway, tmpdir):
+    gateway.magic_folder_exists.return_value = False
+    gateway.create_magic_folder.return_value = succeed(None)
+    gateway.restarter.track.side_effect = lambda d: d
+    gateway.restarter.request.return_value = succeed(None)
+    path = str(tmpdir.mkdir('NewFolder'))
+    response = request(protocol, id=1, command='add_folder', path=path)
+    assert (response, gateway.create_magic_folder.call_args[0],
+            gateway.restarter.request.call_count) == \
+        ([{'id': 1, 'result': 'NewFolder'}], (path,), 1)
+
+
+def test_control_add_folder_not_a_directory(protocol, tmpdir):
+    path = os.path.join(str(tmpdir), 'missing')
+    response = request(protocol, id=1, command='add_folder', path=path)
+    assert response[0]['error'] == '"{}" is not a directory'.format(path)
+
+
+def test_control_add_folder_already_exists(protocol, gateway, tmpdir):
+    gateway.magic_folder_exists.return_value = True
+    path = str(tmpdir.mkdir('TestFolder'))
+    response = request(protocol, id=1, command='add_folder', path=path)
+    assert response[0]['error'] == 'Folder "TestFolder" already exists'
+
+
+class LineClient(LineOnlyReceiver):
+    delimiter = b'\n'
+
+    def __init__(self):
+        self.response = Deferred()
+
+    def lineReceived(self, line):
+        self.response.callback(json.loads(line.decode('utf-8')))
+
+
+@inlineCallbacks
+def test_control_server_listen(server, tmpdir):
+    path = os.path.join(str(tmpdir), 'test.sock')
+    server.listen(path)
+    client = LineClient()
+    yield connectProtocol(UNIXClientEndpoint(reactor, path), client)
+    client.sendLine(b'{"id": 1, "command": "get_state"}')
+    response = yield client.response
+    client.transport.loseConnection()
+    server.stop()
+    assert response['result']['TestGrid']['folders']['TestFolder'] == {
+        'status': None, 'remote': False, 'members': []}
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from gridsync.entries import FileEntry
+
+
+def test_file_entry_has_no_instance_dict():
+    with pytest.raises(AttributeError):
+        FileEntry('file.txt', 0, 0).extra = True
+
+
+def test_file_entry_interns_caps():
+    cap = ''.join(['URI:CHK:', 'aaaa:bbbb:1:1:1024'])
+    other = ''.join(['URI:CHK:', 'aaaa:bbbb:1:1:1024'])
+    assert FileEntry('file.txt', 0, 0, cap=cap).cap is \
+        FileEntry('file.txt', 0, 0, cap=other).cap
+
+
+def test_file_entry_interns_members_when_set():
+    entry = FileEntry('file.txt', 0, 0)
+    entry.member = ''.join(['Alice', '-1'])
+    assert entry.member is FileEntry('x', 0, 0, member='Alice-1').member
+
+
+def test_file_entry_equality():
+    assert FileEntry('file.txt', 1, 2, member='Alice') == \
+        FileEntry('file.txt', 1, 2, member='Alice')
+
+
+def test_file_entry_as_dict_round_trip():
+    entry = FileEntry('file.txt', 1, 2, True, 'URI:CHK:aaaa', 'Bob', 'added')
+    assert FileEntry(**entry.as_dict()) == entry
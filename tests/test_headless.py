@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from gridsync.entries import FileEntry
+from gridsync.headless import HeadlessCore, log_startup_stats
+from gridsync.monitor import Monitor
+
+
+@pytest.fixture()
+def gateway():
+    gateway = MagicMock()
+    gateway.name = 'TestGrid'
+    gateway.monitor = Monitor(gateway)
+    HeadlessCore.connect_signals(gateway)
+    return gateway
+
+
+def test_headless_core_prints_nodes_updated(gateway, capsys):
+    gateway.monitor.nodes_updated.emit(3, 5)
+    assert capsys.readouterr().out == \
+        "[TestGrid] Connected to 3 of 5 storage nodes\n"
+
+
+def test_headless_core_prints_file_updated(gateway, capsys):
+    gateway.monitor.file_updated.emit(
+        'TestFolder', FileEntry('file.txt', 0, 0, action='added'))
+    assert capsys.readouterr().out == \
+        "[TestGrid] TestFolder: Added file.txt\n"
+
+
+def test_headless_core_start_gateways_no_nodedirs_stops_reactor(
+        monkeypatch, tmpdir):
+    monkeypatch.setattr('gridsync.headless.config_dir', str(tmpdir))
+    fake_reactor = MagicMock()
+    monkeypatch.setattr('gridsync.headless.reactor', fake_reactor)
+    HeadlessCore(None).start_gateways()
+    assert fake_reactor.stop.call_count == 1
+
+
+def test_headless_core_start_gateways_no_executable_stops_reactor(
+        monkeypatch):
+    monkeypatch.setattr(
+        'gridsync.headless.get_nodedirs', lambda _: ['TestGrid'])
+    monkeypatch.setattr(
+        'gridsync.headless.select_executable', lambda: None)
+    fake_reactor = MagicMock()
+    monkeypatch.setattr('gridsync.headless.reactor', fake_reactor)
+    HeadlessCore(None).start_gateways()
+    assert fake_reactor.stop.call_count == 1
+
+
+def test_headless_core_start_gateways_starts_each_gateway(monkeypatch):
+    monkeypatch.setattr(
+        'gridsync.headless.get_nodedirs', lambda _: ['TestGrid'])
+    monkeypatch.setattr(
+        'gridsync.headless.select_executable', lambda: 'tahoe')
+    monkeypatch.setattr('gridsync.headless.get_tor', lambda _: None)
+    fake_tahoe = MagicMock()
+    monkeypatch.setattr('gridsync.headless.Tahoe', fake_tahoe)
+    monkeypatch.setattr('gridsync.headless.HeadlessCore.connect_signals',
+                        MagicMock())
+    monkeypatch.setattr('gridsync.headless.ControlServer', MagicMock())
+    core = HeadlessCore(None)
+    core.start_gateways()
+    assert core.gateways == [fake_tahoe.return_value]
+
+
+def test_headless_core_add_gateway_connects_signals_once(monkeypatch):
+    monkeypatch.setattr('gridsync.headless.ControlServer', MagicMock())
+    connect_signals = MagicMock()
+    monkeypatch.setattr(
+        'gridsync.headless.HeadlessCore.connect_signals', connect_signals)
+    core = HeadlessCore(None)
+    gateway = MagicMock()
+    core.add_gateway(gateway)
+    core.add_gateway(gateway)
+    assert (core.gateways, connect_signals.call_count) == ([gateway], 1)
+
+
+@pytest.mark.parametrize('has_handlers,call_count', [(True, 1), (False, 0)])
+def test_log_startup_stats_only_if_logging_configured(
+        has_handlers, call_count, monkeypatch):
+    monkeypatch.setattr(
+        'logging.Logger.hasHandlers', lambda _: has_handlers)
+    fake_info = MagicMock()
+    monkeypatch.setattr('gridsync.headless.logging.info', fake_info)
+    log_startup_stats(0, 'GUI')
+    assert fake_info.call_count == call_count
@@ -4,8 +4,11 @@ from unittest.mock import MagicMock, call
 
 import pytest
 from pytest_twisted import inlineCallbacks
+from twisted.internet.task import Clock, LoopingCall
 
-from gridsync.monitor import MagicFolderChecker, GridChecker, Monitor
+from gridsync.entries import FileEntry
+from gridsync.monitor import (
+    FOLLOW_UP_DELAY, MagicFolderChecker, GridChecker, Monitor)
 
 
 @pytest.fixture(scope='function')
@@ -23,24 +26,10 @@ def test_magic_folder_checker_remote_default_false(mfc):
 
 def test_notify_updated_files(mfc, qtbot):
     mfc.updated_files = [
-        {
-            'action': 'added',
-            'cap': 'URI:LIT',
-            'deleted': False,
-            'member': 'admin',
-            'mtime': 1,
-            'path': 'file_1.txt',
-            'size': 0,
-        },
-        {
-            'action': 'added',
-            'cap': 'URI:LIT',
-            'deleted': False,
-            'member': 'admin',
-            'mtime': 2,
-            'path': 'file_2.txt',
-            'size': 0,
-        }
+        FileEntry(
+            'file_1.txt', 0, 1, False, 'URI:LIT', 'admin', action='added'),
+        FileEntry(
+            'file_2.txt', 0, 2, False, 'URI:LIT', 'admin', action='added')
     ]
     with qtbot.wait_signal(mfc.files_updated) as blocker:
         mfc.notify_updated_files()
@@ -195,14 +184,9 @@ def test_process_status_emit_sync_started(mfc, monkeypatch, qtbot):
 def test_compare_states_emit_file_updated(mfc, qtbot):
     previous = {}
     current = {
-        1234567890.123456: {
-            'size': 1024,
-            'mtime': 1234567890.123456,
-            'deleted': False,
-            'cap': 'URI:CHK:aaaaaa:bbbbbb:1:1:1024',
-            'path': 'file_1',
-            'member': 'admin'
-        }
+        1234567890.123456: FileEntry(
+            'file_1', 1024, 1234567890.123456, False,
+            'URI:CHK:aaaaaa:bbbbbb:1:1:1024', 'admin')
     }
     with qtbot.wait_signal(mfc.file_updated):
         mfc.compare_states(current, previous)
@@ -211,125 +195,75 @@ def test_compare_states_emit_file_updated(mfc, qtbot):
 def test_compare_states_file_added(mfc):
     previous = {}
     current = {
-        1234567890.123456: {
-            'size': 1024,
-            'mtime': 1234567890.123456,
-            'deleted': False,
-            'cap': 'URI:CHK:aaaaaa:bbbbbb:1:1:1024',
-            'path': 'file_1',
-            'member': 'admin'
-        }
+        1234567890.123456: FileEntry(
+            'file_1', 1024, 1234567890.123456, False,
+            'URI:CHK:aaaaaa:bbbbbb:1:1:1024', 'admin')
     }
     mfc.compare_states(current, previous)
-    assert mfc.updated_files[0]['action'] == 'added'
+    assert mfc.updated_files[0].action == 'added'
 
 
 def test_compare_states_file_updated(mfc):
     previous = {
-        1234567890.123456: {
-            'size': 1024,
-            'mtime': 1234567890.123456,
-            'deleted': False,
-            'cap': 'URI:CHK:aaaaaa:bbbbbb:1:1:1024',
-            'path': 'file_1',
-            'member': 'admin'
-        }
+        1234567890.123456: FileEntry(
+            'file_1', 1024, 1234567890.123456, False,
+            'URI:CHK:aaaaaa:bbbbbb:1:1:1024', 'admin')
     }
     current = {
-        1234567891.123456: {
-            'size': 2048,
-            'mtime': 1234567891.123456,
-            'deleted': False,
-            'cap': 'URI:CHK:cccccc:dddddd:1:1:2048',
-            'path': 'file_1',
-            'member': 'admin'
-        }
+        1234567891.123456: FileEntry(
+            'file_1', 2048, 1234567891.123456, False,
+            'URI:CHK:cccccc:dddddd:1:1:2048', 'admin')
     }
     mfc.compare_states(current, previous)
-    assert mfc.updated_files[0]['action'] == 'updated'
+    assert mfc.updated_files[0].action == 'updated'
 
 
 def test_compare_states_file_deleted(mfc):
     previous = {
-        1234567891.123456: {
-            'size': 2048,
-            'mtime': 1234567891.123456,
-            'deleted': False,
-            'cap': 'URI:CHK:cccccc:dddddd:1:1:2048',
-            'path': 'file_1',
-            'member': 'admin'
-        }
+        1234567891.123456: FileEntry(
+            'file_1', 2048, 1234567891.123456, False,
+            'URI:CHK:cccccc:dddddd:1:1:2048', 'admin')
     }
     current = {
-        1234567892.123456: {
-            'size': 2048,
-            'mtime': 1234567892.123456,
-            'deleted': True,
-            'cap': 'URI:CHK:cccccc:dddddd:1:1:2048',
-            'path': 'file_1',
-            'member': 'admin'
-        }
+        1234567892.123456: FileEntry(
+            'file_1', 2048, 1234567892.123456, True,
+            'URI:CHK:cccccc:dddddd:1:1:2048', 'admin')
     }
     mfc.compare_states(current, previous)
-    assert mfc.updated_files[0]['action'] == 'deleted'
+    assert mfc.updated_files[0].action == 'deleted'
 
 
 def test_compare_states_file_restored(mfc):
     previous = {
-        1234567892.123456: {
-            'size': 2048,
-            'mtime': 1234567892.123456,
-            'deleted': True,
-            'cap': 'URI:CHK:cccccc:dddddd:1:1:2048',
-            'path': 'file_1',
-            'member': 'admin'
-        }
+        1234567892.123456: FileEntry(
+            'file_1', 2048, 1234567892.123456, True,
+            'URI:CHK:cccccc:dddddd:1:1:2048', 'admin')
     }
     current = {
-        1234567893.123456: {
-            'size': 2048,
-            'mtime': 1234567893.123456,
-            'deleted': False,
-            'cap': 'URI:CHK:cccccc:dddddd:1:1:2048',
-            'path': 'file_1',
-            'member': 'admin'
-        }
+        1234567893.123456: FileEntry(
+            'file_1', 2048, 1234567893.123456, False,
+            'URI:CHK:cccccc:dddddd:1:1:2048', 'admin')
     }
     mfc.compare_states(current, previous)
-    assert mfc.updated_files[0]['action'] == 'restored'
+    assert mfc.updated_files[0].action == 'restored'
 
 
 def test_compare_states_directory_created(mfc):
     previous = {
-        1234567893.123456: {
-            'size': 2048,
-            'mtime': 1234567893.123456,
-            'deleted': False,
-            'cap': 'URI:CHK:cccccc:dddddd:1:1:2048',
-            'path': 'file_1',
-            'member': 'admin'
-        }
+        1234567893.123456: FileEntry(
+            'file_1', 2048, 1234567893.123456, False,
+            'URI:CHK:cccccc:dddddd:1:1:2048', 'admin')
     }
     current = {
-        1234567893.123456: {
-            'size': 2048,
-            'mtime': 1234567893.123456,
-            'deleted': False,
-            'cap': 'URI:CHK:cccccc:dddddd:1:1:2048',
-            'path': 'file_1',
-            'member': 'admin'
-        },
-        1234567894.123456: {
-            'size': 0,
-            'mtime': 1234567894.123456,
-            'deleted': False,
-            'cap': 'URI:DIR:eeeeee:ffffff',
-            'path': 'subdir/',
-            'member': 'admin'
-        }
+        1234567893.123456: FileEntry(
+            'file_1', 2048, 1234567893.123456, False,
+            'URI:CHK:cccccc:dddddd:1:1:2048', 'admin'),
+        1234567894.123456: FileEntry(
+            'subdir/', 0, 1234567894.123456, False,
+            'URI:DIR:eeeeee:ffffff', 'admin')
     }
     mfc.compare_states(current, previous)
-    assert mfc.updated_files[0]['action'] == 'created'
+    assert mfc.updated_files[0].action == 'created'
 
 
 fake_gateway = MagicMock()
@@ -482,3 +416,84 @@ def test_monitor_start():
     monitor.timer = MagicMock()
     monitor.start()
     assert monitor.timer.mock_calls == [call.start(2, now=True)]
+
+
+@inlineCallbacks
+def test_monitor_check_folder_checks_only_that_folder(monkeypatch):
+    checked = []
+    monkeypatch.setattr(
+        'gridsync.monitor.MagicFolderChecker.do_check',
+        lambda self: checked.append(self.name))
+    monitor = Monitor(MagicMock())
+    monitor.add_magic_folder_checker('TestFolder')
+    monitor.add_magic_folder_checker('OtherFolder')
+    monitor.magic_folder_checkers['TestFolder'].state = 1
+    yield monitor.check_folder('TestFolder')
+    assert (checked, monitor.total_sync_state) == (['TestFolder'], 1)
+
+
+@inlineCallbacks
+def test_monitor_check_folder_skips_remote_folders(monkeypatch):
+    do_check = MagicMock()
+    monkeypatch.setattr(
+        'gridsync.monitor.MagicFolderChecker.do_check', do_check)
+    monitor = Monitor(MagicMock())
+    monitor.add_magic_folder_checker('TestFolder', remote=True)
+    yield monitor.check_folder('TestFolder')
+    assert not do_check.called
+
+
+def test_monitor_update_watchers_does_not_retry_unwatchable_folders(
+        tmpdir, monkeypatch):
+    watcher = MagicMock()
+    watcher.return_value.start.return_value = False
+    monkeypatch.setattr('gridsync.monitor.FolderWatcher', watcher)
+    folders = {'TestFolder': {'directory': str(tmpdir)}}
+    monitor = Monitor(MagicMock(magic_folders=folders))
+    monitor.update_watchers()
+    monitor.update_watchers()
+    assert (watcher.call_count, monitor.watchers) == (1, {})
+
+
+def test_monitor_local_change_checked_again_after_follow_up_delay():
+    monitor = Monitor(MagicMock(), clock=Clock())
+    monitor.check_folder = MagicMock()
+    monitor.on_local_change('TestFolder')
+    monitor.clock.advance(FOLLOW_UP_DELAY - 1)
+    monitor.on_local_change('TestFolder')
+    monitor.clock.advance(FOLLOW_UP_DELAY)
+    assert monitor.check_folder.mock_calls == [call('TestFolder')] * 3
+
+
+def test_monitor_update_watchers(tmpdir, monkeypatch):
+    watcher = MagicMock()
+    monkeypatch.setattr('gridsync.monitor.FolderWatcher', watcher)
+    folders = {
+        'TestFolder': {'directory': str(tmpdir)},
+        'MissingFolder': {'directory': str(tmpdir.join('missing'))}
+    }
+    monitor = Monitor(MagicMock(magic_folders=folders))
+    monitor.update_watchers()
+    del folders['TestFolder']
+    monitor.update_watchers()
+    assert (watcher.call_count, watcher.return_value.stop.called,
+            monitor.watchers) == (1, True, {})
+
+
+@pytest.mark.parametrize('watched,sync_state,interval', [
+    (True, 2, 30),
+    (True, 1, 2),
+    (False, 2, 2),
+])
+def test_monitor_update_timer_relaxes_interval_while_watched(
+        watched, sync_state, interval):
+    monitor = Monitor(MagicMock())
+    monitor.timer = LoopingCall(lambda: None)
+    monitor.timer.clock = Clock()
+    monitor.start()
+    monitor.add_magic_folder_checker('TestFolder')
+    if watched:
+        monitor.watchers['TestFolder'] = MagicMock()
+    monitor.total_sync_state = sync_state
+    monitor.update_timer()
+    assert monitor.timer.interval == interval
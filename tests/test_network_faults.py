@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+
+import pytest
+from pytest_twisted import blockon, inlineCallbacks
+from twisted.internet import reactor
+from twisted.internet.defer import DeferredList, TimeoutError
+from twisted.internet.task import Clock, deferLater
+
+from fake_tahoe import (
+    FakeTahoeNode, listen_unix, make_nodedir, make_synthetic_grid,
+    start_gateway)
+from gridsync.breaker import CircuitBreaker
+from gridsync.setup import SetupRunner
+from gridsync.tahoe import UNIX_NODEURL, unix_webport_supported
+from netsim import constant, lognormal, NetworkSimulator, uniform
+
+
+@pytest.fixture()
+def sim():
+    sim = NetworkSimulator(FakeTahoeNode(num_servers=10), seed=1234)
+    sim.listen()
+    yield sim
+    blockon(sim.stop())
+
+
+@pytest.fixture()
+def gateway(sim, tmpdir):
+    nodedir = os.path.join(str(tmpdir), 'TestGrid')
+    make_nodedir(nodedir, sim.nodeurl, sim.node.api_token)
+    make_synthetic_grid(sim.node, nodedir, num_folders=3, num_files=5)
+    gateway = start_gateway(nodedir)
+    gateway.monitor.grid_checker.connected.disconnect(
+        gateway.monitor.scan_rootcap)
+    gateway.breaker.clock = Clock()
+    return gateway
+
+
+@inlineCallbacks
+def ticks(sim, gateway, count):
+    # Returns the simulator's records of the requests made during each tick,
+    # along with the (simulator's) time at which the tick finished
+    results = []
+    for _ in range(count):
+        first = len(sim.records)
+        yield gateway.monitor.do_checks()
+        results.append((sim.records[first:], sim.clock.seconds()))
+    return results
+
+
+def in_series(records):
+    return all(later['start'] >= earlier['end']
+               for earlier, later in zip(records, records[1:]))
+
+
+@inlineCallbacks
+def test_tick_requests_made_in_series(sim, gateway):
+    yield gateway.monitor.do_checks()  # Initial scan
+    sim.set_rule(latency=uniform(0.005, 0.015))
+    results = yield ticks(sim, gateway, 10)
+    # One grid status request plus one status request per folder, each
+    # round-trip in series (and without retries)
+    assert [(len(records), in_series(records)) for records, _ in results] \
+        == [(4, True)] * 10
+
+
+@inlineCallbacks
+def test_tick_waits_for_slowest_endpoint(sim, gateway):
+    yield gateway.monitor.do_checks()
+    sim.set_rule('POST /magic_folder?t=json', latency=constant(0.03))
+    results = yield ticks(sim, gateway, 3)
+    assert all(all(record['end'] <= finished for record in records)
+               for records, finished in results)
+
+
+@inlineCallbacks
+def test_no_request_amplification_under_latency(sim, gateway):
+    yield gateway.monitor.do_checks()
+    first = len(sim.records)
+    yield gateway.monitor.do_checks()
+    baseline = sim.request_counts(first)
+    sim.set_rule(latency=lognormal(0.005, 0.5))
+    first = len(sim.records)
+    yield gateway.monitor.do_checks()
+    assert sim.request_counts(first) == baseline
+
+
+@inlineCallbacks
+def test_monitor_disconnects_while_node_is_down(sim, gateway):
+    yield gateway.monitor.do_checks()
+    yield sim.go_down()
+    yield gateway.monitor.do_checks()
+    assert gateway.monitor.grid_checker.num_connected == 0
+
+
+@inlineCallbacks
+def test_circuit_opens_while_node_is_down(sim, gateway):
+    yield gateway.monitor.do_checks()
+    yield sim.go_down()
+    yield gateway.monitor.do_checks()
+    assert gateway.breaker.state == CircuitBreaker.OPEN
+
+
+@inlineCallbacks
+def test_no_requests_while_circuit_is_open(sim, gateway):
+    yield gateway.monitor.do_checks()
+    yield sim.go_down()
+    yield gateway.monitor.do_checks()
+    sim.go_up()
+    first = len(sim.records)
+    for _ in range(3):
+        yield gateway.monitor.do_checks()
+    assert sim.request_counts(first) == {}
+
+
+@inlineCallbacks
+def test_circuit_probes_with_single_request(sim, gateway):
+    yield gateway.monitor.do_checks()
+    yield sim.go_down()
+    yield gateway.monitor.do_checks()
+    yield gateway.monitor.do_checks()  # Probe fails
+    gateway.breaker.clock.advance(gateway.breaker.reset_timeout)
+    first = len(sim.records)
+    sim.go_up()
+    yield sim.go_down()
+    yield gateway.monitor.do_checks()
+    assert (sim.request_counts(first), gateway.breaker.state) == \
+        ({}, CircuitBreaker.OPEN)
+
+
+@inlineCallbacks
+def test_monitor_recovers_on_first_probe_after_outage(sim, gateway):
+    yield gateway.monitor.do_checks()
+    yield sim.go_down()
+    yield gateway.monitor.do_checks()
+    sim.go_up()
+    gateway.breaker.clock.advance(gateway.breaker.reset_timeout)
+    count = 0
+    while not gateway.monitor.grid_checker.num_connected:
+        yield gateway.monitor.do_checks()
+        count += 1
+    assert (count, gateway.breaker.state) == (1, CircuitBreaker.CLOSED)
+
+
+@inlineCallbacks
+def test_monitor_reports_circuit_state(sim, gateway):
+    states = []
+    gateway.monitor.circuit_state_changed.connect(states.append)
+    yield gateway.monitor.do_checks()
+    yield sim.go_down()
+    yield gateway.monitor.do_checks()
+    sim.go_up()
+    gateway.breaker.clock.advance(gateway.breaker.reset_timeout)
+    yield gateway.monitor.do_checks()
+    assert states == [
+        CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN, CircuitBreaker.CLOSED]
+
+
+@inlineCallbacks
+def test_await_ready_recovers_after_outage(sim, gateway):
+    yield sim.go_down()
+    events = []
+
+    def go_up():
+        events.append('up')
+        sim.go_up()
+    sim.clock.callLater(0.3, go_up)
+    yield gateway.await_ready()
+    events.append('ready')
+    # While the node is down, its connections are refused before reaching
+    # the simulator; once up, the next poll finds it ready
+    assert (events, len(sim.records)) == (['up', 'ready'], 1)
+
+
+@inlineCallbacks
+def test_partial_response_counts_as_failure(sim, gateway):
+    sim.set_rule('GET /uri?t=json', partial=1.0)
+    result = yield gateway.get_json(gateway.get_rootcap())
+    assert (result, gateway.breaker.failures) == (None, 1)
+
+
+@inlineCallbacks
+def test_reset_connection_counts_as_failure(sim, gateway):
+    sim.set_rule('GET /uri?t=json', refuse=1.0)
+    result = yield gateway.get_json(gateway.get_rootcap())
+    assert (result, gateway.breaker.failures) == (None, 1)
+
+
+@inlineCallbacks
+def test_hung_status_request_times_out(sim, gateway):
+    sim.set_rule('POST /magic_folder?t=json', timeout=1.0)
+    gateway.request_timeouts['magic_folder_status'] = 0.1
+    result = yield gateway.get_magic_folder_status('Folder-0')
+    # The node never responded; the client gave up on its own
+    assert (result, sim.hung[-1].finished, gateway.breaker.failures) == \
+        (None, False, 1)
+
+
+@inlineCallbacks
+def test_hung_request_is_cancelled_on_timeout(sim, gateway):
+    sim.set_rule('POST /magic_folder?t=json', timeout=1.0)
+    gateway.request_timeouts['magic_folder_status'] = 0.1
+    yield gateway.get_magic_folder_status('Folder-0')
+    yield deferLater(reactor, 0.05, lambda: None)
+    assert sim.hung[-1].channel is None  # The client went away
+
+
+@inlineCallbacks
+def test_hung_mkdir_raises_timeout_error(sim, gateway):
+    sim.set_rule('POST /uri?t=mkdir', timeout=1.0)
+    gateway.request_timeouts['mkdir'] = 0.1
+    with pytest.raises(TimeoutError):
+        yield gateway.mkdir()
+
+
+@inlineCallbacks
+def test_hung_tick_does_not_stall_monitor(sim, gateway):
+    yield gateway.monitor.do_checks()
+    sim.set_rule('POST /magic_folder?t=json', timeout=1.0)
+    gateway.request_timeouts['magic_folder_status'] = 0.1
+    results = yield ticks(sim, gateway, 1)
+    records = results[0][0]
+    # The tick finished, despite none of the folders' statuses ever arriving
+    assert [r['outcome'] for r in records if r['outcome'] != 'ok'] == \
+        ['timeout'] * 3
+
+
+@inlineCallbacks
+def test_http_errors_do_not_open_circuit(sim, gateway):
+    for _ in range(5):
+        yield gateway.get_magic_folder_status('NonExistentFolder')
+    assert (gateway.breaker.state, gateway.breaker.failures) == \
+        (CircuitBreaker.CLOSED, 0)
+
+
+@inlineCallbacks
+def test_bandwidth_cap_throttles_download(sim, gateway, tmpdir):
+    cap = sim.node.put(b'x' * 32 * 1024)
+    sim.set_rule('GET /uri', bandwidth=128 * 1024)
+    dest = str(tmpdir.join('download'))
+    first = len(sim.records)
+    yield gateway.download(cap, dest)
+    with open(dest, 'rb') as f:
+        content = f.read()
+    # 6.4 KiB every 0.05 seconds
+    assert (content == b'x' * 32 * 1024, sim.records[first]['chunks']) == \
+        (True, 6)
+
+
+@inlineCallbacks
+def test_setup_runner_over_slow_link(sim, gateway):
+    sim.set_rule(latency=uniform(0.01, 0.02))
+    gateway.rootcap = None
+    os.remove(gateway.rootcap_path)
+    runner = SetupRunner([gateway])
+    first = len(sim.records)
+    yield runner.run({
+        'nickname': 'TestGrid',
+        'introducer': gateway.config_get('client', 'introducer.furl'),
+        'magic-folders': {
+            'NewFolder': {'code': 'URI:DIR2-RO:aaa:bbb+URI:DIR2:ccc:ddd'}
+        }
+    })
+    # mkdir (rootcap), PUT (settings.json), a link (settings.json) and a
+    # set_children (the folder's collective and personal caps), each
+    # round-trip in series
+    assert (sim.request_counts(first), in_series(sim.records[first:])) == ({
+        'POST /uri?t=mkdir': 1,
+        'PUT /uri': 1,
+        'POST /uri?t=uri': 1,
+        'POST /uri?t=set_children': 1
+    }, True)
+
+
+@inlineCallbacks
+def test_create_magic_folders_over_slow_link(sim, gateway, tmpdir):
+    sim.set_rule(latency=constant(0.02))
+    paths = [str(tmpdir.join('New-{}'.format(i))) for i in range(5)]
+    first = len(sim.records)
+    results = yield gateway.create_magic_folders(paths)
+    remote_folders = yield gateway.get_magic_folders_from_rootcap()
+    # Readcaps are derived locally, and all of the folders are linked to the
+    # rootcap at once
+    assert (
+        [success for success, _ in results],
+        sim.request_counts(first)['POST /uri?t=mkdir'],
+        sim.request_counts(first)['POST /uri?t=mkdir-with-children'],
+        sim.request_counts(first)['POST /uri?t=set_children'],
+        sorted(f for f in remote_folders if f.startswith('New-'))
+    ) == ([True] * 5, 5, 5, 1, ['New-{}'.format(i) for i in range(5)])
+
+
+@inlineCallbacks
+def test_interactive_request_skips_background_queue(sim, gateway):
+    sim.set_rule('GET /uri?t=json', latency=constant(0.05))
+    rootcap = gateway.get_rootcap()
+    scans = DeferredList([gateway.get_json(rootcap) for _ in range(30)])
+    yield gateway.mkdir()
+    yield scans
+    endpoints = [record['endpoint'] for record in sim.records]
+    # mkdir waits for (at most) one round of in-flight scan requests, rather
+    # than for all 30 / max_concurrency rounds
+    assert endpoints.index('POST /uri?t=mkdir') <= \
+        gateway.scheduler.max_concurrency
+
+
+@inlineCallbacks
+def test_scheduler_caps_concurrent_requests(sim, gateway):
+    sim.set_rule('GET /uri?t=json', latency=constant(0.02))
+    rootcap = gateway.get_rootcap()
+    yield DeferredList([gateway.get_json(rootcap) for _ in range(12)])
+    starts = sorted(record['start'] for record in sim.records)
+    ends = sorted(record['end'] for record in sim.records)
+    in_flight = max(
+        len([s for s in starts if s <= t]) - len([e for e in ends if e < t])
+        for t in starts)
+    assert in_flight <= gateway.scheduler.max_concurrency
+
+
+@pytest.mark.skipif(
+    not unix_webport_supported(), reason="Requires UNIX sockets")
+@inlineCallbacks
+def test_monitor_over_unix_socket(tmpdir):
+    node = FakeTahoeNode(num_servers=10)
+    socket_dir = tempfile.mkdtemp()
+    port = listen_unix(node, os.path.join(socket_dir, 'web.sock'))
+    nodedir = os.path.join(str(tmpdir), 'TestGrid')
+    make_nodedir(
+        nodedir, None, node.api_token,
+        webport='unix:' + os.path.join(socket_dir, 'web.sock'))
+    make_synthetic_grid(node, nodedir, num_folders=2, num_files=5)
+    gateway = start_gateway(nodedir)
+    gateway.monitor.grid_checker.connected.disconnect(
+        gateway.monitor.scan_rootcap)
+    yield gateway.monitor.do_checks()
+    yield port.stopListening()
+    shutil.rmtree(socket_dir)
+    assert (gateway.nodeurl, gateway.monitor.grid_checker.num_connected,
+            node.request_counts['POST /magic_folder?t=json']) == \
+        (UNIX_NODEURL, 10, 2)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+from gridsync.nodestate import NodeState, read_aliases, read_text
+
+
+@pytest.fixture()
+def nodedir(tmpdir, monkeypatch):
+    monkeypatch.setattr('gridsync.nodestate.RACY_WINDOW', 0)
+    tmpdir.mkdir('private').join('aliases').write(
+        '# comment\nalias: URI:DIR2:aaa:bbb\n')
+    tmpdir.join('node.url').write('http://127.0.0.1:12345/\n')
+    return str(tmpdir)
+
+
+def test_read_parses_file(nodedir):
+    assert NodeState(nodedir).read(
+        os.path.join('private', 'aliases'), read_aliases) == \
+        {'alias:': 'URI:DIR2:aaa:bbb'}
+
+
+def test_read_serves_unchanged_files_from_memory(nodedir):
+    state = NodeState(nodedir)
+    for _ in range(3):
+        state.read('node.url', read_text)
+    assert state.get_stats() == {'hits': 2, 'reloads': {'node.url': 1}}
+
+
+def test_read_reloads_changed_files(nodedir):
+    state = NodeState(nodedir)
+    state.read('node.url', read_text)
+    with open(os.path.join(nodedir, 'node.url'), 'w') as f:
+        f.write('http://127.0.0.1:54321/\n')
+    assert (state.read('node.url', read_text), state.reloads['node.url']) \
+        == ('http://127.0.0.1:54321/', 2)
+
+
+def test_read_reloads_invalidated_files(nodedir):
+    state = NodeState(nodedir)
+    state.read('node.url', read_text)
+    state.invalidate('node.url')
+    state.read('node.url', read_text)
+    assert state.reloads['node.url'] == 2
+
+
+def test_read_does_not_cache_recently_modified_files(nodedir, monkeypatch):
+    monkeypatch.setattr('gridsync.nodestate.RACY_WINDOW', 60)
+    state = NodeState(nodedir)
+    state.read('node.url', read_text)
+    state.read('node.url', read_text)
+    assert state.reloads['node.url'] == 2
+
+
+def test_read_returns_default_for_missing_files(nodedir):
+    state = NodeState(nodedir)
+    state.read('node.url', read_text)
+    os.remove(os.path.join(nodedir, 'node.url'))
+    assert state.read('node.url', read_text, 'default') == 'default'
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import MagicMock
+
+import pytest
+from twisted.internet.defer import Deferred, fail, succeed
+from twisted.internet.task import Clock
+
+from gridsync.restarter import (
+    MAX_RESTART_DELAY, RESTART_DELAY, RestartScheduler)
+
+
+@pytest.fixture()
+def gateway():
+    gateway = MagicMock()
+    gateway.name = 'TestGrid'
+    gateway.restart.return_value = succeed(4.5)
+    return gateway
+
+
+@pytest.fixture()
+def restarter(gateway):
+    return RestartScheduler(gateway, clock=Clock())
+
+
+def test_restart_delayed(restarter, gateway):
+    restarter.request()
+    restarter.clock.advance(RESTART_DELAY - 0.1)
+    assert not gateway.restart.called
+
+
+def test_requests_coalesced(restarter, gateway):
+    results = []
+    for _ in range(5):
+        restarter.request().addCallback(results.append)
+        restarter.clock.advance(1)
+    restarter.clock.advance(RESTART_DELAY)
+    assert (gateway.restart.call_count, results) == (1, [4.5] * 5)
+
+
+def test_restart_no_later_than_max_restart_delay(restarter, gateway):
+    for _ in range(MAX_RESTART_DELAY):
+        restarter.request()
+        restarter.clock.advance(1)
+    assert gateway.restart.call_count == 1
+
+
+def test_restart_waits_for_tracked_operations(restarter, gateway):
+    operation = restarter.track(Deferred())
+    restarter.request()
+    restarter.clock.advance(RESTART_DELAY * 10)
+    called_before = gateway.restart.called
+    operation.callback(None)
+    assert (called_before, gateway.restart.call_count) == (False, 1)
+
+
+def test_request_during_restart_restarts_again(restarter, gateway):
+    d = Deferred()
+    gateway.restart.side_effect = [d, succeed(2.0)]
+    restarter.request()
+    restarter.clock.advance(RESTART_DELAY)
+    results = []
+    restarter.request().addCallback(results.append)
+    restarter.clock.advance(RESTART_DELAY)
+    call_count = gateway.restart.call_count
+    d.callback(3.0)
+    assert (call_count, gateway.restart.call_count, results) == (1, 2, [2.0])
+
+
+def test_restart_failure_errbacks_requests(restarter, gateway):
+    gateway.restart.return_value = fail(RuntimeError('Test error'))
+    failures = []
+    restarter.request().addErrback(failures.append)
+    restarter.clock.advance(RESTART_DELAY)
+    assert (failures[0].type, restarter.restarting) == (RuntimeError, False)
+
+
+def test_restart_downtime_reported(restarter, qtbot):
+    restarter.request()
+    with qtbot.wait_signal(restarter.restarted) as blocker:
+        restarter.clock.advance(RESTART_DELAY)
+    assert (blocker.args, restarter.get_stats()) == ([4.5], {
+        'requests': 1,
+        'restarts': 1,
+        'last_downtime': 4.5,
+        'total_downtime': 4.5
+    })
+
+
+def test_aborted_restart_not_counted(restarter, gateway):
+    gateway.restart.return_value = succeed(None)
+    restarter.request()
+    restarter.clock.advance(RESTART_DELAY)
+    assert restarter.get_stats()['restarts'] == 0
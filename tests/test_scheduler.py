@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from twisted.internet.defer import CancelledError, Deferred, fail, succeed
+
+from gridsync.scheduler import (
+    BACKGROUND, INTERACTIVE, RequestScheduler, SETUP, STATS)
+
+
+@pytest.fixture()
+def scheduler():
+    return RequestScheduler(max_concurrency=2)
+
+
+class FakeRequests():
+    def __init__(self):
+        self.started = []
+        self.deferreds = {}
+
+    def request(self, name):
+        self.started.append(name)
+        d = Deferred()
+        self.deferreds[name] = d
+        return d
+
+    def finish(self, name, result=None):
+        self.deferreds.pop(name).callback(result or name)
+
+
+@pytest.fixture()
+def requests():
+    return FakeRequests()
+
+
+def test_scheduler_runs_immediately_below_cap(scheduler, requests):
+    scheduler.run(STATS, requests.request, 'a')
+    scheduler.run(STATS, requests.request, 'b')
+    assert requests.started == ['a', 'b']
+
+
+def test_scheduler_enforces_concurrency_cap(scheduler, requests):
+    for name in 'abc':
+        scheduler.run(STATS, requests.request, name)
+    assert (requests.started, scheduler.active, scheduler.pending) == \
+        (['a', 'b'], 2, 1)
+
+
+def test_scheduler_dispatches_when_slot_frees(scheduler, requests):
+    for name in 'abc':
+        scheduler.run(STATS, requests.request, name)
+    requests.finish('a')
+    assert requests.started == ['a', 'b', 'c']
+
+
+def test_scheduler_dispatches_by_priority(scheduler, requests):
+    scheduler.run(BACKGROUND, requests.request, 'busy1')
+    scheduler.run(BACKGROUND, requests.request, 'busy2')
+    scheduler.run(STATS, requests.request, 'stats')
+    scheduler.run(BACKGROUND, requests.request, 'scan')
+    scheduler.run(SETUP, requests.request, 'setup')
+    scheduler.run(INTERACTIVE, requests.request, 'interactive')
+    for name in ('busy1', 'busy2', 'interactive', 'setup', 'scan'):
+        requests.finish(name)
+    assert requests.started[2:] == ['interactive', 'setup', 'scan', 'stats']
+
+
+def test_scheduler_fifo_within_priority(scheduler, requests):
+    scheduler.run(BACKGROUND, requests.request, 'busy1')
+    scheduler.run(BACKGROUND, requests.request, 'busy2')
+    for name in 'abc':
+        scheduler.run(BACKGROUND, requests.request, name)
+    for name in ('busy1', 'busy2', 'a'):
+        requests.finish(name)
+    assert requests.started[2:] == ['a', 'b', 'c']
+
+
+def test_scheduler_does_not_preempt_running_requests(scheduler, requests):
+    scheduler.run(BACKGROUND, requests.request, 'a')
+    scheduler.run(BACKGROUND, requests.request, 'b')
+    scheduler.run(INTERACTIVE, requests.request, 'c')
+    assert (requests.started, sorted(requests.deferreds)) == \
+        (['a', 'b'], ['a', 'b'])
+
+
+def test_scheduler_returns_result(scheduler, requests):
+    d = scheduler.run(STATS, requests.request, 'a')
+    requests.finish('a', 'result')
+    assert d.result == 'result'
+
+
+def test_scheduler_propagates_failure(scheduler):
+    d = scheduler.run(STATS, lambda: fail(ValueError()))
+    with pytest.raises(ValueError):
+        d.result.raiseException()
+    d.addErrback(lambda _: None)
+
+
+def test_scheduler_frees_slot_on_failure(scheduler):
+    d = scheduler.run(STATS, lambda: fail(ValueError()))
+    d.addErrback(lambda _: None)
+    assert scheduler.active == 0
+
+
+def test_scheduler_cancel_queued_request(scheduler, requests):
+    for name in 'ab':
+        scheduler.run(STATS, requests.request, name)
+    d = scheduler.run(STATS, requests.request, 'c')
+    d.cancel()
+    requests.finish('a')
+    assert (requests.started, scheduler.pending) == (['a', 'b'], 0)
+    with pytest.raises(CancelledError):
+        d.result.raiseException()
+    d.addErrback(lambda _: None)
+
+
+def test_scheduler_cancel_running_request(scheduler, requests):
+    d = scheduler.run(STATS, requests.request, 'a')
+    inner = requests.deferreds['a']
+    d.cancel()
+    d.addErrback(lambda _: None)
+    assert (inner.called, scheduler.active) == (True, 0)
+
+
+def test_scheduler_synchronous_results_do_not_recurse(scheduler):
+    results = [scheduler.run(STATS, succeed, i) for i in range(5000)]
+    assert [d.result for d in results] == list(range(5000))
+
+
+def test_scheduler_accepts_requests_from_callbacks(scheduler, requests):
+    d = scheduler.run(STATS, requests.request, 'a')
+    d.addCallback(lambda _: scheduler.run(STATS, requests.request, 'b'))
+    requests.finish('a')
+    assert requests.started == ['a', 'b']
@@ -13,6 +13,7 @@ from gridsync.errors import UpgradeRequiredError, TorError
 from gridsync.setup import (
     is_onion_grid, prompt_for_grid_name, validate_grid, prompt_for_folder_name,
     validate_folders, validate_settings, SetupRunner)
+from gridsync.scheduler import SETUP
 from gridsync.tahoe import Tahoe
 
 
@@ -515,10 +516,12 @@ def test_ensure_recovery_create_rootcap(monkeypatch, tmpdir):
     nodedir = str(tmpdir.mkdir('TestGrid'))
     os.makedirs(os.path.join(nodedir, 'private'))
     monkeypatch.setattr('gridsync.tahoe.Tahoe.create_rootcap', lambda _: 'URI')
-    monkeypatch.setattr('gridsync.tahoe.Tahoe.upload', lambda x, y: 'URI:2')
+    monkeypatch.setattr(
+        'gridsync.tahoe.Tahoe.upload', lambda x, y, priority: 'URI:2')
 
-    def fake_link(_, dircap, name, childcap):
-        assert (dircap, name, childcap) == ('URI', 'settings.json', 'URI:2')
+    def fake_link(_, dircap, name, childcap, priority):
+        assert (dircap, name, childcap, priority) == \
+            ('URI', 'settings.json', 'URI:2', SETUP)
     monkeypatch.setattr('gridsync.tahoe.Tahoe.link', fake_link)
     sr = SetupRunner([])
     sr.gateway = Tahoe(nodedir)
@@ -534,10 +537,12 @@ def test_ensure_recovery_create_rootcap_pass_on_error(monkeypatch, tmpdir):
     monkeypatch.setattr(
         'gridsync.tahoe.Tahoe.create_rootcap',
         MagicMock(side_effect=OSError()))
-    monkeypatch.setattr('gridsync.tahoe.Tahoe.upload', lambda x, y: 'URI:2')
+    monkeypatch.setattr(
+        'gridsync.tahoe.Tahoe.upload', lambda x, y, priority: 'URI:2')
 
-    def fake_link(_, dircap, name, childcap):
-        assert (dircap, name, childcap) == ('URI', 'settings.json', 'URI:2')
+    def fake_link(_, dircap, name, childcap, priority):
+        assert (dircap, name, childcap, priority) == \
+            ('URI', 'settings.json', 'URI:2', SETUP)
     monkeypatch.setattr('gridsync.tahoe.Tahoe.link', fake_link)
     sr = SetupRunner([])
     sr.gateway = Tahoe(nodedir)
@@ -548,7 +553,8 @@ def test_ensure_recovery_create_rootcap_pass_on_error(monkeypatch, tmpdir):
 
 @inlineCallbacks
 def test_join_folders_emit_joined_folders_signal(monkeypatch, qtbot, tmpdir):
-    monkeypatch.setattr('gridsync.tahoe.Tahoe.link', lambda a, b, c, d: None)
+    monkeypatch.setattr(
+        'gridsync.tahoe.Tahoe.set_children', lambda a, b, c, priority: None)
     sr = SetupRunner([])
     sr.gateway = Tahoe(str(tmpdir.mkdir('TestGrid')))
     sr.gateway.rootcap = 'URI:rootcap'
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+
+from gridsync.streaming import ListingParser
+
+
+LISTING = ['dirnode', {
+    'rw_uri': 'URI:DIR2:aaa:bbb',
+    'mutable': True,
+    'children': {
+        'subdir@_file-1.txt': ['filenode', {
+            'ro_uri': 'URI:CHK:ccc:ddd:1:1:100',
+            'size': 100,
+            'metadata': {'tahoe': {'linkmotime': 1500000000.123}}
+        }],
+        'subdir@_': ['dirnode', {'ro_uri': 'URI:DIR2-RO:eee:fff'}],
+        'Ünïcödé': ['filenode', {'size': 0}]
+    },
+    'ro_uri': 'URI:DIR2-RO:ggg:bbb',
+    'size': 123456789
+}]
+
+
+def parse(chunks):
+    children = []
+    parser = ListingParser(lambda name, node: children.append((name, node)))
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+    return parser, children
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+@pytest.mark.parametrize('chunk_size', [1, 3, 64, 100000])
+def test_listing_parser_yields_children(indent, chunk_size):
+    data = json.dumps(LISTING, indent=indent, ensure_ascii=False)
+    parser, children = parse(split(data.encode('utf-8'), chunk_size))
+    assert (parser.node_type, parser.has_children, children) == (
+        'dirnode', True, list(LISTING[1]['children'].items()))
+
+
+def test_listing_parser_yields_children_before_the_end():
+    children = []
+    parser = ListingParser(lambda name, node: children.append(name))
+    parser.feed(b'["dirnode", {"children": {"a": ["filenode", {}], "b": [')
+    assert children == ['a']
+
+
+def test_listing_parser_releases_consumed_data():
+    parser = ListingParser(lambda name, node: None)
+    parser.feed(b'["dirnode", {"children": {"a": ["filenode", {}], "b"')
+    assert parser.buffer == ', "b"'
+
+
+def test_listing_parser_does_not_cut_numbers_short():
+    parser, _ = parse([b'["dirnode", {"size": 12', b'3, "children": {}}]'])
+    assert parser.has_children
+
+
+def test_listing_parser_empty_children():
+    parser, children = parse([b'["dirnode", {"children": {}}]'])
+    assert (parser.has_children, children) == (True, [])
+
+
+def test_listing_parser_filenode_has_no_children():
+    parser, children = parse([b'["filenode", {"size": 1}]'])
+    assert (parser.node_type, parser.has_children, children) == (
+        'filenode', False, [])
+
+
+@pytest.mark.parametrize('data', [
+    b'["dirnode", {"children": {"a": ["filenode", {}]}',
+    b'["dirnode", {"children": {"a": ["filenode", {}]}}] trailing',
+    b'',
+])
+def test_listing_parser_close_raises_value_error_if_incomplete(data):
+    with pytest.raises(ValueError):
+        parse([data])
+
+
+@pytest.mark.parametrize('data', [
+    b'{"children": {}}',
+    b'["dirnode" {}]',
+    b'["dirnode", {"children": {"a" ["filenode", {}]}}]',
+])
+def test_listing_parser_feed_raises_value_error_if_malformed(data):
+    with pytest.raises(ValueError):
+        ListingParser(lambda name, node: None).feed(data)
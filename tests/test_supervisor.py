@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import MagicMock
+
+import pytest
+from twisted.internet.defer import fail, succeed
+from twisted.internet.error import ConnectError, ProcessTerminated
+from twisted.internet.task import Clock
+from twisted.python.failure import Failure
+
+from gridsync.monitor import Monitor
+from gridsync.supervisor import (
+    BACKOFF_INITIAL, MAX_RESTARTS, PROBE_FAILURE_THRESHOLD, PROBE_INTERVAL,
+    STABLE_UPTIME, Supervisor)
+from gridsync.tahoe import Tahoe
+
+
+@pytest.fixture()
+def gateway():
+    gateway = MagicMock()
+    gateway.name = 'TestGrid'
+    gateway.configure_mock(
+        STOPPED=Tahoe.STOPPED, STARTING=Tahoe.STARTING,
+        STARTED=Tahoe.STARTED, STOPPING=Tahoe.STOPPING, state=Tahoe.STARTED)
+    gateway.stop.return_value = succeed(None)
+    gateway.http.get.return_value = succeed(MagicMock())
+    gateway.nodeurl = 'http://127.0.0.1:65536/'
+    return gateway
+
+
+@pytest.fixture()
+def supervisor(gateway, monkeypatch):
+    monkeypatch.setattr('treq.content', lambda _: succeed(b''))
+    supervisor = Supervisor(gateway, clock=Clock())
+
+    def restart():
+        supervisor.stop()  # Like Tahoe.stop()
+        supervisor.start()  # Like Tahoe.start()
+        return succeed(1.0)
+    gateway.restarter.request.side_effect = restart
+    supervisor.start()
+    return supervisor
+
+
+def crash(supervisor):
+    supervisor.process_ended(Failure(ProcessTerminated(exitCode=1)))
+
+
+def test_crash_restarts_node_after_backoff(supervisor, gateway):
+    crash(supervisor)
+    state = supervisor.state
+    supervisor.clock.advance(BACKOFF_INITIAL)
+    assert (state, gateway.restarter.request.call_count, supervisor.state) == \
+        (Supervisor.DEGRADED, 1, Supervisor.RUNNING)
+
+
+def test_exit_while_stopping_ignored(supervisor, gateway):
+    gateway.state = Tahoe.STOPPING
+    crash(supervisor)
+    assert (supervisor.state, supervisor.crashes) == (Supervisor.RUNNING, 0)
+
+
+def test_backoff_doubles_with_each_restart(supervisor, gateway):
+    delays = []
+    for _ in range(3):
+        crash(supervisor)
+        delays.append(supervisor.delayed_call.getTime()
+                      - supervisor.clock.seconds())
+        supervisor.clock.advance(delays[-1])
+    assert delays == [BACKOFF_INITIAL, BACKOFF_INITIAL * 2,
+                      BACKOFF_INITIAL * 4]
+
+
+def test_backoff_reset_after_stable_uptime(supervisor, gateway):
+    crash(supervisor)
+    supervisor.clock.advance(BACKOFF_INITIAL)
+    supervisor.clock.pump([PROBE_INTERVAL] * (
+        STABLE_UPTIME // PROBE_INTERVAL + 1))
+    assert supervisor.backoff == BACKOFF_INITIAL
+
+
+def test_restart_storm_capped(supervisor, gateway, qtbot):
+    states = []
+    supervisor.state_changed.connect(states.append)
+    for _ in range(MAX_RESTARTS + 1):
+        crash(supervisor)
+        if supervisor.delayed_call:
+            supervisor.clock.advance(
+                supervisor.delayed_call.getTime() - supervisor.clock.seconds())
+    assert (gateway.restarter.request.call_count, states[-1]) == \
+        (MAX_RESTARTS, Supervisor.FAILED)
+
+
+def test_failed_restart_retried(supervisor, gateway):
+    restart = gateway.restarter.request.side_effect
+    results = [lambda: fail(RuntimeError('Test error')), restart]
+    gateway.restarter.request.side_effect = lambda: results.pop(0)()
+    crash(supervisor)
+    supervisor.clock.advance(BACKOFF_INITIAL)
+    supervisor.clock.advance(BACKOFF_INITIAL * 2)
+    assert (gateway.restarter.request.call_count, supervisor.state) == \
+        (2, Supervisor.RUNNING)
+
+
+def test_restart_goes_through_restart_scheduler(supervisor, gateway):
+    crash(supervisor)
+    supervisor.clock.advance(BACKOFF_INITIAL)
+    assert (gateway.restarter.request.call_count, gateway.stop.called,
+            gateway.start.called) == (1, False, False)
+
+
+def test_crash_during_restart_ignored(supervisor, gateway):
+    def restart():
+        supervisor.stop()
+        crash(supervisor)  # The old process exiting while being stopped
+        supervisor.start()
+        return succeed(1.0)
+    gateway.restarter.request.side_effect = restart
+    crash(supervisor)
+    supervisor.clock.advance(BACKOFF_INITIAL)
+    assert (supervisor.crashes, supervisor.state) == (1, Supervisor.RUNNING)
+
+
+def test_unresponsive_node_restarted(supervisor, gateway):
+    gateway.http.get.side_effect = lambda _: fail(ConnectError())
+    supervisor.clock.pump([PROBE_INTERVAL] * PROBE_FAILURE_THRESHOLD)
+    assert (supervisor.state, supervisor.hangs) == (Supervisor.DEGRADED, 1)
+
+
+def test_successful_probe_resets_failed_probes(supervisor, gateway):
+    gateway.http.get.return_value = fail(ConnectError())
+    supervisor.clock.advance(PROBE_INTERVAL)
+    failed_probes = supervisor.failed_probes
+    gateway.http.get.return_value = succeed(MagicMock())
+    supervisor.clock.advance(PROBE_INTERVAL)
+    assert (failed_probes, supervisor.failed_probes) == (1, 0)
+
+
+def test_state_changes_surfaced_through_monitor(supervisor, gateway, qtbot):
+    gateway.supervisor = supervisor
+    monitor = Monitor(gateway)
+    with qtbot.wait_signal(monitor.supervisor_state_changed) as blocker:
+        crash(supervisor)
+    assert blocker.args == [Supervisor.DEGRADED]
+
+
+def test_stop_cancels_pending_restart(supervisor, gateway):
+    crash(supervisor)
+    supervisor.stop()
+    supervisor.clock.advance(BACKOFF_INITIAL * 10)
+    assert (gateway.restarter.request.called, supervisor.state) == \
+        (False, Supervisor.STOPPED)
+
+
+def test_get_stats(supervisor):
+    supervisor.clock.advance(30)
+    crash(supervisor)
+    supervisor.clock.advance(BACKOFF_INITIAL)
+    supervisor.clock.advance(5)
+    assert supervisor.get_stats() == {
+        'state': Supervisor.RUNNING,
+        'uptime': 5,
+        'restarts': 1,
+        'crashes': 1,
+        'hangs': 0,
+        'backoff': BACKOFF_INITIAL * 2
+    }
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+import json
 import os
 try:
     from unittest.mock import MagicMock
@@ -8,10 +9,18 @@ except ImportError:
 
 import pytest
 from pytest_twisted import inlineCallbacks
+from twisted.internet.defer import fail
+from twisted.internet.error import ConnectError, ProcessTerminated
+from twisted.internet.threads import deferToThread
+from twisted.python.failure import Failure
 import yaml
 
+from gridsync.entries import FileEntry
 from gridsync.errors import TahoeError, TahoeCommandError, TahoeWebError
-from gridsync.tahoe import is_valid_furl, get_nodedirs, Tahoe
+from gridsync.supervisor import Supervisor
+from gridsync.tahoe import (
+    CommandProtocol, derive_readcap, is_valid_furl, get_nodedirs, Tahoe,
+    TCP_WEBPORT, UNIX_NODEURL)
 
 
 def fake_get(*args, **kwargs):
@@ -127,6 +136,18 @@ def test_config_set(tahoe):
     assert tahoe.config_get('node', 'nickname') == 'test'
 
 
+def test_config_get_reads_tahoe_cfg_once(tmpdir, monkeypatch):
+    monkeypatch.setattr('gridsync.nodestate.RACY_WINDOW', 0)
+    client = Tahoe(str(tmpdir))
+    tmpdir.join('tahoe.cfg').write('[node]\nnickname = default')
+    for _ in range(3):
+        client.config_get('node', 'nickname')
+    client.config_set('node', 'nickname', 'test')
+    assert (client.config_get('node', 'nickname'),
+            client.get_debug_stats()['node_state']['reloads']) == (
+        'test', {'tahoe.cfg': 2})
+
+
 def test_get_settings(tahoe):
     settings = tahoe.get_settings()
     nickname = settings['nickname']
@@ -172,6 +193,35 @@ def test_remove_alias_idempotent(tahoe):
     assert not tahoe.get_alias('added_alias')
 
 
+def test_set_aliases_adds_and_removes_at_once(tahoe):
+    tahoe.add_alias('old_alias', 'old_cap')
+    tahoe._set_aliases({'old_alias': None, 'new_alias:': 'new_cap'})
+    assert (tahoe.get_alias('old_alias'), tahoe.get_alias('new_alias')) == \
+        (None, 'new_cap')
+
+
+@pytest.mark.parametrize('writecap,readcap', [
+    (
+        'URI:DIR2:aaaqeayeaudaocajbifqydiob4:'
+        'aaaqeayeaudaocajbifqydiob4ibceqtcqkrmfyydenbwha5dypq',
+        'URI:DIR2-RO:zlnpn42lu7xedonux53kr42hsm:'
+        'aaaqeayeaudaocajbifqydiob4ibceqtcqkrmfyydenbwha5dypq'
+    ),
+    (
+        'URI:DIR2-MDMF:aaaqeayeaudaocajbifqydiob4:'
+        'aaaqeayeaudaocajbifqydiob4ibceqtcqkrmfyydenbwha5dypq',
+        'URI:DIR2-MDMF-RO:zlnpn42lu7xedonux53kr42hsm:'
+        'aaaqeayeaudaocajbifqydiob4ibceqtcqkrmfyydenbwha5dypq'
+    ),
+    ('URI:DIR2-RO:zlnpn42lu7xedonux53kr42hsm:aaaa', None),
+    ('URI:DIR2-CHK:aaaa:bbbb:1:1:1', None),
+    ('URI:DIR2:aaa', None),
+    ('URI:DIR2:0189:aaaa', None),
+])
+def test_derive_readcap(writecap, readcap):
+    assert derive_readcap(writecap) == readcap
+
+
 def test_get_storage_servers_empty(tahoe):
     assert tahoe.get_storage_servers() == {}
 
@@ -303,6 +353,91 @@ def test_tahoe_create_client_args_hide_ip(tahoe, monkeypatch):
     assert '--hide-ip' in args
 
 
+@inlineCallbacks
+def test_tahoe_create_client_args_webport_unix(tmpdir, monkeypatch):
+    monkeypatch.setattr('os.path.exists', lambda x: False)
+    mocked_command = MagicMock()
+    monkeypatch.setattr('gridsync.tahoe.Tahoe.command', mocked_command)
+    client = Tahoe(str(tmpdir.join('TestGrid')))
+    yield client.create_client(webport='unix')
+    args = mocked_command.call_args[0][0]
+    assert '--webport=unix:{}:mode=600'.format(client.socket_path) in args
+
+
+@pytest.fixture()
+def webport_client(tmpdir):
+    nodedir = str(tmpdir.mkdir('TestGrid'))
+    with open(os.path.join(nodedir, 'tahoe.cfg'), 'w') as f:
+        f.write('[node]\nweb.port = {}\n'.format(TCP_WEBPORT))
+    with open(os.path.join(nodedir, 'node.url'), 'w') as f:
+        f.write('http://127.0.0.1:12345/')
+    return Tahoe(nodedir)
+
+
+def test_get_webport_endpoint_tcp(webport_client):
+    assert webport_client.get_webport_endpoint('tcp') == TCP_WEBPORT
+
+
+def test_get_webport_endpoint_unix_escapes_colons(tmpdir):
+    client = Tahoe(str(tmpdir.join('Test:Grid')))
+    endpoint = client.get_webport_endpoint('unix')
+    assert endpoint.endswith('Test\\:Grid/private/web.sock:mode=600')
+
+
+def test_get_webport_endpoint_unix_path_too_long(tmpdir):
+    client = Tahoe(str(tmpdir.join('x' * 100)))
+    assert client.get_webport_endpoint('unix') == TCP_WEBPORT
+
+
+def test_get_webport_endpoint_unix_unsupported(webport_client, monkeypatch):
+    monkeypatch.setattr('sys.platform', 'win32')
+    assert webport_client.get_webport_endpoint('unix') == TCP_WEBPORT
+
+
+def test_get_web_socket_tcp(webport_client):
+    assert webport_client.get_web_socket() is None
+
+
+def test_get_web_socket_unescapes_colons(webport_client):
+    webport_client.config_set('node', 'web.port', 'unix:/a\\:b/web.sock:mode=600')
+    assert webport_client.get_web_socket() == '/a:b/web.sock'
+
+
+def test_get_web_socket_relative_to_nodedir(webport_client):
+    webport_client.config_set('node', 'web.port', 'unix:private/web.sock')
+    assert webport_client.get_web_socket() == os.path.join(
+        webport_client.nodedir, 'private', 'web.sock')
+
+
+def test_set_webport_unix_round_trip(webport_client):
+    webport_client.set_webport('unix')
+    assert webport_client.get_web_socket() == webport_client.socket_path
+
+
+def test_set_webport_unix_removes_stale_nodeurl(webport_client):
+    webport_client.set_webport('unix')
+    assert not os.path.exists(
+        os.path.join(webport_client.nodedir, 'node.url'))
+
+
+def test_set_webport_unchanged_returns_false(webport_client):
+    assert webport_client.set_webport('tcp') is False
+
+
+def test_read_nodeurl_tcp(webport_client):
+    assert webport_client.read_nodeurl() == 'http://127.0.0.1:12345/'
+
+
+def test_read_nodeurl_unix(webport_client):
+    webport_client.web_socket = webport_client.socket_path
+    assert webport_client.read_nodeurl() == UNIX_NODEURL
+
+
+def test_http_client_reused_for_same_socket(webport_client):
+    webport_client.web_socket = '/tmp/web.sock'
+    assert webport_client.http is webport_client.http
+
+
 @inlineCallbacks
 def test_tahoe_create_client_add_storage_servers(tmpdir, monkeypatch):
     nodedir = str(tmpdir.mkdir('TestGrid'))
@@ -352,6 +487,15 @@ def test_tahoe_stop_linux_monkeypatch(tahoe, monkeypatch):
     assert args == ['stop']
 
 
+@inlineCallbacks
+def test_tahoe_stop_stops_supervisor(tahoe, monkeypatch):
+    monkeypatch.setattr('gridsync.tahoe.Tahoe.command', MagicMock())
+    monkeypatch.setattr('sys.platform', 'linux')
+    tahoe.supervisor.start()
+    yield tahoe.stop()
+    assert tahoe.supervisor.state == Supervisor.STOPPED
+
+
 @pytest.mark.parametrize('locked,call_count', [(True, 1), (False, 0)])
 @inlineCallbacks
 def test_tahoe_stop_locked(locked, call_count, tahoe, monkeypatch):
@@ -369,6 +513,19 @@ def test_tahoe_stop_locked(locked, call_count, tahoe, monkeypatch):
         call_count, call_count)
 
 
+@pytest.mark.parametrize('output,started', [
+    (b'client running\n', True),
+    (b'Error\n', False),
+])
+def test_command_protocol_reports_started_process_ending(output, started):
+    parent = MagicMock()
+    protocol = CommandProtocol(parent, 'client running')
+    protocol.transport = MagicMock()
+    protocol.outReceived(output)
+    protocol.processEnded(Failure(ProcessTerminated(exitCode=1)))
+    assert parent.supervisor.process_ended.called == started
+
+
 @pytest.mark.parametrize(
     'tahoe_state,call_count',
     [
@@ -388,8 +545,9 @@ def test_tahoe_restart(tahoe_state, call_count, tahoe, monkeypatch):
     monkeypatch.setattr('gridsync.tahoe.set_preference', MagicMock())
     monkeypatch.setattr('gridsync.tahoe.get_preference', MagicMock())
     tahoe.state = tahoe_state
-    yield tahoe.restart()
-    assert mocked_start.call_count == call_count
+    downtime = yield tahoe.restart()
+    assert (mocked_start.call_count, downtime is None) == \
+        (call_count, not call_count)
 
 
 @inlineCallbacks
@@ -442,6 +600,152 @@ def test_get_connected_servers(tahoe, monkeypatch):
     assert output == 3
 
 
+@pytest.mark.parametrize('threshold,offloaded', [(1024, False), (0, True)])
+@inlineCallbacks
+def test_get_json_decodes_large_responses_in_thread(
+        tahoe, monkeypatch, threshold, offloaded):
+    defer_to_thread = MagicMock(side_effect=deferToThread)
+    monkeypatch.setattr('gridsync.tahoe.deferToThread', defer_to_thread)
+    monkeypatch.setattr('gridsync.tahoe.OFFLOAD_JSON_SIZE', threshold)
+    monkeypatch.setattr('treq.get', fake_get)
+    monkeypatch.setattr('treq.content', lambda _: b'["dirnode", {}]')
+    output = yield tahoe.get_json('URI:DIR2:abc:def')
+    assert (output, defer_to_thread.called) == (['dirnode', {}], offloaded)
+
+
+def fake_dirnode(num_files, first_mtime=1500000000.0):
+    children = {'subdir@_': ['dirnode', {}]}
+    for i in range(num_files):
+        children['file-{}'.format(i)] = ['filenode', {
+            'ro_uri': 'URI:CHK:aaa:{}'.format(i),
+            'size': 1024,
+            'metadata': {'tahoe': {'linkmotime': first_mtime + i}}
+        }]
+    return ['dirnode', {'children': children}]
+
+
+@inlineCallbacks
+def test_get_listing_streams_compact_records(tahoe, monkeypatch):
+    content = json.dumps(fake_dirnode(2)).encode('utf-8')
+
+    def fake_collect(_, collector):
+        for i in range(0, len(content), 7):
+            collector(content[i:i + 7])
+    monkeypatch.setattr('treq.get', fake_get)
+    monkeypatch.setattr('treq.collect', fake_collect)
+    output = yield tahoe.get_listing('URI:DIR2-RO:aaa')
+    assert output == [
+        FileEntry('file-0', 1024, 1500000000.0, False, 'URI:CHK:aaa:0'),
+        FileEntry('file-1', 1024, 1500000001.0, False, 'URI:CHK:aaa:1')
+    ]
+
+
+@inlineCallbacks
+def test_get_listing_includes_files_in_subdirectories(tahoe, monkeypatch):
+    dirnode = fake_dirnode(0)
+    dirnode[1]['children']['subdir@_file'] = ['filenode', {
+        'ro_uri': 'URI:CHK:aaa:0',
+        'size': 1024,
+        'metadata': {'tahoe': {'linkmotime': 1500000000.0}}
+    }]
+    monkeypatch.setattr('treq.get', fake_get)
+    monkeypatch.setattr(
+        'treq.collect', lambda _, collector: collector(
+            json.dumps(dirnode).encode('utf-8')))
+    output = yield tahoe.get_listing('URI:DIR2-RO:aaa')
+    assert [entry.path for entry in output] == [
+        os.path.join('subdir', 'file')]
+
+
+@inlineCallbacks
+def test_get_listing_returns_none_for_filenodes(tahoe, monkeypatch):
+    monkeypatch.setattr('treq.get', fake_get)
+    monkeypatch.setattr(
+        'treq.collect', lambda _, collector: collector(
+            b'["filenode", {"size": 1024}]'))
+    output = yield tahoe.get_listing('URI:CHK:aaa')
+    assert output is None
+
+
+@inlineCallbacks
+def test_get_listing_raises_value_error_if_truncated(tahoe, monkeypatch):
+    monkeypatch.setattr('treq.get', fake_get)
+    monkeypatch.setattr(
+        'treq.collect', lambda _, collector: collector(
+            b'["dirnode", {"children": {'))
+    with pytest.raises(ValueError):
+        yield tahoe.get_listing('URI:DIR2-RO:aaa')
+
+
+@pytest.mark.parametrize('threshold,offloaded', [(1000, False), (0, True)])
+@inlineCallbacks
+def test_get_magic_folder_state_builds_large_histories_in_thread(
+        tahoe, monkeypatch, threshold, offloaded):
+    defer_to_thread = MagicMock(side_effect=deferToThread)
+    monkeypatch.setattr('gridsync.tahoe.deferToThread', defer_to_thread)
+    monkeypatch.setattr('gridsync.tahoe.OFFLOAD_CHILDREN', threshold)
+    listings = {
+        'URI:DIR2-RO:aaa': [
+            FileEntry('a', 1024, 1500000000.0 + i) for i in range(3)],
+        'URI:DIR2-RO:bbb': [
+            FileEntry('b', 1024, 1600000000.0 + i) for i in range(2)],
+        'URI:DIR2-RO:ccc': None
+    }
+    monkeypatch.setattr(
+        'gridsync.tahoe.Tahoe.get_listing', lambda _, cap: listings[cap])
+    members = [
+        ('Alice', 'URI:DIR2-RO:aaa'),
+        ('Bob', 'URI:DIR2-RO:bbb'),
+        ('Carol', 'URI:DIR2-RO:ccc')
+    ]
+    _, size, mtime, history = yield tahoe.get_magic_folder_state(
+        'TestFolder', members)
+    assert (size, mtime, [e.member for e in history.values()]) == (
+        5 * 1024, 1600000001.0, ['Alice'] * 3 + ['Bob'] * 2)
+    assert defer_to_thread.called == offloaded
+
+
+@inlineCallbacks
+def test_get_grid_status_connect_error_returns_none(tmpdir, monkeypatch):
+    client = Tahoe(str(tmpdir.mkdir('TestGrid')))
+    client.nodeurl = 'http://127.0.0.1:65536/'
+    monkeypatch.setattr('treq.get', lambda *args: fail(ConnectError()))
+    output = yield client.get_grid_status()
+    assert (output, client.breaker.failures) == (None, 1)
+
+
+@inlineCallbacks
+def test_mkdir_connect_error_counts_as_failure(tmpdir, monkeypatch):
+    client = Tahoe(str(tmpdir.mkdir('TestGrid')))
+    client.nodeurl = 'http://127.0.0.1:65536/'
+    monkeypatch.setattr('treq.post', lambda *args, **kwargs: fail(
+        ConnectError()))
+    with pytest.raises(ConnectError):
+        yield client.mkdir()
+    assert client.breaker.failures == 1
+
+
+@inlineCallbacks
+def test_web_error_counts_as_success(tmpdir, monkeypatch):
+    client = Tahoe(str(tmpdir.mkdir('TestGrid')))
+    client.nodeurl = 'http://127.0.0.1:65536/'
+    client.breaker.failures = 2
+    monkeypatch.setattr('treq.post', fake_post_code_500)
+    monkeypatch.setattr('treq.content', lambda _: b'test content')
+    with pytest.raises(TahoeWebError):
+        yield client.mkdir()
+    assert client.breaker.failures == 0
+
+
+def test_request_timeouts_overridden_by_settings(tmpdir, monkeypatch):
+    monkeypatch.setattr(
+        'gridsync.tahoe.settings', {'timeouts': {'json': '5', 'link': '0'}})
+    client = Tahoe(str(tmpdir.mkdir('TestGrid')))
+    assert (client.request_timeouts['json'],
+            client.request_timeouts['link'],
+            client.request_timeouts['grid_status']) == (5, None, 15)
+
+
 @inlineCallbacks
 def test_is_ready_false_not_shares_happy(tahoe, monkeypatch):
     output = yield tahoe.is_ready()
@@ -498,9 +802,38 @@ def test_tahoe_mkdir_fail_code_500(tahoe, monkeypatch):
         yield tahoe.mkdir()
 
 
+@inlineCallbacks
+def test_tahoe_mkdir_with_children(tahoe, monkeypatch):
+    post = MagicMock(side_effect=fake_post)
+    monkeypatch.setattr('treq.post', post)
+    monkeypatch.setattr('treq.content', lambda _: b'URI:DIR2:abc234:def567')
+    output = yield tahoe.mkdir_with_children({'admin': 'URI:DIR2-RO:a:b'})
+    assert (output, json.loads(post.call_args[1]['data'].decode())) == (
+        'URI:DIR2:abc234:def567',
+        {'admin': ['dirnode', {'ro_uri': 'URI:DIR2-RO:a:b'}]}
+    )
+
+
+@inlineCallbacks
+def test_tahoe_mkdir_with_children_fail_code_500(tahoe, monkeypatch):
+    monkeypatch.setattr('treq.post', fake_post_code_500)
+    with pytest.raises(TahoeWebError):
+        yield tahoe.mkdir_with_children({'admin': 'URI:DIR2-RO:a:b'})
+
+
+@inlineCallbacks
+def test_get_readcap_falls_back_to_get_json(tahoe, monkeypatch):
+    monkeypatch.setattr(
+        'gridsync.tahoe.Tahoe.get_json',
+        lambda x, y, priority: ['dirnode', {'ro_uri': 'URI:DIR2-RO:bbb'}])
+    output = yield tahoe.get_readcap('URI:DIR2:aaa')
+    assert output == 'URI:DIR2-RO:bbb'
+
+
 @inlineCallbacks
 def test_create_rootcap(tahoe, monkeypatch):
-    monkeypatch.setattr('gridsync.tahoe.Tahoe.mkdir', lambda _: 'URI:DIR2:abc')
+    monkeypatch.setattr(
+        'gridsync.tahoe.Tahoe.mkdir', lambda _, priority: 'URI:DIR2:abc')
     output = yield tahoe.create_rootcap()
     assert output == 'URI:DIR2:abc'
 
@@ -563,6 +896,51 @@ def test_tahoe_link_fail_code_500(tahoe, monkeypatch):
         yield tahoe.link('test_dircap', 'test_childname', 'test_childcap')
 
 
+@inlineCallbacks
+def test_tahoe_set_children(tahoe, monkeypatch):
+    post = MagicMock(side_effect=fake_post)
+    monkeypatch.setattr('treq.post', post)
+    yield tahoe.set_children('URI:DIR2:aaa', {
+        'Test (collective)': 'URI:DIR2-RO:bbb',
+        'Test (personal)': 'URI:DIR2:ccc'
+    })
+    assert json.loads(post.call_args[1]['data'].decode()) == {
+        'Test (collective)': ['dirnode', {'ro_uri': 'URI:DIR2-RO:bbb'}],
+        'Test (personal)': [
+            'dirnode', {'ro_uri': 'URI:DIR2:ccc', 'rw_uri': 'URI:DIR2:ccc'}]
+    }
+
+
+@inlineCallbacks
+def test_tahoe_set_children_fail_code_500(tahoe, monkeypatch):
+    monkeypatch.setattr('treq.post', fake_post_code_500)
+    monkeypatch.setattr('treq.content', lambda _: b'test content')
+    with pytest.raises(TahoeWebError):
+        yield tahoe.set_children('URI:DIR2:aaa', {'test': 'URI:DIR2:bbb'})
+
+
+@inlineCallbacks
+def test_link_magic_folders_to_rootcap_links_all_at_once(
+        tmpdir, monkeypatch):
+    client = Tahoe(str(tmpdir.mkdir('nodedir')))
+    client.rootcap = 'URI:rootcap'
+    client.magic_folders = {
+        'A': {'collective_dircap': 'URI:A-col', 'upload_dircap': 'URI:A-up',
+              'admin_dircap': 'URI:A-admin'},
+        'B': {'collective_dircap': 'URI:B-col', 'upload_dircap': 'URI:B-up'}
+    }
+    m = MagicMock()
+    monkeypatch.setattr('gridsync.tahoe.Tahoe.set_children', m)
+    yield client.link_magic_folders_to_rootcap(['A', 'B'])
+    assert m.call_args[0] == ('URI:rootcap', {
+        'A (admin)': 'URI:A-admin',
+        'A (collective)': 'URI:A-col',
+        'A (personal)': 'URI:A-up',
+        'B (collective)': 'URI:B-col',
+        'B (personal)': 'URI:B-up'
+    })
+
+
 @inlineCallbacks
 def test_tahoe_unlink(tahoe, monkeypatch):
     monkeypatch.setattr('treq.post', fake_post)
@@ -690,6 +1068,7 @@ def test_tahoe_start_use_tor_false(monkeypatch, tmpdir_factory):
     client.config_set('client', 'shares.happy', '99999')
     monkeypatch.setattr('gridsync.tahoe.Tahoe.command', lambda x, y, z: 9999)
     yield client.start()
+    client.supervisor.stop()
     assert not client.use_tor
 
 
@@ -706,6 +1085,7 @@ def test_tahoe_start_use_tor_true(monkeypatch, tmpdir_factory):
     client.config_set('connections', 'tcp', 'tor')
     monkeypatch.setattr('gridsync.tahoe.Tahoe.command', lambda x, y, z: 9999)
     yield client.start()
+    client.supervisor.stop()
     assert client.use_tor
 
 
@@ -717,9 +1097,11 @@ def test__create_magic_folder_write_yaml(monkeypatch, tmpdir_factory):
     monkeypatch.setattr('gridsync.tahoe.Tahoe.mkdir', lambda _: 'URI:DIR2:aaa')
     monkeypatch.setattr(
         'gridsync.tahoe.Tahoe.get_json',
-        lambda x, y: ["dirnode", {"ro_uri": "URI:DIR2-RO:bbb"}]
+        lambda x, y, priority: ["dirnode", {"ro_uri": "URI:DIR2-RO:bbb"}]
     )
-    monkeypatch.setattr('gridsync.tahoe.Tahoe.link', MagicMock())
+    monkeypatch.setattr(
+        'gridsync.tahoe.Tahoe.mkdir_with_children',
+        lambda x, y: 'URI:DIR2:aaa')
     folder_path = str(tmpdir_factory.mktemp('TestFolder'))
     yield client._create_magic_folder(folder_path, 'testalias', 123)
     with open(os.path.join(privatedir, 'magic_folders.yaml')) as f:
@@ -744,9 +1126,11 @@ def test__create_magic_folder_add_alias(monkeypatch, tmpdir_factory):
     monkeypatch.setattr('gridsync.tahoe.Tahoe.mkdir', lambda _: 'URI:DIR2:aaa')
     monkeypatch.setattr(
         'gridsync.tahoe.Tahoe.get_json',
-        lambda x, y: ["dirnode", {"ro_uri": "URI:DIR2-RO:bbb"}]
+        lambda x, y, priority: ["dirnode", {"ro_uri": "URI:DIR2-RO:bbb"}]
     )
-    monkeypatch.setattr('gridsync.tahoe.Tahoe.link', MagicMock())
+    monkeypatch.setattr(
+        'gridsync.tahoe.Tahoe.mkdir_with_children',
+        lambda x, y: 'URI:DIR2:aaa')
     folder_path = str(tmpdir_factory.mktemp('TestFolder'))
     yield client._create_magic_folder(folder_path, 'testalias', 123)
     assert client.get_alias('testalias') == 'URI:DIR2:aaa'
@@ -780,6 +1164,33 @@ def test_create_magic_folder_call__create_magic_folder(
     assert m.call_count == num_calls
 
 
+@inlineCallbacks
+def test_create_magic_folders_retries_only_failed_folders(
+        monkeypatch, tmpdir_factory):
+    client = Tahoe(str(tmpdir_factory.mktemp('nodedir')))
+    monkeypatch.setattr('gridsync.tahoe.Tahoe.await_ready', MagicMock())
+    monkeypatch.setattr('gridsync.tahoe.Tahoe.load_magic_folders', MagicMock())
+    monkeypatch.setattr('gridsync.tahoe.Tahoe._save_magic_folders', MagicMock())
+    monkeypatch.setattr(
+        'gridsync.tahoe.Tahoe.link_magic_folders_to_rootcap', MagicMock())
+    monkeypatch.setattr('gridsync.tahoe.deferLater', MagicMock())
+    failures = [TahoeError('Test error')]
+    provisioned = []
+
+    def provision(path, _):
+        provisioned.append(os.path.basename(path))
+        if path.endswith('B') and failures:
+            raise failures.pop()
+        return ('URI:DIR2:aaa', {'directory': path})
+    monkeypatch.setattr(
+        'gridsync.tahoe.Tahoe._provision_magic_folder',
+        lambda _, path, poll_interval: provision(path, poll_interval))
+    paths = [str(tmpdir_factory.mktemp('nodedir').join(n)) for n in 'AB']
+    results = yield client.create_magic_folders(paths)
+    assert ([success for success, _ in results], provisioned) == \
+        ([True, True], ['A', 'B', 'B'])
+
+
 @pytest.mark.parametrize(
     'admin_dircap,num_add_alias_calls',
     [
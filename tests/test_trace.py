@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+from pytest_twisted import inlineCallbacks
+
+from fake_tahoe import (
+    FakeTahoeNode, listen, make_nodedir, make_synthetic_grid, start_gateway)
+from gridsync.trace import (
+    load_trace, redact, redact_cap, TraceRecorder, TraceReplayer)
+
+
+def test_redact_cap_preserves_type_and_parameters():
+    cap = 'URI:CHK:abcdefgh:ijklmnop:3:10:1024'
+    redacted = redact_cap(cap).split(':')
+    assert (redacted[:2], redacted[4:]) == (['URI', 'CHK'], ['3', '10', '1024'])
+
+
+def test_redact_cap_hides_secrets():
+    assert 'abcdefgh' not in redact_cap('URI:DIR2:abcdefgh:ijklmnop')
+
+
+def test_redact_cap_preserves_shared_fingerprint():
+    writecap = redact_cap('URI:DIR2:aaaa:ffff')
+    readcap = redact_cap('URI:DIR2-RO:bbbb:ffff')
+    assert writecap.split(':')[-1] == readcap.split(':')[-1]
+
+
+def test_redact_nested():
+    assert redact({'a': ['URI:DIR2:aaaa:ffff', 'x']}) == \
+        {'a': [redact_cap('URI:DIR2:aaaa:ffff'), 'x']}
+
+
+def collect_signals(monitor):
+    emitted = []
+    monitor.status_updated.connect(
+        lambda *args: emitted.append(('status_updated',) + args))
+    monitor.nodes_updated.connect(
+        lambda *args: emitted.append(('nodes_updated',) + args))
+    monitor.file_updated.connect(
+        lambda folder, entry: emitted.append(
+            ('file_updated', folder, entry.path, entry.action)))
+    monitor.sync_finished.connect(
+        lambda *args: emitted.append(('sync_finished',) + args))
+    return emitted
+
+
+@pytest.fixture()
+def trace(tmpdir):
+    @inlineCallbacks
+    def record(redact_caps=True):
+        node = FakeTahoeNode()
+        port = listen(node)
+        nodedir = os.path.join(str(tmpdir), 'TestGrid')
+        make_nodedir(
+            nodedir, 'http://127.0.0.1:{}/'.format(port.getHost().port),
+            node.api_token)
+        make_synthetic_grid(node, nodedir, num_folders=2, num_files=3)
+        gateway = start_gateway(nodedir)
+        gateway.monitor.grid_checker.connected.disconnect(
+            gateway.monitor.scan_rootcap)
+        path = str(tmpdir.join('trace.jsonl.gz'))
+        recorder = TraceRecorder(path, redact_caps)
+        recorder.attach(gateway)
+        emitted = collect_signals(gateway.monitor)
+
+        yield gateway.monitor.do_checks()
+        upload_dircap = gateway.get_magic_folder_dircap('Folder-0')
+        node.add_file(upload_dircap, 'new-file.txt', 100, 1600000000)
+        node.magic_folder_status['Folder-0'] = [{
+            'kind': 'upload', 'path': 'new-file.txt', 'percent_done': 50,
+            'queued_at': 1600000000, 'size': 100, 'status': 'started'}]
+        yield gateway.monitor.do_checks()
+        node.magic_folder_status['Folder-0'] = []
+        yield gateway.monitor.do_checks()
+        yield gateway.monitor.do_checks()
+
+        recorder.close()
+        yield port.stopListening()
+        return path, emitted
+    return record
+
+
+@inlineCallbacks
+def test_trace_recorder_writes_ticks(trace):
+    path, _ = yield trace()
+    records = load_trace(path)
+    assert len([r for r in records if r['type'] == 'tick']) == 4
+
+
+@inlineCallbacks
+def test_trace_recorder_redacts_caps(trace):
+    path, _ = yield trace()
+    with open(path, 'rb') as f:
+        raw = f.read()
+    replayer = TraceReplayer(load_trace(path))
+    gateway = replayer.gateways['TestGrid']
+    assert gateway.get_collective_dircap('Folder-0').encode() not in raw
+
+
+@inlineCallbacks
+def test_trace_replay_reproduces_monitor_signals(trace):
+    path, emitted = yield trace()
+    replayer = TraceReplayer.from_file(path)
+    replayed = collect_signals(replayer.gateways['TestGrid'].monitor)
+    stats = yield replayer.run()
+    replayer.close()
+    assert emitted
+    assert (replayed, stats['ticks'], stats['misses']) == (emitted, 4, 0)
+
+
+@inlineCallbacks
+def test_trace_replay_without_redaction(trace):
+    path, emitted = yield trace(redact_caps=False)
+    replayer = TraceReplayer.from_file(path)
+    replayed = collect_signals(replayer.gateways['TestGrid'].monitor)
+    yield replayer.run()
+    replayer.close()
+    assert replayed == emitted
+
+
+@inlineCallbacks
+def test_trace_replay_real_time(trace):
+    path, _ = yield trace()
+    records = load_trace(path)
+    duration = max(r['t'] for r in records if r['type'] == 'tick')
+    replayer = TraceReplayer(records, speed=0.5)
+    stats = yield replayer.run()
+    replayer.close()
+    assert stats['wall_time'] >= duration / 0.5
+
+
+@inlineCallbacks
+def test_trace_replay_reports_peak_memory(trace):
+    path, _ = yield trace()
+    replayer = TraceReplayer.from_file(path, trace_memory=True)
+    stats = yield replayer.run()
+    replayer.close()
+    assert stats['peak_memory'] > 0
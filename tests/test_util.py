@@ -4,7 +4,8 @@ from binascii import hexlify, unhexlify
 
 import pytest
 
-from gridsync.util import b58encode, b58decode, humanized_list
+from gridsync.util import (
+    b58encode, b58decode, get_max_rss, humanized_list, LRUCache)
 
 
 # From https://github.com/bitcoin/bitcoin/blob/master/src/test/data/base58_encode_decode.json
@@ -48,3 +49,34 @@ def test_b58decode_value_error():
 ])
 def test_humanized_list(items, kind, humanized):
     assert humanized_list(items, kind) == humanized
+
+
+def test_lru_cache_get():
+    cache = LRUCache()
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+
+
+def test_lru_cache_get_missing_returns_default():
+    assert LRUCache().get('a', 'default') == 'default'
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert ('a' in cache, 'b' in cache, 'c' in cache) == (True, False, True)
+
+
+def test_lru_cache_counts_hits_and_misses():
+    cache = LRUCache()
+    cache.put('a', 1)
+    cache.get('a')
+    cache.get('b')
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_get_max_rss():
+    assert get_max_rss() > 0
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_twisted import inlineCallbacks
+from twisted.internet import reactor
+from twisted.internet.task import Clock, deferLater
+
+from gridsync.watcher import FolderWatcher
+
+
+@pytest.fixture()
+def clock():
+    return Clock()
+
+
+def test_changes_debounced(clock):
+    callback = MagicMock()
+    watcher = FolderWatcher('/tmp', callback, clock=clock)
+    for _ in range(5):
+        watcher.changed()
+        clock.advance(0.5)
+    assert not callback.called
+    clock.advance(1)
+    assert callback.call_count == 1
+
+
+def test_changes_reported_no_later_than_max_delay(clock):
+    callback = MagicMock()
+    watcher = FolderWatcher('/tmp', callback, clock=clock)
+    for _ in range(20):
+        watcher.changed()
+        clock.advance(0.5)
+    assert callback.call_count == 2
+
+
+def test_stop_cancels_pending_callback(clock):
+    callback = MagicMock()
+    watcher = FolderWatcher('/tmp', callback, clock=clock)
+    watcher.changed()
+    watcher.stop()
+    clock.advance(10)
+    assert not callback.called
+
+
+def test_start_without_inotify(tmpdir, monkeypatch):
+    monkeypatch.setattr('gridsync.watcher.inotify', None)
+    watcher = FolderWatcher(str(tmpdir), MagicMock(), clock=Clock())
+    assert (watcher.start(), watcher.notifier) == (False, None)
+
+
+@pytest.mark.skipif(
+    not sys.platform.startswith('linux'), reason="Requires inotify")
+@inlineCallbacks
+def test_inotify_reports_changes_in_subdirectories(tmpdir, monkeypatch):
+    monkeypatch.setattr('gridsync.watcher.DEBOUNCE_DELAY', 0.01)
+    subdir = tmpdir.mkdir('subdir')
+    callback = MagicMock()
+    watcher = FolderWatcher(str(tmpdir), callback)
+    started = watcher.start()
+    subdir.join('file.txt').write('test')
+    for _ in range(100):
+        if callback.called:
+            break
+        yield deferLater(reactor, 0.01, lambda: None)
+    watcher.stop()
+    assert (started, callback.call_count) == (True, 1)